@@ -0,0 +1,77 @@
+"""
+Compare FASTQ decompression throughput of the parallel reader against gzip.open.
+
+The input is repeated ``--scale`` times and written both as a single gzip
+member and as BGZF, then each file is read end to end with gzip.open and
+with the reader at 1 and ``--threads`` threads. Throughput is reported in MB
+of decompressed FASTQ per second (best of ``--repeat`` runs).
+
+    python benchmarks/bench_fastq_reader.py --scale 20 --threads 4
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.run_management.fastq_reader import CHUNK_SIZE, default_threads, read_chunks, write_bgzf  # noqa: E402
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fastqc_module", "test_data",
+                             "SRR12345678_1.fastq.gz")
+
+
+def _gzip_open(path):
+    with gzip.open(path, "rb") as f:
+        return sum(len(chunk) for chunk in iter(lambda: f.read(CHUNK_SIZE), b""))
+
+
+def _reader(threads):
+    return lambda path: sum(len(chunk) for chunk in read_chunks(path, threads=threads))
+
+
+def best_time(read, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = read(path)
+        timings.append(time.perf_counter() - start)
+    return size, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parallel FASTQ reader against gzip.open")
+    parser.add_argument("input", nargs="?", default=DEFAULT_INPUT, help="FASTQ(.gz) file to replicate")
+    parser.add_argument("--scale", type=int, default=10, help="Times the input is repeated")
+    parser.add_argument("--threads", type=int, default=default_threads(), help="Reader threads")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is kept")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    readers = {"gzip.open": _gzip_open, "reader x1": _reader(1), f"reader x{args.threads}": _reader(args.threads)}
+    content = b"".join(read_chunks(args.input))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {"gzip": os.path.join(tmp, "input.fastq.gz"), "bgzf": os.path.join(tmp, "input.bgzf.fastq.gz")}
+        with gzip.open(files["gzip"], "wb") as f:
+            for _ in range(args.scale):
+                f.write(content)
+        write_bgzf((content for _ in range(args.scale)), files["bgzf"])
+
+        print(f"{'layout':<6} {'reader':<12} {'MB/s':>8} {'seconds':>8}")
+        for layout, path in files.items():
+            for name, read in readers.items():
+                size, elapsed = best_time(read, path, args.repeat)
+                results.append({"layout": layout, "reader": name, "bytes": size, "seconds": round(elapsed, 4),
+                                "mb_per_s": round(size / elapsed / 1e6, 1)})
+                print(f"{layout:<6} {name:<12} {size / elapsed / 1e6:>8.1f} {elapsed:>8.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"threads": args.threads, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
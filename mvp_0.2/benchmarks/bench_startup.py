@@ -0,0 +1,102 @@
+"""
+Startup benchmark: import time of the CLI, orchestrator and backend, checked against budgets.
+
+Each entry point runs in a fresh interpreter under ``python -X importtime``;
+its cost is the cumulative import time of every top-level import the entry
+point triggers beyond bare interpreter startup (median of ``--repeat`` runs).
+An entry point fails if it exceeds its budget or loads a module it must not
+(e.g. ``openai`` for a plain ``start-run``). Exits with status 1 on any failure:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --only cli,orchestrator --repeat 9 --json startup.json
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# name -> (statement, import-time budget in ms, modules the statement must not load)
+ENTRY_POINTS = {
+    "cli": ("import src.run_management.cli_run_manager", 120,
+            ("openai", "requests", "httpx", "flask", "asyncio")),
+    "orchestrator": ("import src.ai_orchestrator", 150, ("openai", "requests", "httpx", "flask")),
+    "orchestrator_init": ("from src.ai_orchestrator import AIOrchestrator; AIOrchestrator('unused-key')", 150,
+                          ("openai", "requests", "httpx", "flask")),
+    "backend": ("import src.backend.backend_api", 400, ("openai", "requests", "httpx")),
+}
+
+
+def import_log(statement, env=None):
+    """``[(depth, cumulative_us, module)]`` from ``python -X importtime -c statement``."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append(((len(name) - len(name.lstrip())) // 2, int(cumulative), name.strip()))
+    return entries
+
+
+def measure(statement, baseline, env=None):
+    """(cost in ms, modules loaded) of ``statement`` beyond the modules in ``baseline``."""
+    entries = import_log(statement, env)
+    cost = sum(cumulative for depth, cumulative, name in entries if depth == 0 and name not in baseline)
+    return cost / 1000, {name for _, _, name in entries}
+
+
+def forbidden_loaded(modules, forbidden):
+    return sorted(name for name in modules if name.split(".")[0] in forbidden)
+
+
+def run_startup(only=tuple(ENTRY_POINTS), repeat=5):
+    """Measure the selected entry points; returns ``{name: report}``."""
+    reports = {}
+    with tempfile.TemporaryDirectory(prefix="bbd-startup-") as workdir:
+        # The backend opens its module database and needs an API key (or the stub) at import.
+        env = {**os.environ, "BBD_LLM_STUB": "1", "BBD_MODULE_DB": os.path.join(workdir, "module_database.db")}
+        baseline = {name for depth, _, name in import_log("pass", env) if depth == 0}
+        for name in only:
+            statement, budget_ms, forbidden = ENTRY_POINTS[name]
+            runs = [measure(statement, baseline, env) for _ in range(repeat)]
+            cost = statistics.median(ms for ms, _ in runs)
+            loaded = forbidden_loaded(runs[0][1], forbidden)
+            reports[name] = {"import_ms": round(cost, 1), "budget_ms": budget_ms, "forbidden_loaded": loaded,
+                             "ok": cost <= budget_ms and not loaded}
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budgets for BBD.bio entry points")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(ENTRY_POINTS)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    only = tuple(args.only.split(",")) if args.only else tuple(ENTRY_POINTS)
+    unknown = set(only) - set(ENTRY_POINTS)
+    if unknown:
+        parser.error(f"Unknown entry point(s): {', '.join(sorted(unknown))}")
+    reports = run_startup(only, args.repeat)
+
+    for name, report in reports.items():
+        flag = "ok" if report["ok"] else "OVER BUDGET" if not report["forbidden_loaded"] else \
+            f"LOADS {', '.join(report['forbidden_loaded'])}"
+        print(f"{name:<20} {report['import_ms']:>8.1f} ms  (budget {report['budget_ms']} ms)  {flag}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+    if not all(report["ok"] for report in reports.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Offline benchmark suite for run management, staging, QC and workflow generation.
+
+Every benchmark runs against throwaway databases and synthetic inputs in a
+temporary directory, so no network, FastQC install or OpenAI key is needed:
+
+    create_run      runs created per second (create_run, content store on)
+    status          run status updates per second from several threads,
+                    committed one by one and through a WriteBatch
+    staging         move_input_files MB/s by copy and through the content store
+    fastq           record counting and NativeQC MB/s on generated FASTQ files
+                    of several sizes, as single-member gzip and as BGZF
+    generation      workflow-generation latency with the stub LLM client,
+                    on a response-cache miss and on a hit
+
+Results are written as JSON and can be compared against a stored baseline:
+
+    python benchmarks/bench_suite.py --json results.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --fail-on-regression
+    python benchmarks/bench_suite.py --quick --only fastq,staging
+
+Throughput is the best of three runs (one with --quick); latencies are medians and 95th
+percentiles. Synthetic data is seeded, so every run measures identical inputs.
+"""
+import io
+import os
+import sys
+import json
+import time
+import gzip
+import random
+import itertools
+import logging
+import platform
+import argparse
+import tempfile
+import statistics
+import threading
+import subprocess
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+BENCHMARKS = ("create_run", "status", "staging", "fastq", "generation")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+
+# Workload sizes per profile: --quick for smoke runs, full for baselines.
+PROFILES = {
+    "quick": {"runs": 50, "status_threads": 4, "status_updates": 200, "staging_mb": (4,),
+              "fastq_mb": (1, 4), "requests": 10, "repeat": 1},
+    "full": {"runs": 300, "status_threads": 8, "status_updates": 1000, "staging_mb": (16, 64),
+             "fastq_mb": (4, 16, 64), "requests": 50, "repeat": 3},
+}
+
+
+def result(value, unit, better="higher"):
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def best_of(repeat, fn):
+    """Smallest wall time of ``repeat`` calls of fn()."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _fresh_store(workdir, name):
+    from src.run_management.run_tracking import RunStore, set_store
+    store = set_store(RunStore(os.path.join(workdir, f"{name}.db")))
+    store.initialize()
+    return store
+
+
+def synthetic_fastq(size_mb, read_length=100, seed=42):
+    """Seeded FASTQ records totalling about ``size_mb`` MB."""
+    rng = random.Random(seed)
+    quality = "".join(chr(33 + q) for q in range(2, 41))
+    records, size, i = [], 0, 0
+    while size < size_mb * 1_000_000:
+        seq = "".join(rng.choices("ACGT", k=read_length))
+        qual = "".join(rng.choices(quality, k=read_length))
+        record = f"@read{i}\n{seq}\n+\n{qual}\n"
+        records.append(record)
+        size += len(record)
+        i += 1
+    return "".join(records).encode()
+
+
+def bench_create_run(workdir, profile):
+    from src.run_management.cli_run_manager import create_run
+    _fresh_store(workdir, "create_run")
+    sample = os.path.join(workdir, "sample.fastq")
+    with open(sample, "wb") as f:
+        f.write(synthetic_fastq(0.1))
+    base_path = os.path.join(workdir, "runs")
+    with redirect_stdout(io.StringIO()):
+        elapsed = best_of(1, lambda: [create_run([sample], base_path) for _ in range(profile["runs"])])
+    return {"create_run.runs_per_s": result(profile["runs"] / elapsed, "runs/s")}
+
+
+def bench_status(workdir, profile):
+    from src.run_management.status_manager import update_run_status
+    store = _fresh_store(workdir, "status")
+    threads, updates = profile["status_threads"], profile["status_updates"]
+    run_ids = [store.log_run([f"sample{i}.fastq"], "") for i in range(threads)]
+    statuses = ("running", "completed")
+
+    def hammer(update):
+        def worker(run_id):
+            for i in range(updates):
+                update(run_id, statuses[i % 2])
+        pool = [threading.Thread(target=worker, args=(run_id,)) for run_id in run_ids]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+    direct = best_of(profile["repeat"], lambda: hammer(update_run_status))
+
+    def batched():
+        with store.batch() as batch:
+            hammer(batch.update_run_status)
+    batch = best_of(profile["repeat"], batched)
+    total = threads * updates
+    return {"status.direct.updates_per_s": result(total / direct, "updates/s"),
+            "status.batched.updates_per_s": result(total / batch, "updates/s")}
+
+
+def bench_staging(workdir, profile):
+    from src.run_management.directory_manager import move_input_files
+    from src.run_management.staging import ContentStore
+    store = _fresh_store(workdir, "staging")
+    content_store = ContentStore(os.path.join(workdir, "store"), store)
+    destinations = itertools.count()
+    results = {}
+    for size_mb in profile["staging_mb"]:
+        source = os.path.join(workdir, f"staging_{size_mb}MB.bin")
+        with open(source, "wb") as f:
+            size = size_mb * 1_000_000  # Random.randbytes needs Python 3.9
+            f.write(random.Random(size_mb).getrandbits(8 * size).to_bytes(size, "little"))
+        for name, kwargs in (("copy", {"mode": "copy"}), ("content_store", {"content_store": content_store})):
+            def stage():
+                # Bump the mtime so the content store re-hashes instead of hitting its digest cache.
+                os.utime(source, ns=(time.time_ns(), time.time_ns()))
+                move_input_files([source], os.path.join(workdir, f"stage{next(destinations)}"), **kwargs)
+            elapsed = best_of(profile["repeat"], stage)
+            results[f"staging.{name}.{size_mb}MB.mb_per_s"] = result(size_mb / elapsed, "MB/s")
+    return results
+
+
+def bench_fastq(workdir, profile):
+    from src.run_management.fastq_reader import count_records, write_bgzf
+    from fastqc_module.native_qc import compute_qc
+    results = {}
+    for size_mb in profile["fastq_mb"]:
+        content = synthetic_fastq(size_mb)
+        megabytes = len(content) / 1e6
+        files = {"gzip": os.path.join(workdir, f"reads_{size_mb}MB.fastq.gz"),
+                 "bgzf": os.path.join(workdir, f"reads_{size_mb}MB.bgzf.fastq.gz")}
+        with gzip.open(files["gzip"], "wb", compresslevel=6) as f:
+            f.write(content)
+        write_bgzf([content], files["bgzf"])
+        for layout, path in files.items():
+            read = best_of(profile["repeat"], lambda: count_records(path))
+            qc = best_of(profile["repeat"], lambda: compute_qc(path))
+            results[f"fastq.read.{layout}.{size_mb}MB.mb_per_s"] = result(megabytes / read, "MB/s")
+            results[f"fastq.qc.{layout}.{size_mb}MB.mb_per_s"] = result(megabytes / qc, "MB/s")
+    return results
+
+
+def bench_generation(workdir, profile):
+    from src.ai_orchestrator.ai_orchestrator import AIOrchestrator
+    from src.ai_orchestrator.module_registry import ModuleRegistry
+    from src.ai_orchestrator.response_cache import ResponseCache
+    from src.ai_orchestrator.stub_client import StubChatClient
+    from src.backend.module_store import ModuleStore
+    logging.disable(logging.INFO)  # The orchestrator logs every prompt at DEBUG level
+
+    module_store = ModuleStore(os.path.join(workdir, "module_database.db"))
+    module_store.add_modules([{"name": name, "description": name, "input_format": "fastq",
+                               "output_format": "html", "environment": "Shell"}
+                              for name in ("FastQC", "NativeQC", "BWA", "GATK", "STAR")])
+    plan = json.dumps({"workflow": [{"module": "FastQC"}, {"module": "BWA"}], "missing_modules": []})
+    orchestrator = AIOrchestrator(None, registry=ModuleRegistry(db_path=module_store.db_path),
+                                  client=StubChatClient(default=plan),
+                                  response_cache=ResponseCache(_fresh_store(workdir, "generation")))
+    requests = [f"Run QC and alignment on sample {i}" for i in range(profile["requests"])]
+
+    def latencies():
+        timings = []
+        for request in requests:
+            start = time.perf_counter()
+            orchestrator.generate_workflow(request)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    orchestrator.generate_workflow("Warm-up request")  # Registry fetch and first statement preparation
+    miss, hit = latencies(), latencies()  # The second pass is answered from the response cache
+    logging.disable(logging.NOTSET)
+    module_store.close()
+    results = {}
+    for name, timings in (("cache_miss", miss), ("cache_hit", hit)):
+        results[f"generation.{name}.p50_ms"] = result(statistics.median(timings), "ms", "lower")
+        results[f"generation.{name}.p95_ms"] = result(
+            statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0], "ms", "lower")
+    return results
+
+
+def run_suite(only=BENCHMARKS, profile_name="full"):
+    """Run the selected benchmarks; returns the machine-readable result document."""
+    from src.run_management.run_tracking import get_store, set_store
+    profile = PROFILES[profile_name]
+    previous, cwd = get_store(), os.getcwd()
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="bbd-bench-") as workdir:
+            os.chdir(workdir)  # Modules that log to a relative file at import time write there
+            for name in only:
+                print(f"Running {name}...", file=sys.stderr)
+                results.update(globals()[f"bench_{name}"](workdir, profile))
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        set_store(previous)
+    return {"meta": environment(profile_name), "results": results}
+
+
+def environment(profile_name):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"profile": profile_name, "commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Per-metric change against a baseline; a metric regresses if it is worse by more than ``tolerance``."""
+    rows = []
+    for name, now in sorted(current["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None or not before["value"] or not now["value"]:
+            continue
+        speedup = (now["value"] / before["value"] if now["better"] == "higher"
+                   else before["value"] / now["value"])
+        rows.append({"metric": name, "baseline": before["value"], "current": now["value"],
+                     "unit": now["unit"], "speedup": round(speedup, 3), "regressed": speedup < 1 - tolerance})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for BBD.bio run management and QC")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="Small workloads for a fast smoke run")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this results file (e.g. benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a metric counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    args = parser.parse_args()
+
+    only = tuple(args.only.split(",")) if args.only else BENCHMARKS
+    unknown = set(only) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    current = run_suite(only, "quick" if args.quick else "full")
+
+    for name, metric in sorted(current["results"].items()):
+        print(f"{name:<44} {metric['value']:>12.3f} {metric['unit']}")
+    for path in filter(None, (args.json, DEFAULT_BASELINE if args.save_baseline else None)):
+        with open(path, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("profile") != current["meta"]["profile"]:
+            print(f"Warning: baseline profile {baseline['meta'].get('profile')!r} differs from "
+                  f"{current['meta']['profile']!r}; results are not comparable", file=sys.stderr)
+        rows = compare(current, baseline, args.tolerance)
+        print(f"\n{'metric':<44} {'baseline':>10} {'current':>10} {'speedup':>8}")
+        for row in rows:
+            flag = "  REGRESSED" if row["regressed"] else ""
+            print(f"{row['metric']:<44} {row['baseline']:>10.3f} {row['current']:>10.3f} {row['speedup']:>7.2f}x{flag}")
+        if args.fail_on_regression and any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,85 @@
 import os
 import uuid
+import logging
+import sqlite3
 import datetime
-import json
+from src.run_management.staging import stage_file
+from src.run_management.run_tracking import get_store
+from src.run_management.directory_manager import create_run_layout, update_run_metadata
+from src.run_management.result_cache import get_result_cache
+from src.run_management.profiling import run_profiled
+from src.run_management.process_io import StepLog
 
-def run_fastqc(input_files, base_dir="/workspaces/BBD.bio_4/mvp_0.2/runs"):
+FASTQ_SUFFIXES = (".fastq.gz", ".fq.gz", ".fastq", ".fq", ".gz")
+
+def fastqc_output_names(input_file):
+    """File names FastQC writes for one input (e.g. sample.fastq.gz -> sample_fastqc.html/.zip)."""
+    name = os.path.basename(input_file)
+    for suffix in FASTQ_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return [f"{name}_fastqc.html", f"{name}_fastqc.zip"]
+
+def run_fastqc(input_files, base_dir="/workspaces/BBD.bio_4/mvp_0.2/runs", use_cache=True):
     """
     Runs FastQC with structured run tracking.
     
     Parameters:
         input_files (list): List of FASTQ files.
         base_dir (str): Base directory for storing all runs.
+        use_cache (bool): Reuse results for inputs FastQC has already processed.
     
     Returns:
         run_dir (str): Directory containing the results.
     """
-    # Generate unique Run ID
-    run_id = str(uuid.uuid4())[:8]  # Short UUID for uniqueness
-    today = datetime.datetime.now().strftime("%Y/%m/%d")
-
-    # Define structured run directory
-    run_dir = os.path.join(base_dir, today, f"run_{run_id}")
+    # Log the run and create its directory in the shared sharded layout
+    store = get_store()
+    run_id = str(uuid.uuid4())
+    run_dir = create_run_layout(base_dir, run_id)
     input_dir = os.path.join(run_dir, "input")
     output_dir = os.path.join(run_dir, "output")
     log_dir = os.path.join(run_dir, "logs")
+    store.log_run(input_files, output_dir, run_id=run_id, run_dir=run_dir)
 
-    # Create directories
-    for d in [input_dir, output_dir, log_dir]:
-        os.makedirs(d, exist_ok=True)
+    # Link (or, across filesystems, copy) input files into the run-specific input directory
+    for file in input_files:
+        stage_file(file, os.path.join(input_dir, os.path.basename(file)))
 
-    # Copy input files to run-specific input directory
+    # Reuse cached reports where the same input was already analysed
+    cache = get_result_cache() if use_cache else None
+    keys, to_run, cache_hits = {}, [], []
     for file in input_files:
-        os.system(f"cp {file} {input_dir}/")
+        if cache is not None:
+            keys[file] = cache.key_for([file], "FastQC")
+            if cache.materialise(keys[file], output_dir) is not None:
+                cache_hits.append(file)
+                continue
+        to_run.append(file)
+
+    # Run FastQC, measuring its wall time, CPU, peak memory and I/O
+    profile = None
+    if to_run:
+        staged = [os.path.join(input_dir, os.path.basename(f)) for f in to_run]
+        with StepLog(os.path.join(log_dir, "fastqc.log")) as log:
+            profile = run_profiled(["fastqc", "-o", output_dir, *staged], stdout=log, stderr=log).metrics
 
-    # Run FastQC
-    input_files_str = " ".join([os.path.join(input_dir, os.path.basename(f)) for f in input_files])
-    os.system(f"fastqc -o {output_dir} {input_files_str}")
+    # Only cache reports of a clean FastQC exit; a failed run can leave partial or stale reports behind
+    if cache is not None and profile is not None and profile["exit_code"] == 0:
+        for file in to_run:
+            outputs = [os.path.join(output_dir, name) for name in fastqc_output_names(file)]
+            if all(os.path.exists(path) for path in outputs):
+                try:
+                    cache.put(keys[file], "FastQC", outputs)
+                except (OSError, sqlite3.Error) as e:
+                    logging.warning(f"Could not cache the FastQC reports for {file}: {e}")
 
     # Store metadata
-    metadata = {
-        "run_id": run_id,
-        "timestamp": datetime.datetime.now().isoformat(),
-        "input_files": input_files,
-        "output_dir": output_dir,
-        "status": "completed"
-    }
-    with open(os.path.join(run_dir, "metadata.json"), "w") as f:
-        json.dump(metadata, f, indent=4)
+    status = "completed" if profile is None or profile["exit_code"] == 0 else "failed"
+    update_run_metadata(run_dir, timestamp=datetime.datetime.now().isoformat(), input_files=input_files,
+                        output_dir=output_dir, cache_hits=cache_hits, profile=profile, status=status)
+    if profile is not None:
+        store.record_step_metrics(run_id, None, "FastQC", profile)
+    store.update_run_status(run_id, status)
 
     return run_dir
@@ -0,0 +1,319 @@
+"""
+In-process FASTQ quality control.
+
+Computes the core FastQC metrics (per-base quality, per-sequence quality,
+per-base content, GC content, N content, length distribution and a
+duplication estimate) without starting a JVM. Input is streamed in large
+chunks and each chunk of whole records is processed with vectorised NumPy
+operations, so memory use is bounded by the chunk size and the longest read,
+not by the file size.
+"""
+import os
+import json
+import time
+import argparse
+import functools
+import numpy as np
+from src.run_management.fastq_reader import CHUNK_SIZE, read_batches
+from src.run_management.scatter import should_scatter, scatter_gather
+
+NATIVE_QC_VERSION = "1.0"
+PHRED_OFFSET = 33
+QUALITY_LEVELS = 94  # Phred 0..93 is the printable Sanger range
+DUPLICATION_TRACKED = 100_000  # Distinct sequences followed for the duplication estimate, as FastQC
+DUPLICATION_PREFIX = 50
+DUPLICATION_LEVELS = ((1, "1"), (2, "2"), (3, "3"), (4, "4"), (5, "5"), (6, "6"), (7, "7"), (8, "8"),
+                      (9, "9"), (10, ">10"), (50, ">50"), (100, ">100"), (500, ">500"),
+                      (1000, ">1k"), (5000, ">5k"), (10000, ">10k"))
+
+# A, C, G, T -> 0..3; everything else (N, IUPAC codes) -> 4
+_BASE_CODES = np.full(256, 4, dtype=np.int64)
+for _i, _base in enumerate(b"ACGT"):
+    _BASE_CODES[_base] = _i
+    _BASE_CODES[ord(chr(_base).lower())] = _i
+_HASH_POWERS = np.array([pow(1_000_003, i, 2 ** 64) for i in range(DUPLICATION_PREFIX)], dtype=np.uint64)
+
+
+class QCStats:
+    """Accumulates QC metrics over batches of FASTQ records."""
+
+    def __init__(self):
+        self.total_sequences = 0
+        self.total_bases = 0
+        self.max_length = 0
+        self.quality_hist = np.zeros((0, QUALITY_LEVELS), dtype=np.int64)   # position x phred
+        self.base_counts = np.zeros((0, 5), dtype=np.int64)                # position x ACGTN
+        self.length_counts = np.zeros(1, dtype=np.int64)
+        self.sequence_quality = np.zeros(QUALITY_LEVELS, dtype=np.int64)
+        self.gc_counts = np.zeros(101, dtype=np.int64)
+        self.dup_hashes = np.zeros(0, dtype=np.uint64)
+        self.dup_counts = np.zeros(0, dtype=np.int64)
+
+    def _grow(self, length):
+        if length <= self.max_length:
+            return
+        extra = length - self.max_length
+        self.quality_hist = np.vstack([self.quality_hist, np.zeros((extra, QUALITY_LEVELS), dtype=np.int64)])
+        self.base_counts = np.vstack([self.base_counts, np.zeros((extra, 5), dtype=np.int64)])
+        self.length_counts = np.concatenate([self.length_counts, np.zeros(extra, dtype=np.int64)])
+        self.max_length = length
+
+    def add_batch(self, buf, newlines):
+        """Add every record in one (buffer, newline positions) batch."""
+        starts = np.concatenate(([0], newlines[:-1] + 1))
+        ends = newlines.copy()
+        ends -= (buf[np.maximum(ends - 1, 0)] == 13) & (ends > starts)  # tolerate CRLF
+
+        if not np.all(buf[starts[0::4]] == ord("@")) or not np.all(buf[starts[2::4]] == ord("+")):
+            raise ValueError("Malformed FASTQ: record does not start with '@' / '+'")
+        seq_starts, lengths = starts[1::4], ends[1::4] - starts[1::4]
+        qual_starts = starts[3::4]
+        if not np.array_equal(lengths, ends[3::4] - qual_starts):
+            raise ValueError("Malformed FASTQ: sequence and quality lengths differ")
+
+        n = len(lengths)
+        self.total_sequences += n
+        self.total_bases += int(lengths.sum())
+        self._grow(int(lengths.max()) if n else 0)
+        self.length_counts += np.bincount(lengths, minlength=self.max_length + 1)[:self.max_length + 1]
+
+        keep = lengths > 0
+        seq_starts, qual_starts, lengths = seq_starts[keep], qual_starts[keep], lengths[keep]
+        if not len(lengths):
+            return
+
+        # Flatten all bases of the batch: position within read and source offsets.
+        offsets = np.cumsum(lengths) - lengths
+        position = np.arange(int(lengths.sum())) - np.repeat(offsets, lengths)
+        codes = _BASE_CODES[buf[np.repeat(seq_starts, lengths) + position]]
+        quals = buf[np.repeat(qual_starts, lengths) + position].astype(np.int64) - PHRED_OFFSET
+        np.clip(quals, 0, QUALITY_LEVELS - 1, out=quals)
+
+        size = self.max_length
+        self.quality_hist += np.bincount(position * QUALITY_LEVELS + quals,
+                                         minlength=size * QUALITY_LEVELS).reshape(size, QUALITY_LEVELS)
+        self.base_counts += np.bincount(position * 5 + codes, minlength=size * 5).reshape(size, 5)
+
+        mean_quality = np.add.reduceat(quals, offsets) / lengths
+        self.sequence_quality += np.bincount(np.rint(mean_quality).astype(np.int64), minlength=QUALITY_LEVELS)
+        gc = np.add.reduceat(((codes == 1) | (codes == 2)).astype(np.int64), offsets)
+        self.gc_counts += np.bincount(np.rint(gc * 100 / lengths).astype(np.int64), minlength=101)
+
+        self._track_duplicates(buf, seq_starts, lengths)
+
+    def _track_duplicates(self, buf, seq_starts, lengths):
+        """Count occurrences of the first DUPLICATION_TRACKED distinct read prefixes."""
+        width = np.minimum(lengths, DUPLICATION_PREFIX)
+        cols = np.arange(DUPLICATION_PREFIX)
+        index = np.minimum(seq_starts[:, None] + cols[None, :], len(buf) - 1)
+        prefix = np.where(cols[None, :] < width[:, None], buf[index], 0).astype(np.uint64)
+        hashes = (prefix * _HASH_POWERS[None, :]).sum(axis=1, dtype=np.uint64) ^ width.astype(np.uint64)
+
+        self._add_duplicates(*np.unique(hashes, return_counts=True))
+
+    def _add_duplicates(self, unique, counts):
+        """Add counts for sorted, distinct prefix hashes; new ones only while fewer than DUPLICATION_TRACKED are followed."""
+        slot = np.searchsorted(self.dup_hashes, unique)
+        found = slot < len(self.dup_hashes)
+        found[found] = self.dup_hashes[slot[found]] == unique[found]
+        self.dup_counts[slot[found]] += counts[found]
+
+        room = DUPLICATION_TRACKED - len(self.dup_hashes)
+        if room > 0 and not found.all():
+            new_hashes, new_counts = unique[~found][:room], counts[~found][:room]
+            merged = np.concatenate([self.dup_hashes, new_hashes])
+            order = np.argsort(merged, kind="stable")
+            self.dup_hashes = merged[order]
+            self.dup_counts = np.concatenate([self.dup_counts, new_counts])[order]
+
+    def merge(self, other):
+        """Add the metrics accumulated by ``other``, e.g. over another chunk of the same file.
+
+        Every counter is summed exactly; the duplication estimate follows the
+        first DUPLICATION_TRACKED distinct prefixes in chunk order.
+        """
+        self._grow(other.max_length)
+        self.total_sequences += other.total_sequences
+        self.total_bases += other.total_bases
+        self.quality_hist[:other.max_length] += other.quality_hist
+        self.base_counts[:other.max_length] += other.base_counts
+        self.length_counts[:other.max_length + 1] += other.length_counts
+        self.sequence_quality += other.sequence_quality
+        self.gc_counts += other.gc_counts
+        self._add_duplicates(other.dup_hashes, other.dup_counts)
+        return self
+
+    @staticmethod
+    def _quantile(hist_row, fraction):
+        cumulative = np.cumsum(hist_row)
+        return int(np.searchsorted(cumulative, fraction * cumulative[-1]))
+
+    def result(self, filename):
+        """Summarise the accumulated metrics as a JSON-serialisable dict."""
+        lengths = np.flatnonzero(self.length_counts)
+        per_base_quality, per_base_content, per_base_n = [], [], []
+        for pos in range(self.max_length):
+            hist = self.quality_hist[pos]
+            total = int(hist.sum())
+            if total == 0:
+                continue
+            per_base_quality.append({
+                "base": pos + 1,
+                "mean": round(float(hist @ np.arange(QUALITY_LEVELS)) / total, 2),
+                "median": self._quantile(hist, 0.5),
+                "lower_quartile": self._quantile(hist, 0.25),
+                "upper_quartile": self._quantile(hist, 0.75),
+                "10th_percentile": self._quantile(hist, 0.1),
+                "90th_percentile": self._quantile(hist, 0.9),
+            })
+            counts = self.base_counts[pos]
+            called = int(counts[:4].sum())
+            per_base_content.append({"base": pos + 1, **{
+                base: round(100 * int(counts[i]) / called, 2) if called else 0.0
+                for i, base in enumerate("ACGT")}})
+            per_base_n.append({"base": pos + 1, "n_percent": round(100 * int(counts[4]) / int(counts.sum()), 2)})
+
+        gc_bases = int(self.base_counts[:, 1:3].sum())
+        called_bases = int(self.base_counts[:, :4].sum())
+        tracked_total = int(self.dup_counts.sum())
+        levels = {label: 0 for _, label in DUPLICATION_LEVELS}
+        if tracked_total:
+            bounds = np.array([low for low, _ in DUPLICATION_LEVELS])
+            bucket = np.searchsorted(bounds, self.dup_counts, side="right") - 1
+            per_level = np.bincount(bucket, weights=self.dup_counts, minlength=len(bounds))
+            levels = {label: round(100 * float(per_level[i]) / tracked_total, 2)
+                      for i, (_, label) in enumerate(DUPLICATION_LEVELS)}
+
+        return {
+            "filename": filename,
+            "engine": f"native_qc {NATIVE_QC_VERSION}",
+            "encoding": "Sanger / Illumina 1.9",
+            "total_sequences": self.total_sequences,
+            "total_bases": self.total_bases,
+            "sequence_length": {"min": int(lengths.min()) if len(lengths) else 0,
+                                "max": int(lengths.max()) if len(lengths) else 0},
+            "percent_gc": round(100 * gc_bases / called_bases, 2) if called_bases else 0.0,
+            "per_base_quality": per_base_quality,
+            "per_sequence_quality": {int(q): int(c) for q, c in enumerate(self.sequence_quality) if c},
+            "per_base_content": per_base_content,
+            "per_base_n_content": per_base_n,
+            "gc_content": [int(c) for c in self.gc_counts],
+            "length_distribution": {int(length): int(self.length_counts[length]) for length in lengths},
+            "duplication": {
+                "percent_deduplicated": round(100 * len(self.dup_counts) / tracked_total, 2) if tracked_total else 100.0,
+                "levels": levels,
+            },
+        }
+
+
+def compute_stats(path, chunk_size=CHUNK_SIZE, threads=None):
+    """Stream one FASTQ(.gz) file into a QCStats."""
+    stats = QCStats()
+    for buf, newlines in read_batches(path, threads, chunk_size):
+        stats.add_batch(buf, newlines)
+    return stats
+
+
+def merge_stats(stats):
+    """Sum per-chunk QCStats, in chunk order."""
+    return functools.reduce(QCStats.merge, stats, QCStats())
+
+
+def compute_qc(path, chunk_size=CHUNK_SIZE, threads=None, workers=1, chunk_bytes=None,
+               scratch_dir=None):
+    """Stream one FASTQ(.gz) file and return its QC metrics.
+
+    With ``workers`` > 1, a file larger than ``chunk_bytes`` is split into
+    record-aligned chunks whose statistics are computed in parallel processes
+    and summed (see ``src.run_management.scatter``); chunks are written to
+    ``scratch_dir`` (default: next to ``path``).
+    """
+    if workers > 1 and should_scatter(path, workers, chunk_bytes):
+        stats = scatter_gather(path, compute_stats, merge_stats, workers, chunk_bytes, processes=True,
+                               scratch_dir=scratch_dir or os.path.dirname(os.path.abspath(path)))
+    else:
+        stats = compute_stats(path, chunk_size, threads)
+    return stats.result(os.path.basename(path))
+
+
+def output_prefix(path):
+    name = os.path.basename(path)
+    for suffix in (".fastq.gz", ".fq.gz", ".fastq", ".fq", ".gz"):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def write_fastqc_data(result, path):
+    """Write metrics in the tab-separated layout of FastQC's fastqc_data.txt."""
+    lines = [f"##FastQC\t{NATIVE_QC_VERSION} (native_qc)",
+             ">>Basic Statistics\tpass",
+             "#Measure\tValue",
+             f"Filename\t{result['filename']}",
+             "File type\tConventional base calls",
+             f"Encoding\t{result['encoding']}",
+             f"Total Sequences\t{result['total_sequences']}",
+             f"Sequence length\t{result['sequence_length']['min']}-{result['sequence_length']['max']}",
+             f"%GC\t{round(result['percent_gc'])}",
+             ">>END_MODULE",
+             ">>Per base sequence quality\tpass",
+             "#Base\tMean\tMedian\tLower Quartile\tUpper Quartile\t10th Percentile\t90th Percentile"]
+    lines += ["\t".join(str(row[k]) for k in ("base", "mean", "median", "lower_quartile", "upper_quartile",
+                                              "10th_percentile", "90th_percentile"))
+              for row in result["per_base_quality"]]
+    lines += [">>END_MODULE", ">>Per sequence quality scores\tpass", "#Quality\tCount"]
+    lines += [f"{q}\t{c}" for q, c in result["per_sequence_quality"].items()]
+    lines += [">>END_MODULE", ">>Per base sequence content\tpass", "#Base\tG\tA\tT\tC"]
+    lines += [f"{row['base']}\t{row['G']}\t{row['A']}\t{row['T']}\t{row['C']}" for row in result["per_base_content"]]
+    lines += [">>END_MODULE", ">>Per sequence GC content\tpass", "#GC Content\tCount"]
+    lines += [f"{gc}\t{c}" for gc, c in enumerate(result["gc_content"])]
+    lines += [">>END_MODULE", ">>Per base N content\tpass", "#Base\tN-Count"]
+    lines += [f"{row['base']}\t{row['n_percent']}" for row in result["per_base_n_content"]]
+    lines += [">>END_MODULE", ">>Sequence Length Distribution\tpass", "#Length\tCount"]
+    lines += [f"{length}\t{c}" for length, c in result["length_distribution"].items()]
+    lines += [">>END_MODULE", ">>Sequence Duplication Levels\tpass",
+              f"#Total Deduplicated Percentage\t{result['duplication']['percent_deduplicated']}",
+              "#Duplication Level\tPercentage of total"]
+    lines += [f"{label}\t{pct}" for label, pct in result["duplication"]["levels"].items()]
+    lines.append(">>END_MODULE")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def output_names(input_file):
+    """File names run_native_qc writes for ``input_file``, as declared for NativeQC in module_metadata.json."""
+    prefix = output_prefix(input_file)
+    return [f"{prefix}_fastqc_data.txt", f"{prefix}_qc.json"]
+
+
+def run_native_qc(input_file, output_dir, workers=1, chunk_bytes=None):
+    """Run native QC on one file; writes ``<name>_fastqc_data.txt`` and ``<name>_qc.json``.
+
+    ``workers`` > 1 scatters a large file over that many processes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    result = compute_qc(input_file, workers=workers, chunk_bytes=chunk_bytes, scratch_dir=output_dir)
+    data_path, json_path = (os.path.join(output_dir, name) for name in output_names(input_file))
+    write_fastqc_data(result, data_path)
+    with open(json_path, "w") as f:
+        json.dump(result, f, indent=2)
+    return [data_path, json_path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process FASTQ quality control")
+    parser.add_argument("input_files", nargs="+", help="FASTQ or FASTQ.gz files")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory for QC reports")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Processes to scatter large files over")
+    args = parser.parse_args()
+
+    for path in args.input_files:
+        start = time.perf_counter()
+        run_native_qc(path, args.output_dir, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{path}: {elapsed:.2f}s ({size_mb / elapsed:.1f} MB/s compressed)")
+
+
+if __name__ == "__main__":
+    main()
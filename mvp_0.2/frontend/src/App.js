@@ -17,14 +17,59 @@ function App() {
     }
 
     try {
-      const res = await axios.post(
-        backend_url + '/generate-workflow', 
-        { request: userRequest, automation: automationLevel }, 
-        { withCredentials: true }
-      );
-      setWorkflow(res.data);
-    } catch (error) {
-      console.error('Error generating workflow:', error);
+      await streamWorkflow();
+    } catch (streamError) {
+      console.warn('Streaming unavailable, falling back:', streamError);
+      try {
+        const res = await axios.post(
+          backend_url + '/generate-workflow', 
+          { request: userRequest, automation: automationLevel }, 
+          { withCredentials: true }
+        );
+        setWorkflow(res.data);
+      } catch (error) {
+        console.error('Error generating workflow:', error);
+      }
+    }
+  };
+
+  // Show each workflow step as soon as the backend streams it (Server-Sent Events).
+  const streamWorkflow = async () => {
+    const res = await fetch(backend_url + '/generate-workflow/stream', {
+      method: 'POST',
+      credentials: 'include',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify({ request: userRequest, automation: automationLevel }),
+    });
+    if (!res.ok || !res.body) {
+      throw new Error(`Stream request failed with status ${res.status}`);
+    }
+
+    const steps = [];
+    setWorkflow({ workflow: steps, missing_modules: [] });
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const event = (frame.match(/^event: (.*)$/m) || [])[1] || 'message';
+        const data = JSON.parse((frame.match(/^data: (.*)$/m) || [])[1] || 'null');
+        if (event === 'step') {
+          steps.push(data);
+          setWorkflow({ workflow: [...steps], missing_modules: [] });
+        } else if (event === 'done') {
+          setWorkflow(data);
+        } else if (event === 'error') {
+          console.error('Error generating workflow:', data);
+          setWorkflow(data);
+        }
+      }
     }
   };
 
@@ -40,12 +85,57 @@ function App() {
         { workflow: workflow.workflow }, 
         { withCredentials: true }
       );
-      setRunStatus(res.data.status);
+      const runId = res.data.run_id;
+      setRunStatus(`Run ${runId} ${res.data.status}`);
+      watchRunStatus(runId);
     } catch (error) {
       console.error('Error executing workflow:', error);
     }
   };
 
+  // Runs execute in the background; follow their events until a final status.
+  const watchRunStatus = (runId) => {
+    if (typeof EventSource === 'undefined') {
+      pollRunStatus(runId);
+      return;
+    }
+    const source = new EventSource(backend_url + '/runs/' + runId + '/events', { withCredentials: true });
+    let finished = false;
+    source.addEventListener('status', (e) => {
+      const data = JSON.parse(e.data);
+      setRunStatus(`Run ${runId} ${data.status}`);
+      if (['completed', 'partial', 'failed', 'cancelled'].includes(data.status)) {
+        finished = true;
+        source.close();
+      }
+    });
+    source.addEventListener('step', (e) => {
+      const data = JSON.parse(e.data);
+      setRunStatus(`Run ${runId} running: ${data.module} ${data.status}`);
+    });
+    source.onerror = () => {
+      if (!finished && source.readyState === EventSource.CLOSED) {
+        pollRunStatus(runId);
+      }
+    };
+  };
+
+  // Fallback when event streams are unavailable: poll until a final status.
+  const pollRunStatus = (runId) => {
+    const timer = setInterval(async () => {
+      try {
+        const res = await axios.get(backend_url + '/runs/' + runId, { withCredentials: true });
+        setRunStatus(`Run ${runId} ${res.data.status}`);
+        if (['completed', 'partial', 'failed', 'cancelled'].includes(res.data.status)) {
+          clearInterval(timer);
+        }
+      } catch (error) {
+        console.error('Error fetching run status:', error);
+        clearInterval(timer);
+      }
+    }, 3000);
+  };
+
   return (
     <div className="app-container">
       <div className="card">
@@ -1,53 +1,106 @@
-import openai
 import json
+import asyncio
 import os
-import requests
+import uuid
+import sqlite3
 import logging
+import functools
+import importlib
 import traceback
-from src.run_management.run_executor import execute_run
-from src.run_management.run_tracking import log_run
-from src.run_management.directory_manager import setup_run_directory, move_input_files
-from src.run_management.cli_run_manager import create_run
+from src.run_management.workflow_engine import WorkflowEngine
+from src.run_management.run_tracking import log_run, get_store
+from src.run_management.directory_manager import setup_run_directory, move_input_files, update_run_metadata
+from src.ai_orchestrator.module_registry import ModuleRegistry, MODULE_DATABASE_URL
+from src.ai_orchestrator.response_cache import ResponseCache, get_response_cache
+from src.ai_orchestrator.stream_parser import WorkflowStreamParser
+from src.run_management.profiling import timed
 
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s", force=True)
 
-MODULE_DATABASE_URL = "https://orange-broccoli-54776gp7wv7379g6-5000.app.github.dev/module-database"
 
+MODEL = "gpt-4o"
 
-class AIOrchestrator:
-    def __init__(self, openai_api_key):
-        self.client = openai.OpenAI(api_key=openai_api_key)
-        self.module_tickets = []  # List to track missing module requests
-        self.module_database = self.fetch_module_data()  # Initialize module database
-        logging.debug("✅ AIOrchestrator initialized.")
 
-    def fetch_module_data(self):
-        """Fetches the available bioinformatics modules from the backend module database."""
-        try:
-            logging.debug("🔍 Fetching module data from API...")
-            response = requests.get(MODULE_DATABASE_URL, timeout=10)
+def __getattr__(name):
+    """Resolve ``ai_orchestrator.openai``/``.requests`` although they are no longer imported here.
 
-            if response.status_code == 200:
-                module_data = response.json()
-                logging.debug(f"✅ Successfully fetched module data: {module_data}")
-                return {module["name"]: module for module in module_data}  # Store as dict for easy lookup
+    Together they add most of a second to import time, so methods import them
+    locally on first use instead.
+    """
+    if name in ("openai", "requests"):
+        return importlib.import_module(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-            logging.error(f"⚠️ Failed to fetch module data: {response.status_code} - {response.text}")
-            return {}
 
-        except requests.RequestException as e:
-            logging.error(f"🚨 Error fetching module data: {str(e)}")
-            return {}
+async def run_in_thread(func, *args):
+    """Await ``func(*args)`` on the loop's default thread pool (``asyncio.to_thread`` needs Python 3.9)."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
 
-    def generate_workflow(self, user_request):
-        """Generates a workflow based on user input, checking available modules dynamically."""
-        self.module_database = self.fetch_module_data()  # Ensure the module database is up-to-date
-        available_modules = list(self.module_database.keys())
-        existing_tickets = self.fetch_module_tickets()
-        
 
-        prompt = f"""
+class AIOrchestrator:
+    def __init__(self, openai_api_key, module_db_path=None, registry=None, client=None, response_cache=None,
+                 async_client=None, module_store=None):
+        """``module_db_path`` lets an in-process backend share its module database without HTTP.
+
+        ``client``/``async_client`` replace the OpenAI clients (e.g. with stub clients
+        offline) and ``response_cache`` the process-wide workflow-generation cache.
+        Module tickets are written through ``module_store`` (by default a
+        ModuleStore on ``module_db_path``) when running in-process, else POSTed
+        to MODULE_DATABASE_URL.
+        """
+        self._client = client
+        self._module_db_path = module_db_path
+        self._module_store = module_store
+        self.module_tickets = []  # List to track missing module requests
+        self.registry = registry or ModuleRegistry(MODULE_DATABASE_URL, db_path=module_db_path)
+        self._response_cache = response_cache
+        self._api_key = openai_api_key
+        self._async_client = async_client
+        self._async_http = None
+        logging.debug("✅ AIOrchestrator initialized.")
+
+    @property
+    def module_store(self):
+        """The in-process ModuleStore, or None when the module database is only reachable over HTTP."""
+        if self._module_store is None and self._module_db_path:
+            from src.backend.module_store import ModuleStore
+            self._module_store = ModuleStore(self._module_db_path)
+        return self._module_store
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use so construction stays cheap and offline."""
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(api_key=self._api_key)
+        return self._client
+
+    @property
+    def async_client(self):
+        """AsyncOpenAI client for the async code path, created on first use."""
+        if self._async_client is None:
+            import openai
+            self._async_client = openai.AsyncOpenAI(api_key=self._api_key)
+        return self._async_client
+
+    @property
+    def response_cache(self):
+        if self._response_cache is None:
+            self._response_cache = get_response_cache()
+        return self._response_cache
+
+    @property
+    def module_database(self):
+        return self.registry.modules()
+
+    def fetch_module_data(self):
+        """Available bioinformatics modules keyed by name, from the cached module registry."""
+        return self.registry.modules()
+
+    @staticmethod
+    def _workflow_prompt(user_request, available_modules, existing_tickets):
+        return f"""
         You are an AI bioinformatics orchestrator. Based on the user's request:
         {user_request}
         Generate a workflow using the best-known bioinformatics tools.
@@ -58,72 +111,268 @@ class AIOrchestrator:
 
         Return the output **strictly as a JSON object** with keys 'workflow' and 'missing_modules'.
         """
+
+    def generate_workflow(self, user_request):
+        """Generates a workflow based on user input, checking available modules dynamically."""
+        with timed("registry_fetch"):
+            available_modules = list(self.fetch_module_data().keys())
+            existing_tickets = self.fetch_module_tickets()
+        prompt = self._workflow_prompt(user_request, available_modules, existing_tickets)
         logging.debug(f"🔍 kk: full prompt was: {prompt}")
 
-        response = self.client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="gpt-4o"
-        )
+        # Identical requests against the same module set reuse an earlier plan.
+        cache_key = ResponseCache.make_key(user_request, available_modules, existing_tickets, MODEL)
+        with timed("cache_lookup"):
+            cached_response = self.response_cache.get(cache_key)
+        if cached_response is not None:
+            logging.info("♻️ Reusing cached workflow for an identical request")
+        else:
+            with timed("llm_call"):
+                response = self.client.chat.completions.create(
+                    messages=[{"role": "user", "content": prompt}],
+                    model=MODEL
+                )
 
         try:
-            raw_response = response.choices[0].message.content.strip()
+            raw_response = cached_response or response.choices[0].message.content.strip()
             logging.debug(f"🔍 AI Raw Response: {raw_response}")
             # Remove markdown code block formatting if present
             if raw_response.startswith("```json") and raw_response.endswith("```"):
                 raw_response = raw_response[7:-3].strip()  # Remove ```json and ``` 
             try:
-                workflow_data = json.loads(raw_response)
+                with timed("json_parse"):
+                    workflow_data = json.loads(raw_response)
             except json.JSONDecodeError as e:
                 logging.error(f"🚨 JSON Parsing Error: {e}")
                 return {"error": "AI response was not valid JSON.", "raw_response": raw_response}
-            workflow = workflow_data.get("workflow", {})
-            missing_modules = workflow_data.get("missing_modules", [])
-            logging.debug(f"🔍 existing tickets were: {existing_tickets}")
-            logging.debug(f"🔍 AI returned missing modules as: {missing_modules}")
-
-            for module in missing_modules:
-                logging.warning(f"⚠️ Missing module detected: {module}")
-                self.create_module_ticket(module)
-
-            return {"workflow": workflow, "missing_modules": missing_modules}  # Ensure test compatibility
+            plan, new_tickets = self._record_plan(user_request, available_modules, existing_tickets, workflow_data,
+                                                  cache_key if cached_response is None else None)
+            self.create_module_tickets(new_tickets)
+            return plan
 
         except json.JSONDecodeError as e:
             logging.error(f"🚨 Failed to parse AI response: {str(e)}")
             return {"workflow": {}, "missing_modules": []}  # Ensure test compatibility
-        
-    def fetch_module_tickets(self):
-        """Fetch all existing module tickets from the database."""
+
+    def generate_workflow_stream(self, user_request):
+        """Streaming variant of generate_workflow.
+
+        Yields ``("step", step)`` for each workflow step as soon as the model has
+        finished writing it, then ``("result", plan)`` with the same dict that
+        generate_workflow returns, or ``("error", details)``.
+        """
+        with timed("registry_fetch"):
+            available_modules = list(self.fetch_module_data().keys())
+            existing_tickets = self.fetch_module_tickets()
+        cache_key = ResponseCache.make_key(user_request, available_modules, existing_tickets, MODEL)
+        with timed("cache_lookup"):
+            cached_response = self.response_cache.get(cache_key)
+        parser = WorkflowStreamParser()
+
         try:
-            response = requests.get(f"{MODULE_DATABASE_URL}/module-tickets", timeout=10)
-            if response.status_code == 200:
-                return [ticket["module_name"] for ticket in response.json()]
+            if cached_response is not None:
+                logging.info("♻️ Reusing cached workflow for an identical request")
+                for step in parser.feed(cached_response):
+                    yield "step", step
             else:
-                logging.error(f"⚠️ Failed to fetch module tickets: {response.status_code} - {response.text}")
-                return []
-        except requests.RequestException as e:
-            logging.error(f"🚨 Error fetching module tickets: {str(e)}")
-            return []
+                prompt = self._workflow_prompt(user_request, available_modules, existing_tickets)
+                with timed("llm_call"):  # Until the last token, as the client reads the stream
+                    stream = self.client.chat.completions.create(
+                        messages=[{"role": "user", "content": prompt}],
+                        model=MODEL,
+                        stream=True
+                    )
+                    for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        for step in parser.feed(delta or ""):
+                            yield "step", step
+            with timed("json_parse"):
+                workflow_data = parser.close()
+        except ValueError as e:
+            logging.error(f"🚨 JSON Parsing Error: {e}")
+            yield "error", {"error": "AI response was not valid JSON.", "raw_response": parser.buffer}
+            return
+
+        plan, new_tickets = self._record_plan(user_request, available_modules, existing_tickets, workflow_data,
+                                              cache_key if cached_response is None else None)
+        self.create_module_tickets(new_tickets)
+        yield "result", plan
+
+    async def agenerate_workflow(self, user_request):
+        """Async generate_workflow: the same result, without blocking the event loop."""
+        result = None
+        async for kind, payload in self.agenerate_workflow_stream(user_request):
+            if kind != "step":
+                result = payload
+        return result
+
+    async def agenerate_workflow_stream(self, user_request):
+        """Async generate_workflow_stream for the ASGI app.
+
+        Registry lookups use httpx/aiosqlite, the model is called through
+        AsyncOpenAI and response-cache access runs in worker threads.
+        """
+        with timed("registry_fetch"):
+            available_modules = list((await self.registry.amodules()).keys())
+            existing_tickets = await self.registry.atickets()
+        cache_key = ResponseCache.make_key(user_request, available_modules, existing_tickets, MODEL)
+        with timed("cache_lookup"):
+            cached_response = await run_in_thread(self.response_cache.get, cache_key)
+        parser = WorkflowStreamParser()
 
-    def create_module_ticket(self, module_name):
-        """Logs a ticket for a missing module and syncs it with the backend database."""
-        ticket = {
+        try:
+            if cached_response is not None:
+                logging.info("♻️ Reusing cached workflow for an identical request")
+                for step in parser.feed(cached_response):
+                    yield "step", step
+            else:
+                prompt = self._workflow_prompt(user_request, available_modules, existing_tickets)
+                with timed("llm_call"):
+                    stream = await self.async_client.chat.completions.create(
+                        messages=[{"role": "user", "content": prompt}],
+                        model=MODEL,
+                        stream=True
+                    )
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        for step in parser.feed(delta or ""):
+                            yield "step", step
+            with timed("json_parse"):
+                workflow_data = parser.close()
+        except ValueError as e:
+            logging.error(f"🚨 JSON Parsing Error: {e}")
+            yield "error", {"error": "AI response was not valid JSON.", "raw_response": parser.buffer}
+            return
+
+        plan, new_tickets = await run_in_thread(
+            self._record_plan, user_request, available_modules, existing_tickets, workflow_data,
+            cache_key if cached_response is None else None)
+        await self.acreate_module_tickets(new_tickets)
+        yield "result", plan
+
+    def _record_plan(self, user_request, available_modules, existing_tickets, workflow_data, cache_key=None):
+        """Cache a freshly generated plan (when ``cache_key`` is given).
+
+        The parsed plan is cached re-serialised, not as the model wrote it, so
+        markdown fences or prose around the JSON never reach a cache hit.
+        Returns the plan and the missing modules that still need a ticket.
+        """
+        workflow = workflow_data.get("workflow", {})
+        missing_modules = workflow_data.get("missing_modules", [])
+        logging.debug(f"🔍 existing tickets were: {existing_tickets}")
+        logging.debug(f"🔍 AI returned missing modules as: {missing_modules}")
+        raw_response = json.dumps(workflow_data)
+        if cache_key is not None:
+            self.response_cache.put(cache_key, user_request, raw_response)
+
+        new_tickets = [m for m in missing_modules if m not in existing_tickets]
+        for module in new_tickets:
+            logging.warning(f"⚠️ Missing module detected: {module}")
+        if new_tickets:
+            # The tickets about to be opened change the snapshot; file the plan under that key too.
+            self.response_cache.put(
+                ResponseCache.make_key(user_request, available_modules, existing_tickets + new_tickets, MODEL),
+                user_request, raw_response)
+
+        return {"workflow": workflow, "missing_modules": missing_modules}, new_tickets
+
+    def fetch_module_tickets(self):
+        """Names of modules with an existing ticket, from the cached module registry."""
+        return self.registry.tickets()
+
+    @staticmethod
+    def _ticket_for(module_name):
+        return {
             "module_name": module_name,
             "reason": "Required for workflow execution",
             "status": "pending"
         }
+
+    def create_module_ticket(self, module_name):
+        """Logs a ticket for a missing module and syncs it with the backend database."""
+        ticket = self._ticket_for(module_name)
         self.module_tickets.append(ticket)
         logging.info(f"[TICKET CREATED] Missing Module: {module_name}")
 
+        if self.module_store is not None:
+            try:
+                self.module_store.add_ticket(ticket["module_name"], ticket["reason"])
+                self.registry.invalidate("tickets")
+            except sqlite3.IntegrityError:
+                logging.debug(f"Module ticket already exists: {module_name}")
+            return
+
         # Sync with backend
+        import requests
         try:
             response = requests.post(f"{MODULE_DATABASE_URL}/module-tickets", json=ticket, timeout=10)
             if response.status_code == 201:
                 logging.debug(f"✅ Module ticket synced successfully: {module_name}")
+                self.registry.invalidate("tickets")
             else:
                 logging.error(f"⚠️ Failed to sync module ticket: {response.status_code} - {response.text}")
         except requests.RequestException as e:
             logging.error(f"🚨 Error syncing module ticket: {str(e)}")
 
+    def _queue_tickets(self, module_names):
+        tickets = [self._ticket_for(module) for module in module_names]
+        self.module_tickets.extend(tickets)
+        for module in module_names:
+            logging.info(f"[TICKET CREATED] Missing Module: {module}")
+        return tickets
+
+    def _tickets_synced(self, status_code, body):
+        if status_code in (200, 201):
+            created = [r["module_name"] for r in body.get("results", []) if r["status"] == "created"]
+            logging.debug(f"✅ Module tickets synced successfully: {created}")
+            self.registry.invalidate("tickets")
+        else:
+            logging.error(f"⚠️ Failed to sync module tickets: {status_code} - {body}")
+
+    def create_module_tickets(self, module_names):
+        """Logs tickets for several missing modules and syncs them in one bulk request."""
+        if not module_names:
+            return
+        tickets = self._queue_tickets(module_names)
+        if self.module_store is not None:
+            self._tickets_synced(201, {"results": self.module_store.add_tickets(tickets)})
+            return
+        import requests
+
+        try:
+            response = requests.post(f"{MODULE_DATABASE_URL}/module-tickets/bulk", json=tickets, timeout=10)
+            self._tickets_synced(response.status_code, response.json() if response.ok else response.text)
+        except (requests.RequestException, ValueError) as e:
+            logging.error(f"🚨 Error syncing module tickets: {str(e)}")
+
+    async def acreate_module_tickets(self, module_names):
+        """Async create_module_tickets, over a pooled httpx client."""
+        if not module_names:
+            return
+        tickets = self._queue_tickets(module_names)
+        if self.module_store is not None:
+            self._tickets_synced(201, {"results": await run_in_thread(self.module_store.add_tickets, tickets)})
+            return
+        import httpx
+
+        if self._async_http is None:
+            self._async_http = httpx.AsyncClient(timeout=10)
+        try:
+            response = await self._async_http.post(f"{MODULE_DATABASE_URL}/module-tickets/bulk", json=tickets)
+            self._tickets_synced(response.status_code, response.json() if response.is_success else response.text)
+        except (httpx.HTTPError, ValueError) as e:
+            logging.error(f"🚨 Error syncing module tickets: {str(e)}")
+
+    async def aclose(self):
+        """Close the async HTTP and OpenAI clients (ASGI shutdown)."""
+        await self.registry.aclose()
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+        if self._async_client is not None and hasattr(self._async_client, "close"):
+            await self._async_client.close()
+            self._async_client = None
+
     def refine_workflow(self, workflow):
         """Asks user for refinements before executing the workflow."""
         prompt = f"""
@@ -134,7 +383,7 @@ class AIOrchestrator:
 
         response = self.client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
-            model="gpt-4o"
+            model=MODEL
         )
 
         try:
@@ -143,33 +392,47 @@ class AIOrchestrator:
             logging.error(f"🚨 Failed to parse AI response in refine_workflow: {str(e)}")
             return workflow  # Return the original workflow if AI response is invalid
 
-    def execute_workflow(self, workflow, base_path):
-        """Executes the workflow step-by-step."""
-        input_files = []  # This should come from the user request
+    def execute_workflow(self, workflow, base_path, input_files=None, run_id=None, cancel_check=None,
+                         resources=None):
+        """Executes the workflow as a dependency graph, running independent steps concurrently.
+
+        Pass ``run_id`` to execute (or resume) a run that was already created, e.g.
+        by the job queue; steps that completed in an earlier attempt are not re-run.
+        ``cancel_check`` is polled before each step and file. ``resources``
+        ({"cpus", "memory_mb"}, as admitted by the job scheduler) bounds the
+        steps running at once; by default the whole host is used.
+        """
+        input_files = input_files or []  # This should come from the user request
         if not workflow:
             logging.error("🚨 No steps found in workflow. Execution aborted.")
             return None
 
-        run_id = log_run(input_files, "")
-        run_dir = setup_run_directory(base_path, run_id)
+        if run_id is None:
+            run_id = str(uuid.uuid4())
+            run_dir = setup_run_directory(base_path, run_id)
+            log_run(input_files, os.path.join(run_dir, "output"), run_id=run_id, run_dir=run_dir)
+        else:
+            run_dir = get_store().get_run_directory(run_id) or setup_run_directory(base_path, run_id)
+            get_store().set_output_path(run_id, os.path.join(run_dir, "output"))
+            get_store().index_run(run_id, run_dir)
+        update_run_metadata(run_dir, input_files=input_files, output_dir=os.path.join(run_dir, "output"))
         move_input_files(input_files, os.path.join(run_dir, "input"))
+        staged_inputs = [os.path.join(run_dir, "input", os.path.basename(f)) for f in input_files]
 
-        for step in workflow:  # No longer using workflow["steps"]
-            module_name = step.get("module")
-            params = step.get("params", {})
+        logging.info(f"🚀 Running {len(workflow)} step(s) for run {run_id}")
+        resources = resources or {}
+        engine = WorkflowEngine(run_id, run_dir, staged_inputs, cpu_budget=resources.get("cpus"),
+                                memory_budget_mb=resources.get("memory_mb") or None)
+        status = engine.run(workflow, cancel_check=cancel_check)
+        update_run_metadata(run_dir, status=status)
 
-            if not module_name:
-                logging.warning("⚠️ Skipping step with missing module name.")
-                continue
-
-            logging.info(f"🚀 Running {module_name} with params: {params}")
-            execute_run(run_id, input_files, os.path.join(run_dir, "output"), os.path.join(run_dir, "logs"))
-
-        logging.info("✅ Workflow execution completed.")
+        logging.info(f"✅ Workflow execution finished with status: {status}")
         return run_id
 
     def interactive_cli(self, base_path):
         """Connects AI Orchestrator with CLI for user interaction."""
+        from src.run_management.cli_run_manager import create_run
+
         user_request = create_run([], base_path)  # Mock user input
         workflow_result = self.generate_workflow(user_request)
         workflow = workflow_result["workflow"]  # Ensure compatibility with test expectations
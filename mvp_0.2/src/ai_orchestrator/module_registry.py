@@ -0,0 +1,195 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from src.backend.module_store import ModuleStore, REGISTRY_KINDS
+
+MODULE_DATABASE_URL = "https://orange-broccoli-54776gp7wv7379g6-5000.app.github.dev/module-database"
+DEFAULT_TTL = float(os.getenv("BBD_MODULE_REGISTRY_TTL", "60"))
+
+MODULE_FIELDS = ("name", "description", "input_format", "output_format", "environment")
+
+
+class _Entry:
+    __slots__ = ("value", "version", "checked_at")
+
+    def __init__(self, value, version):
+        self.value = value
+        self.version = version
+        self.checked_at = time.monotonic()
+
+
+class ModuleRegistry:
+    """In-memory cache of the module database and pending module tickets.
+
+    Entries are served from memory for ``ttl`` seconds and then revalidated
+    rather than refetched: over HTTP with ``If-None-Match`` against the
+    backend's ETag, or, when ``db_path`` is given (backend and orchestrator in
+    one process), by comparing the trigger-maintained ``registry_version`` row
+    that the backend's ETags are built from.
+    ``invalidate()`` forces a reload; the backend calls it after module or
+    ticket POSTs. If the source is unreachable, the last known value is kept.
+    The ``a``-prefixed methods do the same without blocking an event loop.
+    """
+
+    def __init__(self, base_url=MODULE_DATABASE_URL, db_path=None, ttl=DEFAULT_TTL, timeout=10):
+        self.base_url = base_url
+        self.db_path = db_path
+        self.ttl = ttl
+        self.timeout = timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._session = None
+        self._async_session = None
+        self._async_lock = None
+
+    def modules(self):
+        """Available modules as a dict keyed by name."""
+        return self._get("modules")
+
+    def tickets(self):
+        """Names of modules with an open ticket."""
+        return self._get("tickets")
+
+    def invalidate(self, kind=None):
+        """Drop cached modules, tickets, or (by default) both."""
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(kind, None)
+
+    async def amodules(self):
+        """Async modules(): non-blocking HTTP (pooled httpx client) or SQLite (aiosqlite) lookups."""
+        return await self._aget("modules")
+
+    async def atickets(self):
+        return await self._aget("tickets")
+
+    async def aclose(self):
+        if self._async_session is not None:
+            await self._async_session.aclose()
+            self._async_session = None
+
+    def _fresh(self, entry):
+        return entry is not None and time.monotonic() - entry.checked_at < self.ttl
+
+    def _keep_stale(self, kind, entry, error):
+        logging.error(f"🚨 Error fetching {kind} from the module registry: {error}")
+        if entry is None:
+            return {} if kind == "modules" else []
+        entry.checked_at = time.monotonic()  # Serve the stale value until the next TTL expiry
+        return entry.value
+
+    def _get(self, kind):
+        with self._lock:
+            entry = self._entries.get(kind)
+            if self._fresh(entry):
+                return entry.value
+            if self.db_path:
+                loader, errors = self._load_sqlite, (sqlite3.Error, ValueError)
+            else:
+                import requests
+                loader, errors = self._load_http, (requests.RequestException, ValueError)
+            try:
+                entry = loader(kind, entry)
+            except errors as e:
+                return self._keep_stale(kind, entry, e)
+            self._entries[kind] = entry
+            return entry.value
+
+    async def _aget(self, kind):
+        import asyncio
+        import httpx
+
+        entry = self._entries.get(kind)
+        if self._fresh(entry):
+            return entry.value
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:  # One refresh at a time; concurrent callers reuse its result
+            entry = self._entries.get(kind)
+            if self._fresh(entry):
+                return entry.value
+            loader = self._aload_sqlite if self.db_path else self._aload_http
+            try:
+                entry = await loader(kind, entry)
+            except (httpx.HTTPError, sqlite3.Error, ValueError) as e:
+                return self._keep_stale(kind, entry, e)
+            with self._lock:
+                self._entries[kind] = entry
+            return entry.value
+
+    def _load_http(self, kind, entry):
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+        url = self.base_url if kind == "modules" else f"{self.base_url}/module-tickets"
+        headers = {"If-None-Match": entry.version} if entry is not None and entry.version else {}
+        response = self._session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry is not None:
+            logging.debug(f"✅ Module registry {kind} unchanged")
+            entry.checked_at = time.monotonic()
+            return entry
+        if response.status_code != 200:
+            raise requests.RequestException(f"{response.status_code} - {response.text}")
+        logging.debug(f"✅ Fetched module registry {kind}")
+        return _Entry(self._shape(kind, response.json()), response.headers.get("ETag"))
+
+    async def _aload_http(self, kind, entry):
+        import httpx
+
+        if self._async_session is None:
+            self._async_session = httpx.AsyncClient(timeout=self.timeout,
+                                                    limits=httpx.Limits(max_keepalive_connections=10))
+        url = self.base_url if kind == "modules" else f"{self.base_url}/module-tickets"
+        headers = {"If-None-Match": entry.version} if entry is not None and entry.version else {}
+        response = await self._async_session.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            entry.checked_at = time.monotonic()
+            return entry
+        response.raise_for_status()
+        return _Entry(self._shape(kind, response.json()), response.headers.get("ETag"))
+
+    def _load_sqlite(self, kind, entry):
+        with closing(sqlite3.connect(self.db_path, timeout=self.timeout)) as conn:
+            version = conn.execute(ModuleStore.VERSION_SQL, (kind,)).fetchone()
+            if entry is not None and entry.version == version:
+                entry.checked_at = time.monotonic()
+                return entry
+            rows = conn.execute(self._select_sql(kind)).fetchall()
+        return _Entry(self._rows_to_value(kind, rows), version)
+
+    async def _aload_sqlite(self, kind, entry):
+        import aiosqlite
+
+        async with aiosqlite.connect(self.db_path, timeout=self.timeout) as conn:
+            async with conn.execute(ModuleStore.VERSION_SQL, (kind,)) as cursor:
+                version = await cursor.fetchone()
+            if entry is not None and entry.version == version:
+                entry.checked_at = time.monotonic()
+                return entry
+            async with conn.execute(self._select_sql(kind)) as cursor:
+                rows = await cursor.fetchall()
+        return _Entry(self._rows_to_value(kind, rows), version)
+
+    @staticmethod
+    def _select_sql(kind):
+        if kind == "modules":
+            return f"SELECT {', '.join(MODULE_FIELDS)} FROM modules"
+        return f"SELECT module_name FROM {REGISTRY_KINDS[kind]}"
+
+    @classmethod
+    def _rows_to_value(cls, kind, rows):
+        if kind == "modules":
+            return cls._shape(kind, [dict(zip(MODULE_FIELDS, row)) for row in rows])
+        return cls._shape(kind, [{"module_name": row[0]} for row in rows])
+
+    @staticmethod
+    def _shape(kind, data):
+        if kind == "modules":
+            return {module["name"]: module for module in data}
+        return [ticket["module_name"] for ticket in data]
@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from src.run_management.run_tracking import get_store
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+
+_PUNCTUATION = re.compile(r"[^\w\s+#./-]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise_request(text):
+    """Canonical form of a user request, so trivially different phrasings share a cache key.
+
+    Unicode is NFKC-normalised and case-folded, punctuation that does not carry
+    meaning in tool or file names is dropped and whitespace is collapsed:
+    "Run  RNA-seq analysis!" and "run rna-seq analysis" normalise alike.
+    """
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip(" .")
+
+
+class ResponseCache:
+    """Persistent cache of LLM workflow-generation responses.
+
+    Entries are keyed on the normalised user request, the model, and snapshots
+    of the available modules and pending tickets, so a change to the module
+    registry never serves a plan built for a different module set. Entries
+    expire after ``ttl`` seconds and the cache is kept under ``max_entries``
+    by evicting the least recently used ones. The index and hit/miss counters
+    live in the run store, so they survive restarts.
+    """
+
+    def __init__(self, run_store=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.run_store = run_store or get_store()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self.run_store.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    request TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hit_count INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_response_cache_lru ON llm_response_cache(last_access)")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_response_cache_stats (
+                    counter TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+
+    @staticmethod
+    def make_key(user_request, modules, tickets, model):
+        """Cache key for a request given the module and ticket snapshots it was planned against."""
+        payload = json.dumps({
+            "request": normalise_request(user_request),
+            "modules": sorted({str(m).lower() for m in modules}),
+            "tickets": sorted({str(t).lower() for t in tickets}),
+            "model": model,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _count(self, conn, counter, amount=1):
+        conn.execute('''
+            INSERT INTO llm_response_cache_stats (counter, value) VALUES (?, ?)
+            ON CONFLICT(counter) DO UPDATE SET value = value + excluded.value
+        ''', (counter, amount))
+
+    def get(self, key):
+        """Cached response text for ``key``, or None on a miss or an expired entry."""
+        now = time.time()
+        with self.run_store.transaction() as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_response_cache WHERE cache_key = ?",
+                               (key,)).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+                self._count(conn, "expired")
+                row = None
+            if row is None:
+                self._count(conn, "misses")
+                return None
+            conn.execute('''
+                UPDATE llm_response_cache SET last_access = ?, hit_count = hit_count + 1 WHERE cache_key = ?
+            ''', (now, key))
+            self._count(conn, "hits")
+        return row[0]
+
+    def put(self, key, user_request, response):
+        """Store a response and evict entries beyond ``max_entries``."""
+        now = time.time()
+        with self.run_store.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_response_cache (cache_key, request, response, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (key, user_request, response, now, now))
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones beyond ``max_entries``."""
+        with self._lock, self.run_store.transaction() as conn:
+            evicted = 0
+            if self.ttl:
+                evicted += conn.execute("DELETE FROM llm_response_cache WHERE created_at < ?",
+                                        (time.time() - self.ttl,)).rowcount
+            evicted += conn.execute('''
+                DELETE FROM llm_response_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)
+            ''', (self.max_entries,)).rowcount
+            if evicted:
+                self._count(conn, "evictions", evicted)
+                logging.info(f"LLM response cache evicted {evicted} entr{'y' if evicted == 1 else 'ies'}")
+
+    def clear(self):
+        with self.run_store.transaction() as conn:
+            conn.execute("DELETE FROM llm_response_cache")
+
+    def stats(self):
+        """Hit/miss/expiry counters, hit rate and current entry count."""
+        conn = self.run_store.connection()
+        counters = dict(conn.execute("SELECT counter, value FROM llm_response_cache_stats").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0]
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "expired": counters.get("expired", 0),
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Return the process-wide ResponseCache.
+
+    BBD_LLM_CACHE_TTL (seconds, 0 disables expiry) and BBD_LLM_CACHE_MAX_ENTRIES
+    override the defaults.
+    """
+    global _cache
+    with _cache_lock:
+        store = get_store()
+        if _cache is None or _cache.run_store is not store:
+            _cache = ResponseCache(store,
+                                   ttl=float(os.environ.get("BBD_LLM_CACHE_TTL", DEFAULT_TTL)),
+                                   max_entries=int(os.environ.get("BBD_LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+        return _cache
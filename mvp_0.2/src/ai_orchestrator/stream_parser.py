@@ -0,0 +1,97 @@
+import json
+
+
+class WorkflowStreamParser:
+    """Incremental parser for a streamed ``{"workflow": [...], "missing_modules": [...]}`` reply.
+
+    Feed it text deltas as they arrive; ``feed`` returns the elements of the
+    top-level ``workflow`` array that became complete, so each step can be
+    shown before the model has finished. Only the characters added since the
+    previous call are scanned. A leading markdown fence is ignored, and
+    ``close`` parses the whole reply once the stream ends.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._started = False
+        self._stack = []  # One (bracket, key) per open object/array
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._workflow_depth = None
+        self._element_start = None
+        self.steps = []
+
+    def feed(self, text):
+        """Add streamed text; returns the workflow steps completed by it."""
+        self.buffer += text
+        completed = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._open("{")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buf[self._string_start + 1:i]
+                continue
+            if not self._stack:
+                continue  # Trailing text after the reply, e.g. a closing fence
+
+            in_workflow = self._workflow_depth is not None and len(self._stack) == self._workflow_depth
+            if in_workflow and self._element_start is None and ch not in " \t\r\n,]":
+                self._element_start = i
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._open(ch)
+            elif ch in "}]":
+                if in_workflow and self._element_start is not None:
+                    completed.append(self._element(i))  # Scalar element before "]"
+                self._stack.pop()
+                if self._workflow_depth is not None:
+                    if len(self._stack) == self._workflow_depth and self._element_start is not None:
+                        completed.append(self._element(i + 1))  # A nested step just closed
+                    elif len(self._stack) < self._workflow_depth:
+                        self._workflow_depth = None
+            elif ch == "," and in_workflow and self._element_start is not None:
+                completed.append(self._element(i))
+        self._pos = len(buf)
+        self.steps.extend(completed)
+        return completed
+
+    def _open(self, ch):
+        key = None
+        if self._stack and self._stack[-1][0] == "{":
+            key = self._last_string
+        self._stack.append((ch, key))
+        if ch == "[" and len(self._stack) == 2 and key == "workflow":
+            self._workflow_depth = len(self._stack)
+
+    def _element(self, end):
+        text = self.buffer[self._element_start:end].strip()
+        self._element_start = None
+        return json.loads(text)
+
+    def close(self):
+        """Parse the complete reply, ignoring any fence or text around the object.
+
+        Raises ValueError if it holds no valid JSON object.
+        """
+        start, end = self.buffer.find("{"), self.buffer.rfind("}")
+        if start == -1 or end < start:
+            raise ValueError("No JSON object in the response")
+        return json.loads(self.buffer[start:end + 1])
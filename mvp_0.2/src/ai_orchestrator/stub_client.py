@@ -0,0 +1,50 @@
+import json
+from types import SimpleNamespace
+
+EMPTY_PLAN = json.dumps({"workflow": [], "missing_modules": []})
+
+
+class StubChatClient:
+    """Offline stand-in for ``openai.OpenAI`` that returns canned chat completions.
+
+    ``responses`` are returned in order (then ``default``); an item may be a
+    callable taking the messages. With ``stream=True`` the content arrives in
+    deltas of ``chunk_size`` characters. Every call is recorded in ``calls`` so
+    tests can assert how often the model would have been billed.
+    """
+
+    def __init__(self, responses=None, default=EMPTY_PLAN, chunk_size=16):
+        self.responses = list(responses or [])
+        self.default = default
+        self.chunk_size = chunk_size
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model, stream=False, **kwargs):
+        self.calls.append({"messages": messages, "model": model, "stream": stream, **kwargs})
+        content = self.responses.pop(0) if self.responses else self.default
+        if callable(content):
+            content = content(messages)
+        if stream:
+            return (SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + self.chunk_size]))])
+                    for i in range(0, len(content), self.chunk_size))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class AsyncStubChatClient(StubChatClient):
+    """StubChatClient with the ``openai.AsyncOpenAI`` interface."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate))
+
+    async def _acreate(self, messages, model, stream=False, **kwargs):
+        response = self._create(messages, model, stream=stream, **kwargs)
+        if not stream:
+            return response
+        return self._aiter(list(response))
+
+    @staticmethod
+    async def _aiter(chunks):
+        for chunk in chunks:
+            yield chunk
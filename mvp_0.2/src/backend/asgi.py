@@ -0,0 +1,199 @@
+"""
+ASGI entry point for the backend API.
+
+    uvicorn src.backend.asgi:app --host 0.0.0.0 --port 5000
+
+Workflow generation (``/generate-workflow`` and ``/generate-workflow/stream``)
+is served natively on the event loop through the orchestrator's async path, so
+an in-flight LLM call holds a coroutine rather than a worker thread and one
+process can keep hundreds of them open. Run event streams
+(``/runs/<run_id>/events``) are served the same way, so idle subscribers cost
+no threads. Every other route is the Flask app, run in a thread pool through
+asgiref's WSGI adapter.
+"""
+import re
+import json
+import asyncio
+import logging
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from src.backend import backend_api
+from src.ai_orchestrator.ai_orchestrator import run_in_thread
+
+_flask = WsgiToAsgi(backend_api.app)
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def _headers(scope, content_type):
+    headers = [(b"content-type", content_type.encode())]
+    origin = dict(scope.get("headers", [])).get(b"origin", b"").decode()
+    if origin == backend_api.frontend_url:  # Same CORS policy as the Flask routes
+        headers += [(b"access-control-allow-origin", origin.encode()),
+                    (b"access-control-allow-credentials", b"true")]
+    return headers
+
+
+async def _send_json(scope, send, status, payload):
+    await send({"type": "http.response.start", "status": status,
+                "headers": _headers(scope, "application/json")})
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+async def _request_data(scope, receive):
+    """JSON body of a POST, or the query parameters of a GET; None if the client went away."""
+    body = await _read_body(receive)
+    if body is None:
+        return None
+    if scope["method"] == "GET":
+        return {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+    try:
+        return json.loads(body or b"{}")
+    except ValueError:
+        return {}
+
+
+async def generate_workflow(scope, receive, send):
+    data = await _request_data(scope, receive)
+    if data is None:
+        return
+    user_request = data.get("request")
+    if not user_request:
+        return await _send_json(scope, send, 400, {"error": "Missing user request"})
+    try:
+        result = await backend_api.orchestrator.agenerate_workflow(user_request)
+    except Exception as e:
+        return await _send_json(scope, send, 500, {"error": f"Failed to generate workflow: {str(e)}"})
+    await _send_json(scope, send, 200, result)
+
+
+async def generate_workflow_stream(scope, receive, send):
+    """Server-Sent Events, as the Flask route; generation stops if the client disconnects."""
+    data = await _request_data(scope, receive)
+    if data is None:
+        return
+    user_request = data.get("request")
+    if not user_request:
+        return await _send_json(scope, send, 400, {"error": "Missing user request"})
+
+    async def pump():
+        headers = _headers(scope, "text/event-stream") + [(b"cache-control", b"no-cache"),
+                                                           (b"x-accel-buffering", b"no")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        try:
+            async for kind, payload in backend_api.orchestrator.agenerate_workflow_stream(user_request):
+                event = {"result": "done"}.get(kind, kind)
+                frame = f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+                await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+        except Exception as e:
+            logging.error(f"🚨 Streaming workflow generation failed: {e}")
+            frame = f"event: error\ndata: {json.dumps({'error': f'Failed to generate workflow: {e}'})}\n\n"
+            await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    producer = asyncio.ensure_future(pump())
+    watcher = asyncio.ensure_future(watch_disconnect())
+    done, _ = await asyncio.wait({producer, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    if watcher in done:
+        logging.debug("🔌 Client disconnected; cancelling workflow generation")
+        producer.cancel()
+    watcher.cancel()
+    await asyncio.gather(producer, watcher, return_exceptions=True)
+    if producer in done and producer.exception():
+        raise producer.exception()
+
+
+async def run_events(scope, receive, send, run_id):
+    """The Flask ``/runs/<run_id>/events`` stream, awaiting events instead of blocking a thread."""
+    headers = {k.decode().lower(): v.decode() for k, v in scope.get("headers", [])}
+    query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+    last_event_id = backend_api.last_event_id_from({"Last-Event-ID": headers.get("last-event-id")}, query)
+    opened = await run_in_thread(backend_api.open_run_events, run_id, last_event_id)
+    if opened is None:
+        return await _send_json(scope, send, 404, {"error": "Run not found"})
+    subscription, current = opened
+
+    async def pump():
+        headers = _headers(scope, "text/event-stream") + [(b"cache-control", b"no-cache"),
+                                                           (b"x-accel-buffering", b"no")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        event, finished = current, backend_api.is_final(current)
+        while True:
+            frame = backend_api.sse_frame(event) if event is not None else ": keepalive\n\n"
+            await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+            if event is not None and event is not current and backend_api.is_final(event):
+                break
+            event = await subscription.aget(timeout=0 if finished else backend_api.EVENT_KEEPALIVE)
+            if event is None and finished:
+                break
+        await send({"type": "http.response.body", "body": b""})
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    with subscription:
+        producer = asyncio.ensure_future(pump())
+        watcher = asyncio.ensure_future(watch_disconnect())
+        await asyncio.wait({producer, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        producer.cancel()
+        watcher.cancel()
+        await asyncio.gather(producer, watcher, return_exceptions=True)
+
+
+ASYNC_ROUTES = {
+    ("POST", "/generate-workflow"): generate_workflow,
+    ("GET", "/generate-workflow/stream"): generate_workflow_stream,
+    ("POST", "/generate-workflow/stream"): generate_workflow_stream,
+}
+ASYNC_PATTERNS = [
+    ("GET", re.compile(r"^/runs/([^/]+)/events$"), run_events),
+]
+
+
+def _route(method, path):
+    """Native handler for a request, with its path parameters bound; None for Flask routes."""
+    handler = ASYNC_ROUTES.get((method, path))
+    if handler is not None:
+        return handler
+    for route_method, pattern, handler in ASYNC_PATTERNS:
+        match = pattern.match(path) if method == route_method else None
+        if match:
+            return lambda scope, receive, send: handler(scope, receive, send, *match.groups())
+    return None
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await backend_api.orchestrator.aclose()
+            if backend_api.job_workers is not None:
+                await run_in_thread(backend_api.job_workers.stop, 30)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    handler = _route(scope.get("method"), scope.get("path")) if scope["type"] == "http" else None
+    if handler is None:
+        return await _flask(scope, receive, send)
+    logging.debug(f"🛠 Incoming request: {scope['method']} {scope['path']} (async)")
+    await handler(scope, receive, send)
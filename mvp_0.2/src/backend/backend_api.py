@@ -1,7 +1,19 @@
 import os
 import sqlite3
-from flask import Flask, request, jsonify
+import json
+import time
+from flask import Flask, Response, request, jsonify, stream_with_context
 from src.ai_orchestrator import AIOrchestrator
+from src.ai_orchestrator.stub_client import StubChatClient, AsyncStubChatClient
+from src.run_management.run_tracking import get_store
+from src.backend.module_store import ModuleStore
+from src.run_management.job_queue import JobQueue, JobWorkerPool, LEASE_SECONDS, raise_for_run_status
+from src.run_management.executors import make_executor
+from src.run_management.scheduler import DEFAULT_USER, host_capacity, job_demand
+from src.run_management.run_executor import run_qc_job
+from src.run_management.events import get_event_bus, TERMINAL_STATUSES
+from src.run_management.profiling import render_metrics
+from src.run_management.process_io import tail_log, is_active, DEFAULT_TAIL_LINES
 import logging
 import traceback
 from flask_cors import CORS
@@ -16,14 +28,68 @@ print("✅ Logging Initialized...")  # Ensure this prints
 logging.debug("Backend API is starting...")
 
 app = Flask(__name__)
-DB_PATH = "/workspaces/BBD.bio_4/mvp_0.2/db/module_database.db"
+module_store = ModuleStore()  # Pooled WAL connections to db/module_database.db (BBD_MODULE_DB)
+DB_PATH = module_store.db_path
 
 # Initialize AI Orchestrator
 API_KEY = os.getenv("OPENAI_API_KEY")
-if not API_KEY:
+USE_LLM_STUB = os.getenv("BBD_LLM_STUB") == "1"  # Offline development: canned, empty workflow plans
+if not API_KEY and not USE_LLM_STUB:
     raise ValueError("🚨 Missing OpenAI API Key! Set it with 'export OPENAI_API_KEY=your_key'")
 
-orchestrator = AIOrchestrator(API_KEY)
+orchestrator = AIOrchestrator(API_KEY, module_db_path=DB_PATH,  # Same process: read the module registry directly
+                              module_store=module_store,
+                              client=StubChatClient() if USE_LLM_STUB else None,
+                              async_client=AsyncStubChatClient() if USE_LLM_STUB else None)
+
+# Workflow runs are queued in the run store and executed by background workers,
+# so /execute-workflow returns as soon as the run is recorded. BBD_EXECUTOR picks
+# where: "local" threads, a "process" pool, or "remote" workers claiming via /jobs.
+EXECUTOR = os.getenv("BBD_EXECUTOR", "local")
+EXECUTOR_WORKERS = int(os.getenv("BBD_EXECUTOR_WORKERS", "2"))
+job_queue = None
+job_workers = None
+
+
+def run_workflow_job(run_id, payload, is_cancelled):
+    """Job handler: execute a queued workflow run."""
+    orchestrator.execute_workflow(payload["workflow"], payload["base_path"],
+                                  input_files=payload.get("input_files"),
+                                  run_id=run_id, cancel_check=is_cancelled,
+                                  resources=payload.get("resources"))
+    raise_for_run_status(run_id, is_cancelled)
+
+
+_run_store_ready = False
+
+def initialized_store():
+    """The run store, with its tables created on first use."""
+    global _run_store_ready
+    if not _run_store_ready:
+        get_store().initialize()
+        _run_store_ready = True
+    return get_store()
+
+
+def get_job_workers():
+    """Start the executor worker pool on first use.
+
+    Local and process workers only start jobs that fit in this host's
+    capacity (``scheduler.host_capacity``). With remote workers the pool runs
+    no jobs itself; it only re-queues jobs whose worker stopped renewing its lease.
+    Jobs a previous backend process was running go back to the queue the same
+    way, once their lease expires, so several backend processes (e.g.
+    ``uvicorn --workers N``) never take live jobs from each other.
+    """
+    global job_queue, job_workers
+    if job_workers is None:
+        get_store().initialize()
+        job_queue = JobQueue(get_store())
+        job_workers = JobWorkerPool(job_queue, {"workflow": run_workflow_job, "qc": run_qc_job},
+                                    workers=0 if EXECUTOR == "remote" else EXECUTOR_WORKERS,
+                                    executor=make_executor(EXECUTOR, EXECUTOR_WORKERS, get_store()),
+                                    capacity=None if EXECUTOR == "remote" else host_capacity()).start()
+    return job_workers
 
 
 @app.before_request
@@ -42,33 +108,29 @@ def add_cors_headers(response):
     if origin == frontend_url:  # Allow only the frontend
         response.headers["Access-Control-Allow-Origin"] = origin
         response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, DELETE, OPTIONS"
         response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
     return response
 
 def init_db():
     """Initialize the database to store module information and tickets."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS modules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                description TEXT,
-                input_format TEXT,
-                output_format TEXT,
-                environment TEXT  -- Python, R, Shell, Docker, Conda
-            )
-        ''')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS module_tickets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                module_name TEXT UNIQUE,
-                reason TEXT,
-                status TEXT DEFAULT 'pending'
-            )
-        ''')
-        conn.commit()
+    module_store.initialize()
+
+
+def registry_response(items, etag):
+    """JSON list response tagged with the registry ETag."""
+    response = jsonify(items)
+    response.set_etag(etag)
+    return response
+
+
+def not_modified(etag):
+    """304 for a client whose If-None-Match still matches ``etag``, else None."""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
 
 
 @app.route('/generate-workflow', methods=['POST'])
@@ -88,6 +150,46 @@ def generate_workflow():
         return jsonify({"error": f"Failed to generate workflow: {str(e)}"}), 500
 
 
+@app.route('/generate-workflow/stream', methods=['GET', 'POST'])
+def generate_workflow_stream():
+    """Server-Sent Events: one ``step`` event per workflow step as it is generated, then ``done``."""
+    data = request.get_json(silent=True) or request.args
+    user_request = data.get('request')
+    if not user_request:
+        return jsonify({"error": "Missing user request"}), 400
+
+    def events():
+        started = time.monotonic()
+        first_step = None
+        try:
+            for kind, payload in orchestrator.generate_workflow_stream(user_request):
+                if kind == "step" and first_step is None:
+                    first_step = time.monotonic() - started
+                    logging.debug(f"⏱ First workflow step after {first_step:.2f}s")
+                event = {"result": "done"}.get(kind, kind)
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            logging.error(f"🚨 Streaming workflow generation failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': f'Failed to generate workflow: {e}'})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint: runs by status, job queue, per-module step resources, orchestrator stage timings."""
+    queue_stats = job_queue.queue_stats() if job_queue is not None else None  # Once workers have started
+    return Response(render_metrics(initialized_store(), queue_stats),
+                    mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/generate-workflow/cache-stats', methods=['GET'])
+def generate_workflow_cache_stats():
+    """Hit rate and size of the workflow-generation response cache."""
+    return jsonify(orchestrator.response_cache.stats()), 200
+
+
 @app.route('/execute-workflow', methods=['POST'])
 def execute_workflow():
     data = request.get_json()
@@ -98,10 +200,261 @@ def execute_workflow():
         return jsonify({"error": "No workflow provided"}), 400
     
     try:
-        run_id = orchestrator.execute_workflow(workflow, base_path)
-        return jsonify({"status": f"Run {run_id} completed"})
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "priority must be an integer"}), 400
+
+    try:
+        workers = get_job_workers()
+        input_files = data.get('input_files', [])
+        payload = {"workflow": workflow, "base_path": base_path, "input_files": input_files}
+        resources = job_demand("workflow", payload, input_files, module_store.module_resources())
+        user = data.get('user') or DEFAULT_USER
+        run_id = job_queue.submit("workflow", payload, input_files, user=user, priority=priority,
+                                  resources=resources)
+        workers.notify()
+        return jsonify({"run_id": run_id, "status": "queued", "status_url": f"/runs/{run_id}",
+                        "user": user, "priority": priority, "resources": resources}), 202
     except Exception as e:
-        return jsonify({"error": f"Workflow execution failed: {str(e)}"}), 500
+        return jsonify({"error": f"Workflow submission failed: {str(e)}"}), 500
+
+
+@app.route('/runs/<run_id>', methods=['GET', 'DELETE'])
+def run_status(run_id):
+    """Report a submitted run's status (GET) or cancel it (DELETE)."""
+    get_job_workers()
+    if request.method == 'DELETE':
+        status = job_queue.cancel(run_id)
+        if status is None:
+            return jsonify({"error": "Run not found"}), 404
+        if status not in ("cancelled", "running"):
+            return jsonify({"error": f"Run already {status}", "status": status}), 409
+        return jsonify({"run_id": run_id, "status": status,
+                        "message": "Cancelled" if status == "cancelled" else "Cancellation requested"}), 202
+
+    run = get_store().get_run(run_id)
+    if run is None:
+        return jsonify({"error": "Run not found"}), 404
+    steps = get_store().get_step_states(run_id)
+    job = job_queue.get(run_id) or {}
+    files = [
+        {"input_file": f, "status": status, "return_code": rc, "log_path": log_path}
+        for f, status, rc, log_path in get_store().get_file_statuses(run_id)
+    ]
+    return jsonify({
+        "run_id": run_id,
+        "status": run[4],
+        "job_status": job.get("status"),
+        "submitted_at": job.get("submitted_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "queue_wait_seconds": job.get("queue_wait_seconds"),
+        "user": job.get("user"),
+        "priority": job.get("priority"),
+        "resources": {"cpus": job["cpus"], "memory_mb": job["memory_mb"]} if job else None,
+        "error": job.get("error"),
+        "output_path": run[3],
+        "steps": steps,
+        "files": files,
+        "metrics": get_store().get_step_metrics(run_id),
+    }), 200
+
+
+EVENT_KEEPALIVE = 15  # Seconds between SSE keep-alive comments on an idle run event stream
+
+
+def sse_frame(event):
+    """A run event as one Server-Sent Events frame; its ``id`` lets clients resume with Last-Event-ID."""
+    event_id = f"id: {event['id']}\n" if event.get("id") else ""
+    return f"{event_id}event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def open_run_events(run_id, last_event_id=None):
+    """Subscribe to a run's events; returns (subscription, current-status event), or None if unknown.
+
+    The subscription is opened before the status is read, so no transition is missed.
+    """
+    subscription = get_event_bus().subscribe(run_id, last_event_id)
+    run = get_store().get_run(run_id)
+    if run is None:
+        subscription.close()
+        return None
+    return subscription, {"run_id": run_id, "type": "status", "status": run[4]}
+
+
+def is_final(event):
+    return event["type"] == "status" and event["status"] in TERMINAL_STATUSES
+
+
+def last_event_id_from(headers, args):
+    value = headers.get("Last-Event-ID") or args.get("last_event_id")
+    return int(value) if value and str(value).isdigit() else None
+
+
+@app.route('/runs/<run_id>/events', methods=['GET'])
+def run_events(run_id):
+    """Server-Sent Events: the run's current status, then status, step and file events as they happen.
+
+    The stream ends once the run reaches a final status.
+    """
+    opened = open_run_events(run_id, last_event_id_from(request.headers, request.args))
+    if opened is None:
+        return jsonify({"error": "Run not found"}), 404
+    subscription, current = opened
+
+    def events():
+        with subscription:
+            yield sse_frame(current)
+            finished = is_final(current)
+            while True:
+                event = subscription.get(timeout=0 if finished else EVENT_KEEPALIVE)
+                if event is None:
+                    if finished:
+                        return  # Replayed events (if any) have been sent
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_frame(event)
+                if is_final(event):
+                    return
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+MAX_TAIL_LINES = 5000  # Upper bound on ?lines= for the log tail endpoint
+
+
+def run_log_dir(run_id):
+    """A run's ``logs`` directory, or None if the run is unknown."""
+    run_dir = get_store().get_run_directory(run_id)
+    if run_dir is None:
+        run = get_store().get_run(run_id)
+        if run is None or not run[3]:
+            return None
+        run_dir = os.path.dirname(os.path.normpath(run[3]))
+    return os.path.join(run_dir, "logs")
+
+
+@app.route('/runs/<run_id>/logs', methods=['GET'])
+def run_logs(run_id):
+    """List a run's step logs (including rotated backups), with their size and whether they are being written.
+
+    Gzipped backups are left out, as they cannot be tailed.
+    """
+    log_dir = run_log_dir(run_id)
+    if log_dir is None:
+        return jsonify({"error": "Run not found"}), 404
+    logs = []
+    for dirpath, _, filenames in os.walk(log_dir):
+        for name in sorted(filenames):
+            if name.endswith((".gz", ".gz.tmp")):
+                continue
+            path = os.path.join(dirpath, name)
+            logs.append({"name": os.path.relpath(path, log_dir), "size": os.path.getsize(path),
+                         "active": is_active(path)})
+    return jsonify({"run_id": run_id, "logs": sorted(logs, key=lambda log: log["name"])}), 200
+
+
+@app.route('/runs/<run_id>/logs/<path:log_name>', methods=['GET'])
+def run_log_tail(run_id, log_name):
+    """The last ``?lines=N`` lines of a step log, served from memory while the step is still running."""
+    log_dir = run_log_dir(run_id)
+    if log_dir is None:
+        return jsonify({"error": "Run not found"}), 404
+    path = os.path.realpath(os.path.join(log_dir, log_name))
+    if not path.startswith(os.path.realpath(log_dir) + os.sep):
+        return jsonify({"error": "Invalid log name"}), 400
+    if path.endswith((".gz", ".gz.tmp")) or not os.path.isfile(path) and not is_active(path):
+        return jsonify({"error": "Log not found"}), 404
+    try:
+        lines = min(max(int(request.args.get("lines", DEFAULT_TAIL_LINES)), 1), MAX_TAIL_LINES)
+    except ValueError:
+        return jsonify({"error": "lines must be an integer"}), 400
+    tail, active = tail_log(path, lines)
+    return jsonify({"run_id": run_id, "log": log_name, "active": active, "lines": tail}), 200
+
+
+@app.route('/runs/<run_id>/resume', methods=['POST'])
+def resume_run(run_id):
+    """Re-queue a failed or cancelled run; completed workflow steps are not re-run."""
+    workers = get_job_workers()
+    if job_queue.get(run_id) is None:
+        return jsonify({"error": "Run not found"}), 404
+    if not job_queue.resubmit(run_id):
+        return jsonify({"error": "Only failed or cancelled runs can be resumed"}), 409
+    workers.notify()
+    return jsonify({"run_id": run_id, "status": "queued", "status_url": f"/runs/{run_id}"}), 202
+
+
+def _lease_seconds(data):
+    """The ``lease_seconds`` a worker asked for, LEASE_SECONDS by default; ValueError unless a positive number."""
+    lease_seconds = float(data.get("lease_seconds") or LEASE_SECONDS)
+    if not 0 < lease_seconds < float("inf"):
+        raise ValueError(lease_seconds)
+    return lease_seconds
+
+
+@app.route('/jobs/claim', methods=['POST'])
+def claim_job():
+    """Remote workers: lease the next queued job that fits in ``free``; 204 when there is none."""
+    get_job_workers()
+    data = request.get_json(silent=True) or {}
+    if not data.get("worker_id"):
+        return jsonify({"error": "Missing worker_id"}), 400
+    try:
+        lease_seconds = _lease_seconds(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "lease_seconds must be a positive number"}), 400
+    job = job_queue.claim(data["worker_id"], lease_seconds, data.get("free"))
+    if job is None:
+        return "", 204
+    run_id, kind, payload = job
+    run = get_store().get_run(run_id)
+    return jsonify({"run_id": run_id, "kind": kind, "payload": payload,
+                    "run": {"input_files": json.loads(run[2]), "output_path": run[3],
+                            "run_dir": get_store().get_run_directory(run_id)}}), 200
+
+
+@app.route('/queue', methods=['GET'])
+def queue_status():
+    """Queued and running jobs per user, recent queue wait times and this host's capacity."""
+    workers = get_job_workers()
+    return jsonify({"capacity": workers.capacity, **job_queue.queue_stats()}), 200
+
+
+@app.route('/jobs/<run_id>/heartbeat', methods=['POST'])
+def job_heartbeat(run_id):
+    """Remote workers: renew a lease; 409 once the job was handed to another worker."""
+    get_job_workers()
+    data = request.get_json(silent=True) or {}
+    try:
+        lease_seconds = _lease_seconds(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "lease_seconds must be a positive number"}), 400
+    cancel_requested = job_queue.heartbeat(run_id, data.get("worker_id"), lease_seconds)
+    if cancel_requested is None:
+        return jsonify({"error": "Lease lost"}), 409
+    return jsonify({"run_id": run_id, "cancel_requested": cancel_requested}), 200
+
+
+@app.route('/jobs/<run_id>/finish', methods=['POST'])
+def job_finish(run_id):
+    """Remote workers: record a job's outcome with the run status, file statuses and metrics it produced."""
+    get_job_workers()
+    data = request.get_json(silent=True) or {}
+    if data.get("status") not in ("completed", "failed", "cancelled"):
+        return jsonify({"error": "status must be completed, failed or cancelled"}), 400
+    if not job_queue.finish(run_id, data["status"], data.get("error"), worker_id=data.get("worker_id")):
+        return jsonify({"error": "Lease lost"}), 409
+    with get_store().batch() as batch:
+        for f in data.get("files") or []:
+            batch.log_file_status(run_id, f["input_file"], f["status"], f.get("return_code"), f.get("log_path"))
+        for m in data.get("metrics") or []:
+            batch.record_step_metrics(run_id, m.get("step_id"), m.get("module"), m, input_file=m.get("input_file"))
+        # A run the handler left pending or running was already settled by finish()
+        if data.get("run_status") not in (None, "pending", "running") and data["status"] != "cancelled":
+            batch.update_run_status(run_id, data["run_status"])
+    return jsonify({"run_id": run_id, "status": data["status"]}), 200
 
 
 @app.route('/module-database', methods=['GET', 'POST'])
@@ -110,20 +463,12 @@ def module_database():
 
     if request.method == 'GET':
         try:
-            with sqlite3.connect(DB_PATH) as conn:
-                c = conn.cursor()
-                c.execute("SELECT name, description, input_format, output_format, environment FROM modules")
-                modules = [
-                    {
-                        "name": row[0],
-                        "description": row[1],
-                        "input_format": row[2],
-                        "output_format": row[3],
-                        "environment": row[4]
-                    }
-                    for row in c.fetchall()
-                ]
-            return jsonify(modules), 200  # Return 200 status for successful retrieval
+            # An unchanged registry is answered from its version counter without reading a row.
+            unchanged = not_modified(module_store.etag("modules"))
+            if unchanged is not None:
+                return unchanged
+            modules, etag = module_store.list_modules()
+            return registry_response(modules, etag)
 
         except sqlite3.Error as e:
             logging.error(f"🚨 Database error: {str(e)}")
@@ -138,16 +483,8 @@ def module_database():
             return jsonify({"error": "Missing required fields"}), 400
 
         try:
-            with sqlite3.connect(DB_PATH) as conn:
-                c = conn.cursor()
-                c.execute(
-                    """
-                    INSERT INTO modules (name, description, input_format, output_format, environment)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (data["name"], data["description"], data["input_format"], data["output_format"], data["environment"])
-                )
-                conn.commit()
+            module_store.add_module(data)
+            orchestrator.registry.invalidate("modules")
 
             return jsonify({"message": "Module added successfully"}), 201  # Return 201 status for successful insertion
 
@@ -159,29 +496,64 @@ def module_database():
 
 
 
+def bulk_items(name):
+    """The array posted to a bulk endpoint, either bare or as {name: [...]}; None if malformed."""
+    data = request.get_json(silent=True)
+    items = data.get(name) if isinstance(data, dict) else data
+    return items if isinstance(items, list) else None
+
+
+def bulk_response(results, kind):
+    """Per-item results; 201 if anything was created, else 200."""
+    created = sum(1 for r in results if r["status"] == "created")
+    if created:
+        orchestrator.registry.invalidate(kind)
+    return jsonify({"created": created, "results": results}), 201 if created else 200
+
+
+@app.route('/module-database/bulk', methods=['POST'])
+def module_database_bulk():
+    """Add many modules in one transaction, reporting each item's status."""
+    modules = bulk_items("modules")
+    if modules is None:
+        return jsonify({"error": "Expected a JSON array of modules"}), 400
+    try:
+        return bulk_response(module_store.add_modules(modules), "modules")
+    except sqlite3.Error as e:
+        logging.error(f"🚨 Database error: {str(e)}")
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+@app.route('/module-database/module-tickets/bulk', methods=['POST'])
+def module_tickets_bulk():
+    """Create many module tickets in one transaction, reporting each item's status."""
+    tickets = bulk_items("tickets")
+    if tickets is None:
+        return jsonify({"error": "Expected a JSON array of tickets"}), 400
+    try:
+        return bulk_response(module_store.add_tickets(tickets), "tickets")
+    except sqlite3.Error as e:
+        logging.error(f"🚨 Database error: {str(e)}")
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
 @app.route('/module-database/module-tickets', methods=['GET', 'POST'])
 def module_tickets():
     """Handle module ticket retrieval (GET) and ticket creation (POST)."""
     if request.method == 'GET':
-        module_name = request.args.get("module_name")  # Optional filter
-        with sqlite3.connect(DB_PATH) as conn:
-            c = conn.cursor()
-            if module_name:
-                c.execute("SELECT module_name, reason, status FROM module_tickets WHERE module_name = ?", (module_name,))
-            else:
-                c.execute("SELECT module_name, reason, status FROM module_tickets")  # Get all tickets
-
-            tickets = [{"module_name": row[0], "reason": row[1], "status": row[2]} for row in c.fetchall()]
-        return jsonify(tickets)
+        module_name = request.args.get("module_name")  # Optional filters
+        status = request.args.get("status")
+        unchanged = not_modified(module_store.etag("tickets"))
+        if unchanged is not None:
+            return unchanged
+        tickets, etag = module_store.list_tickets(module_name=module_name, status=status)
+        return registry_response(tickets, etag)
 
     elif request.method == 'POST':
         data = request.get_json()
         try:
-            with sqlite3.connect(DB_PATH) as conn:
-                c = conn.cursor()
-                c.execute("INSERT INTO module_tickets (module_name, reason, status) VALUES (?, ?, ?)",
-                          (data["module_name"], data["reason"], "pending"))
-                conn.commit()
+            module_store.add_ticket(data["module_name"], data["reason"])
+            orchestrator.registry.invalidate("tickets")
             return jsonify({"message": "Module ticket created successfully"}), 201
         except sqlite3.IntegrityError:
             return jsonify({"error": "Module ticket already exists"}), 400
@@ -189,11 +561,28 @@ def module_tickets():
             return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 
+@app.route('/module-database/resources', methods=['GET', 'POST'])
+def module_resources():
+    """List (GET) or set (POST) the CPUs and memory one run of a module needs, for the job scheduler."""
+    if request.method == 'GET':
+        return jsonify(module_store.list_module_resources()), 200
+
+    data = request.get_json(silent=True) or {}
+    try:
+        module_store.set_module_resources(data["module_name"], int(data["cpus"]), int(data.get("memory_mb", 0)))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "module_name and an integer cpus are required"}), 400
+    except sqlite3.IntegrityError:
+        return jsonify({"error": "cpus must be positive and memory_mb not negative"}), 400
+    return jsonify({"message": "Module resources recorded"}), 200
+
+
 @app.route('/init-db', methods=['POST'])
 def initialize_database():
     """Manually initialize the database via API call."""
     try:
         init_db()
+        orchestrator.registry.invalidate()
         return jsonify({"message": "Database initialized successfully"}), 200
     except Exception as e:
         return jsonify({"error": f"Database initialization failed: {str(e)}"}), 500
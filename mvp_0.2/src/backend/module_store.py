@@ -0,0 +1,213 @@
+import os
+import uuid
+import threading
+from contextlib import contextmanager
+from src.run_management.sqlite_pool import SQLiteConnectionPool
+
+# The repository's module database; override with BBD_MODULE_DB.
+DEFAULT_MODULE_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "db", "module_database.db"))
+
+MODULE_FIELDS = ("name", "description", "input_format", "output_format", "environment")
+TICKET_FIELDS = ("module_name", "reason", "status")
+RESOURCE_FIELDS = ("module_name", "cpus", "memory_mb")
+REGISTRY_KINDS = {"modules": "modules", "tickets": "module_tickets"}
+
+
+class ModuleStore:
+    """The ``modules``, ``module_tickets`` and ``module_resources`` tables behind a per-thread connection pool.
+
+    Connections are opened once per worker thread in WAL mode and reuse
+    SQLite's prepared-statement cache, which is why every query is a fixed
+    class-level SQL string. Triggers bump a per-table version counter on any
+    write, so ``etag()`` identifies a registry snapshot without reading it.
+    """
+
+    LIST_MODULES_SQL = f"SELECT {', '.join(MODULE_FIELDS)} FROM modules ORDER BY id"
+    INSERT_MODULE_SQL = f"INSERT INTO modules ({', '.join(MODULE_FIELDS)}) VALUES (?, ?, ?, ?, ?)"
+    LIST_TICKETS_SQL = f"SELECT {', '.join(TICKET_FIELDS)} FROM module_tickets ORDER BY id"
+    TICKETS_BY_NAME_SQL = f"SELECT {', '.join(TICKET_FIELDS)} FROM module_tickets WHERE module_name = ?"
+    TICKETS_BY_STATUS_SQL = f"SELECT {', '.join(TICKET_FIELDS)} FROM module_tickets WHERE status = ? ORDER BY id"
+    INSERT_TICKET_SQL = "INSERT INTO module_tickets (module_name, reason, status) VALUES (?, ?, ?)"
+    VERSION_SQL = "SELECT epoch, version FROM registry_version WHERE kind = ?"
+    LIST_RESOURCES_SQL = f"SELECT {', '.join(RESOURCE_FIELDS)} FROM module_resources ORDER BY module_name"
+    UPSERT_RESOURCES_SQL = '''
+        INSERT INTO module_resources (module_name, cpus, memory_mb) VALUES (?, ?, ?)
+        ON CONFLICT(module_name) DO UPDATE SET cpus = excluded.cpus, memory_mb = excluded.memory_mb
+    '''
+
+    def __init__(self, db_path=None, busy_timeout_ms=5000):
+        self.db_path = os.path.abspath(db_path or os.environ.get("BBD_MODULE_DB", DEFAULT_MODULE_DB_PATH))
+        self.pool = SQLiteConnectionPool(self.db_path, pragmas={
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": busy_timeout_ms,
+        })
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def connection(self):
+        if not self._initialized:
+            self.initialize()
+        return self.pool.connection()
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def close(self):
+        self.pool.close_all()
+
+    def initialize(self):
+        """Create the registry tables, their indexes and the version triggers."""
+        with self._init_lock:
+            conn = self.pool.connection()
+            with conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS modules (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT UNIQUE,
+                        description TEXT,
+                        input_format TEXT,
+                        output_format TEXT,
+                        environment TEXT  -- Python, R, Shell, Docker, Conda
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS module_tickets (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        module_name TEXT UNIQUE,
+                        reason TEXT,
+                        status TEXT DEFAULT 'pending'
+                    )
+                ''')
+                # Per-run requirements the job scheduler admits against; they override module_metadata.json.
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS module_resources (
+                        module_name TEXT PRIMARY KEY COLLATE NOCASE,
+                        cpus INTEGER NOT NULL CHECK(cpus > 0),
+                        memory_mb INTEGER NOT NULL CHECK(memory_mb >= 0)
+                    )
+                ''')
+                # name and module_name are indexed by their UNIQUE constraints.
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_module_tickets_status ON module_tickets(status)")
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS registry_version (
+                        kind TEXT PRIMARY KEY,
+                        epoch TEXT NOT NULL,
+                        version INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+                for kind, table in REGISTRY_KINDS.items():
+                    # The epoch keeps ETags unique if the database is ever recreated.
+                    conn.execute("INSERT OR IGNORE INTO registry_version (kind, epoch) VALUES (?, ?)",
+                                 (kind, uuid.uuid4().hex[:8]))
+                    for event in ("INSERT", "UPDATE", "DELETE"):
+                        conn.execute(f'''
+                            CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()} AFTER {event} ON {table}
+                            BEGIN
+                                UPDATE registry_version SET version = version + 1 WHERE kind = '{kind}';
+                            END
+                        ''')
+            self._initialized = True
+
+    def etag(self, kind):
+        """Opaque tag that changes whenever the ``modules`` or ``tickets`` table changes."""
+        epoch, version = self.connection().execute(self.VERSION_SQL, (kind,)).fetchone()
+        return f"{kind}-{epoch}-{version}"
+
+    def _snapshot(self, kind, sql, params=()):
+        """Rows and their ETag, read in one transaction so the two always agree."""
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN")
+            epoch, version = conn.execute(self.VERSION_SQL, (kind,)).fetchone()
+            rows = conn.execute(sql, params).fetchall()
+        return rows, f"{kind}-{epoch}-{version}"
+
+    def list_modules(self):
+        """All modules as dicts, plus the registry ETag."""
+        rows, etag = self._snapshot("modules", self.LIST_MODULES_SQL)
+        return [dict(zip(MODULE_FIELDS, row)) for row in rows], etag
+
+    def add_module(self, module):
+        """Insert a module; raises sqlite3.IntegrityError if the name is taken."""
+        with self.transaction() as conn:
+            conn.execute(self.INSERT_MODULE_SQL, tuple(module[f] for f in MODULE_FIELDS))
+
+    def list_tickets(self, module_name=None, status=None):
+        """Module tickets, optionally filtered by module name or status, plus the tickets ETag."""
+        if module_name:
+            rows, etag = self._snapshot("tickets", self.TICKETS_BY_NAME_SQL, (module_name,))
+        elif status:
+            rows, etag = self._snapshot("tickets", self.TICKETS_BY_STATUS_SQL, (status,))
+        else:
+            rows, etag = self._snapshot("tickets", self.LIST_TICKETS_SQL)
+        return [dict(zip(TICKET_FIELDS, row)) for row in rows], etag
+
+    def add_ticket(self, module_name, reason, status="pending"):
+        """Insert a ticket; raises sqlite3.IntegrityError if one exists for the module."""
+        with self.transaction() as conn:
+            conn.execute(self.INSERT_TICKET_SQL, (module_name, reason, status))
+
+    def list_module_resources(self):
+        """Resource requirements recorded for modules, as dicts."""
+        rows = self.connection().execute(self.LIST_RESOURCES_SQL).fetchall()
+        return [dict(zip(RESOURCE_FIELDS, row)) for row in rows]
+
+    def module_resources(self):
+        """Recorded requirements keyed by lower-cased module name, as the scheduler takes them."""
+        return {r["module_name"].lower(): {"cpus": r["cpus"], "memory_mb": r["memory_mb"]}
+                for r in self.list_module_resources()}
+
+    def set_module_resources(self, module_name, cpus, memory_mb):
+        """Record (or replace) the CPUs and memory one run of a module needs.
+
+        Raises sqlite3.IntegrityError for non-positive CPUs or negative memory.
+        """
+        with self.transaction() as conn:
+            conn.execute(self.UPSERT_RESOURCES_SQL, (module_name, cpus, memory_mb))
+
+    def add_modules(self, modules):
+        """Insert many modules in one transaction.
+
+        Returns one ``{"name", "status"}`` per item, in order, where status is
+        "created", "exists" (already registered), "duplicate" (repeated earlier
+        in the batch) or "invalid" (missing or non-string fields).
+        """
+        return self._bulk_insert("modules", MODULE_FIELDS, MODULE_FIELDS, modules)
+
+    def add_tickets(self, tickets):
+        """Insert many pending tickets in one transaction; per-item status as add_modules."""
+        # New tickets always start pending, as with the single POST.
+        return self._bulk_insert("module_tickets", TICKET_FIELDS, ("module_name",), tickets,
+                                 defaults={"reason": ""}, fixed={"status": "pending"})
+
+    def _bulk_insert(self, table, fields, required, items, defaults=None, fixed=None):
+        key = fields[0]
+        results, rows, seen = [], [], set()
+        for item in items:
+            if not isinstance(item, dict) or any(item.get(f) is None for f in required):
+                results.append({key: item.get(key) if isinstance(item, dict) else None,
+                                "status": "invalid", "error": f"Missing required fields: {', '.join(required)}"})
+                continue
+            if any(not isinstance(item.get(f), (str, type(None))) for f in fields):
+                results.append({key: item[key] if isinstance(item[key], str) else None,
+                                "status": "invalid", "error": f"Fields must be strings: {', '.join(fields)}"})
+                continue
+            if item[key] in seen:
+                results.append({key: item[key], "status": "duplicate"})
+                continue
+            seen.add(item[key])
+            row = {**(defaults or {}), **item, **(fixed or {})}
+            rows.append((len(results), tuple(row.get(f) for f in fields)))
+            results.append({key: item[key], "status": "created"})
+
+        # INSERT OR IGNORE decides atomically whether each row is new; its rowcount says which.
+        sql = f"INSERT OR IGNORE INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})"
+        with self.transaction() as conn:
+            for index, row in rows:
+                if conn.execute(sql, row).rowcount == 0:
+                    results[index]["status"] = "exists"
+        return results
@@ -1,4 +1,4 @@
-from .run_tracking import log_run, get_run, update_run_status, initialize_db
-from .directory_manager import setup_run_directory, move_input_files
+from .run_tracking import log_run, get_run, update_run_status, initialize_db, RunStore, get_store, set_store
+from .directory_manager import setup_run_directory, move_input_files, reconcile_run_index
 from .status_manager import update_run_status
 from .run_executor import execute_run
@@ -1,10 +1,19 @@
 import argparse
 import os
+import csv
+import json
+import uuid
+import shutil
 import logging
-import sqlite3
-from src.run_management.run_tracking import log_run, get_run
-from src.run_management.directory_manager import setup_run_directory, move_input_files
+from src.run_management.run_tracking import log_run, get_run, get_store, query_runs, iter_runs
+from src.run_management.directory_manager import (setup_run_directory, move_input_files, update_run_metadata,
+                                                  find_run_directory, reconcile_run_index)
 from src.run_management.run_executor import execute_run
+from src.run_management.job_queue import JobQueue
+from src.run_management.scheduler import DEFAULT_USER, job_demand
+from src.run_management.staging import ContentStore, STAGING_MODES
+from src.run_management.module_metadata import load_module_metadata
+from src.run_management.workflow_engine import file_format
 
 # Configure logging
 logging.basicConfig(
@@ -13,29 +22,117 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-def create_run(input_files, base_path):
-    """Create a new run and set up directories."""
-    run_id = log_run(input_files, "")  # First log call
+def _prepare_run(input_files, base_path, staging_mode, content_store, **metadata):
+    """Allocate a run ID, create the run's directories and stage its inputs, without logging it yet."""
+    run_id = str(uuid.uuid4())
     run_dir = setup_run_directory(base_path, run_id)
     output_path = os.path.join(run_dir, "output")
+    try:
+        update_run_metadata(run_dir, input_files=input_files, output_dir=output_path, **metadata)
+        move_input_files(input_files, os.path.join(run_dir, "input"),
+                         mode=staging_mode, content_store=content_store)  # Stage input files
+    except BaseException:
+        shutil.rmtree(run_dir, ignore_errors=True)
+        raise
+    return run_id, input_files, output_path, run_dir
 
-    log_run(input_files, output_path)  # Second log call
+def _discard(prepared):
+    """Remove the directories of prepared runs that will not be logged."""
+    for _, _, _, run_dir in prepared:
+        shutil.rmtree(run_dir, ignore_errors=True)
 
-    # Update the database entry with the correct output path
-    conn = sqlite3.connect("runs.db")
-    cursor = conn.cursor()
-    cursor.execute("UPDATE runs SET output_path = ? WHERE run_id = ?", (output_path, run_id))
-    conn.commit()
-    conn.close()
-    
-    move_input_files(input_files, os.path.join(run_dir, "input"))  # Move input files
+def create_run(input_files, base_path, staging_mode="auto", use_content_store=True):
+    """Create a new run and set up directories.
+
+    Inputs are deduplicated into ``<base_path>/store`` and linked into the run's
+    ``input/`` directory rather than copied. The run is logged (with its output
+    path and directory) in a single transaction once its directory is ready;
+    if staging or logging fails, the directory is removed and nothing is logged.
+    """
+    content_store = ContentStore(os.path.join(base_path, "store"), get_store()) if use_content_store else None
+    prepared = _prepare_run(input_files, base_path, staging_mode, content_store)
+    run_id, _, output_path, run_dir = prepared
+    try:
+        run_id = log_run(input_files, output_path, run_id=run_id, run_dir=run_dir)
+    except BaseException:
+        _discard([prepared])
+        raise
 
     logging.info(f"Run {run_id} created successfully at {run_dir}")
     print(f"Run {run_id} created successfully! Directory: {run_dir}")
-    
     return run_id
 
-def start_run(run_id, base_path):
+def read_sample_sheet(path):
+    """Read a CSV (or ``.tsv``) sample sheet into ``(sample, input_files)`` pairs.
+
+    The header needs a ``sample`` column and one or more input columns whose
+    names start with ``fastq`` (e.g. ``fastq_1,fastq_2``); empty cells are
+    skipped. Relative paths are resolved against the sheet's directory.
+    """
+    sheet_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f, delimiter="\t" if path.endswith(".tsv") else ",")
+        columns = [c for c in reader.fieldnames or [] if c.strip().lower().startswith("fastq")]
+        if "sample" not in (reader.fieldnames or []) or not columns:
+            raise ValueError(f"Sample sheet {path} needs a 'sample' column and at least one 'fastq' column")
+        samples = []
+        for line, row in enumerate(reader, start=2):
+            files = [os.path.join(sheet_dir, row[c].strip()) for c in columns if (row[c] or "").strip()]
+            if not row["sample"] or not files:
+                raise ValueError(f"{path}:{line}: every row needs a sample name and at least one input file")
+            samples.append((row["sample"].strip(), files))
+    return samples
+
+def create_runs(samples, base_path, staging_mode="auto", use_content_store=True):
+    """Create one run per ``(sample, input_files)`` pair, logging them all in one transaction.
+
+    Every input is checked before anything is created, and if any run fails to
+    stage or the transaction fails, every directory created so far is removed
+    and no run is logged. Returns ``(sample, run_id)`` pairs in order.
+    """
+    missing = [f for _, files in samples for f in files if not os.path.exists(f)]
+    if missing:
+        raise FileNotFoundError(f"Missing input file(s): {', '.join(missing)}")
+
+    content_store = ContentStore(os.path.join(base_path, "store"), get_store()) if use_content_store else None
+    prepared = []
+    try:
+        for sample, files in samples:
+            prepared.append(_prepare_run(files, base_path, staging_mode, content_store, sample=sample))
+        run_ids = get_store().log_runs(prepared)
+    except BaseException:
+        _discard(prepared)
+        raise
+
+    created = [(sample, run_id) for (sample, _), run_id in zip(samples, run_ids)]
+    for sample, run_id in created:
+        print(f"{sample}\t{run_id}")
+    logging.info(f"Created {len(created)} run(s) from a sample sheet under {base_path}")
+    print(f"Created {len(created)} run(s)")
+    return created
+
+def queue_runs(run_ids, module="FastQC", user=DEFAULT_USER, priority=0):
+    """Queue a ``qc`` job for each run, to be picked up by the backend's or remote workers.
+
+    Each job needs the module's resources (module_database.db, else
+    module_metadata.json) once per input file.
+    """
+    from src.backend.module_store import ModuleStore
+
+    job_queue = JobQueue(get_store())
+    overrides = ModuleStore().module_resources()
+    queued = []
+    for run_id in run_ids:
+        run = get_run(run_id)
+        resources = job_demand("qc", {"module": module}, json.loads(run[2]) if run else (), overrides)
+        if job_queue.enqueue(run_id, "qc", {"module": module}, user=user, priority=priority, resources=resources):
+            queued.append(run_id)
+    logging.info(f"Queued {len(queued)} {module} job(s)")
+    print(f"Queued {len(queued)} run(s) for {module}; start workers with "
+          f"'python -m src.run_management.remote_worker --db {get_store().db_path}'")
+    return queued
+
+def start_run(run_id, base_path, max_workers=None, memory_budget_mb=None, module="FastQC"):
     """Start execution of a run."""
     run_details = get_run(run_id)
     if not run_details:
@@ -44,12 +141,69 @@ def start_run(run_id, base_path):
         return
     
     input_files = eval(run_details[2])  # Convert JSON string back to list
-    run_dir = os.path.join(base_path, "runs", run_id)
+    run_dir = find_run_directory(get_store(), base_path, run_id)
     output_dir = os.path.join(run_dir, "output")
     log_dir = os.path.join(run_dir, "logs")
-    execute_run(run_id, input_files, output_dir, log_dir)
-    logging.info(f"Run {run_id} execution started!")
-    print(f"Run {run_id} execution started!")
+    status = execute_run(run_id, input_files, output_dir, log_dir,
+                         max_workers=max_workers, memory_budget_mb=memory_budget_mb, module=module)
+    update_run_metadata(run_dir, status=status)
+    logging.info(f"Run {run_id} finished with status: {status}")
+    print(f"Run {run_id} finished with status: {status}")
+
+def list_runs(status=None, since=None, until=None, input_file=None, limit=50, after=None, all_pages=False):
+    """Print runs matching the filters, newest first, one page at a time."""
+    filters = {"status": status, "since": since, "until": until, "input_file": input_file}
+    if all_pages:
+        rows, next_cursor = iter_runs(page_size=limit, **filters), None
+    else:
+        rows, next_cursor = query_runs(after=after, limit=limit, **filters)
+
+    for run_id, timestamp, input_files, output_path, run_status in rows:
+        print(f"{run_id}\t{timestamp}\t{run_status}\t{input_files}")
+    if next_cursor:
+        print(f"More runs available: --after '{next_cursor}'")
+    return next_cursor
+
+def reconcile(base_path):
+    """Rebuild the run index from the run directories under ``<base_path>/runs``."""
+    counts = reconcile_run_index(os.path.join(base_path, "runs"), get_store())
+    print(f"Indexed {counts['indexed']} run(s), {counts['restored']} restored from metadata; "
+          f"removed {counts['removed']} stale index entries; skipped {counts['unreadable']} unreadable directories")
+    return counts
+
+_ENVIRONMENTS = {"python": "Python", "r": "R"}
+
+def module_registry_row(module):
+    """Map a module_metadata.json entry onto a row of the backend's ``modules`` table."""
+    return {
+        "name": module["name"],
+        "description": module.get("description") or f"{module['name']} {module.get('version', '')}".strip(),
+        "input_format": ", ".join(dict.fromkeys(file_format(f) for f in module.get("input", []))),
+        "output_format": ", ".join(dict.fromkeys(file_format(f) for f in module.get("output", []))),
+        "environment": _ENVIRONMENTS.get(str(module.get("language", "")).lower(), "Shell"),
+    }
+
+def seed_modules(url, metadata_path=None, batch_size=500):
+    """Register every module in module_metadata.json through the bulk endpoint.
+
+    Modules already in the database are reported as "exists" and left alone,
+    so seeding is safe to repeat. Returns the per-module results.
+    """
+    import requests
+
+    rows = [module_registry_row(m) for m in load_module_metadata(metadata_path).values()]
+    results = []
+    for start in range(0, len(rows), batch_size):
+        response = requests.post(f"{url.rstrip('/')}/bulk", json=rows[start:start + batch_size], timeout=30)
+        response.raise_for_status()
+        results.extend(response.json()["results"])
+
+    for result in results:
+        print(f"{result['name']}\t{result['status']}")
+    created = sum(1 for r in results if r["status"] == "created")
+    logging.info(f"Seeded {created} of {len(rows)} modules into {url}")
+    print(f"Seeded {created} new module(s), {len(rows) - created} already present")
+    return results
 
 def main():
     parser = argparse.ArgumentParser(description="CLI for BBD.bio Run Management")
@@ -59,18 +213,82 @@ def main():
     create_parser = subparsers.add_parser("create-run", help="Create a new run")
     create_parser.add_argument("--input-files", nargs="+", required=True, help="List of input files")
     create_parser.add_argument("--base-path", required=True, help="Base path for runs")
+    create_parser.add_argument("--staging-mode", choices=("auto",) + STAGING_MODES, default="auto",
+                               help="How inputs are placed in the run directory")
+    create_parser.add_argument("--no-content-store", action="store_true",
+                               help="Link inputs directly instead of through the checksum-keyed store")
     
+    # Subcommand: create-runs
+    batch_parser = subparsers.add_parser("create-runs", help="Create one run per sample of a sample sheet")
+    batch_parser.add_argument("--sample-sheet", required=True,
+                              help="CSV/TSV with a 'sample' column and 'fastq_1'[, 'fastq_2', ...] columns")
+    batch_parser.add_argument("--base-path", required=True, help="Base path for runs")
+    batch_parser.add_argument("--staging-mode", choices=("auto",) + STAGING_MODES, default="auto",
+                              help="How inputs are placed in the run directories")
+    batch_parser.add_argument("--no-content-store", action="store_true",
+                              help="Link inputs directly instead of through the checksum-keyed store")
+    batch_parser.add_argument("--queue", action="store_true",
+                              help="Queue the runs for execution by job workers instead of only creating them")
+    batch_parser.add_argument("--module", choices=("FastQC", "NativeQC"), default="FastQC",
+                              help="QC engine for queued runs")
+    batch_parser.add_argument("--user", default=DEFAULT_USER, help="User the queued runs count against for fair share")
+    batch_parser.add_argument("--priority", type=int, default=0,
+                              help="Higher priorities start first, after fair share between users")
+
     # Subcommand: start-run
     start_parser = subparsers.add_parser("start-run", help="Start an existing run")
     start_parser.add_argument("--run-id", required=True, help="Run ID to execute")
     start_parser.add_argument("--base-path", required=True, help="Base path for runs")
+    start_parser.add_argument("--max-workers", type=int, help="Maximum number of files processed concurrently")
+    start_parser.add_argument("--memory-budget-mb", type=int, help="Memory budget (MB) shared by all workers")
+    start_parser.add_argument("--module", choices=("FastQC", "NativeQC"), default="FastQC",
+                              help="QC engine: FastQC (JVM per file) or NativeQC (in-process)")
     
+    # Subcommand: list-runs
+    list_parser = subparsers.add_parser("list-runs", help="List runs, newest first")
+    list_parser.add_argument("--status", help="Only runs with this status")
+    list_parser.add_argument("--since", help="Only runs at or after this time (YYYY-MM-DD[ HH:MM:SS])")
+    list_parser.add_argument("--until", help="Only runs before this time (YYYY-MM-DD[ HH:MM:SS])")
+    list_parser.add_argument("--input-file", help="Only runs using this input file (path or file name)")
+    list_parser.add_argument("--limit", type=int, default=50, help="Page size")
+    list_parser.add_argument("--after", help="Cursor printed by the previous page")
+    list_parser.add_argument("--all", action="store_true", help="Stream every matching run")
+
+    # Subcommand: reconcile
+    reconcile_parser = subparsers.add_parser("reconcile", help="Rebuild the run index from the run directories")
+    reconcile_parser.add_argument("--base-path", required=True, help="Base path for runs")
+
+    # Subcommand: seed-modules
+    seed_parser = subparsers.add_parser("seed-modules", help="Register module_metadata.json in the module database")
+    seed_parser.add_argument("--url", help="Module database endpoint (default: the orchestrator's MODULE_DATABASE_URL)")
+    seed_parser.add_argument("--metadata", help="Path to module_metadata.json")
+    seed_parser.add_argument("--batch-size", type=int, default=500, help="Modules per bulk request")
+
     args = parser.parse_args()
     
     if args.command == "create-run":
-        create_run(args.input_files, args.base_path)
+        create_run(args.input_files, args.base_path,
+                   staging_mode=args.staging_mode, use_content_store=not args.no_content_store)
+    elif args.command == "create-runs":
+        created = create_runs(read_sample_sheet(args.sample_sheet), args.base_path,
+                              staging_mode=args.staging_mode, use_content_store=not args.no_content_store)
+        if args.queue:
+            queue_runs([run_id for _, run_id in created], module=args.module, user=args.user,
+                       priority=args.priority)
     elif args.command == "start-run":
-        start_run(args.run_id, args.base_path)
+        start_run(args.run_id, args.base_path,
+                  max_workers=args.max_workers, memory_budget_mb=args.memory_budget_mb, module=args.module)
+    elif args.command == "list-runs":
+        list_runs(args.status, args.since, args.until, args.input_file,
+                  limit=args.limit, after=args.after, all_pages=args.all)
+    elif args.command == "reconcile":
+        reconcile(args.base_path)
+    elif args.command == "seed-modules":
+        url = args.url
+        if not url:
+            from src.ai_orchestrator.module_registry import MODULE_DATABASE_URL
+            url = MODULE_DATABASE_URL
+        seed_modules(url, args.metadata, batch_size=args.batch_size)
     else:
         parser.print_help()
 
@@ -1,18 +1,137 @@
 import os
-import shutil
-
-def setup_run_directory(base_path, run_id):
-    """Create a unique directory structure for a run."""
-    run_dir = os.path.join(base_path, "runs", run_id)
-    os.makedirs(os.path.join(run_dir, "input"), exist_ok=True)
-    os.makedirs(os.path.join(run_dir, "output"), exist_ok=True)
-    os.makedirs(os.path.join(run_dir, "logs"), exist_ok=True)
+import json
+import logging
+from datetime import datetime, timezone
+from src.run_management.staging import stage_file
+
+RUN_SUBDIRS = ("input", "output", "logs")
+METADATA_FILE = "metadata.json"
+
+def shard_path(run_id, created=None):
+    """Location of a run relative to the runs root: ``YYYY/MM/DD/<first two id characters>/<run_id>``.
+
+    Sharding by creation date (UTC) and id prefix keeps every directory small,
+    however many runs accumulate.
+    """
+    created = created or datetime.now(timezone.utc)
+    return os.path.join(created.strftime("%Y"), created.strftime("%m"), created.strftime("%d"), run_id[:2], run_id)
+
+def create_run_layout(runs_root, run_id, created=None):
+    """Create ``input``, ``output`` and ``logs`` for a run under its shard of ``runs_root``.
+
+    Also starts the run's metadata.json, which callers complete with
+    ``update_run_metadata`` and from which ``reconcile_run_index`` rebuilds the index.
+    """
+    created = created or datetime.now(timezone.utc)
+    run_dir = os.path.join(runs_root, shard_path(run_id, created))
+    for subdir in RUN_SUBDIRS:
+        os.makedirs(os.path.join(run_dir, subdir), exist_ok=True)
+    if not os.path.exists(os.path.join(run_dir, METADATA_FILE)):
+        write_run_metadata(run_dir, {"run_id": run_id, "created": created.strftime("%Y-%m-%d %H:%M:%S"),
+                                     "status": "pending"})
     return run_dir
 
-def move_input_files(input_files, destination_dir):
-    """Move input files to the designated input directory."""
+def setup_run_directory(base_path, run_id, created=None):
+    """Create a unique directory structure for a run under ``<base_path>/runs``."""
+    return create_run_layout(os.path.join(base_path, "runs"), run_id, created)
+
+def write_run_metadata(run_dir, metadata):
+    """Atomically replace a run's metadata.json."""
+    path = os.path.join(run_dir, METADATA_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(metadata, f, indent=4)
+    os.replace(tmp, path)
+    return path
+
+def update_run_metadata(run_dir, **changes):
+    """Update fields of a run's metadata.json; a no-op for runs created without one."""
+    path = os.path.join(run_dir, METADATA_FILE)
+    try:
+        with open(path) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    metadata.update(changes)
+    return write_run_metadata(run_dir, metadata)
+
+def find_run_directory(run_store, base_path, run_id):
+    """A run's directory from the run index, falling back to the flat ``runs/<run_id>`` of older runs."""
+    return run_store.get_run_directory(run_id) or os.path.join(base_path, "runs", run_id)
+
+def _run_directories(runs_root):
+    """Yield ``(run_dir, metadata_path)`` for every run below ``runs_root``, without descending into runs.
+
+    Flat ``runs/<run_id>`` directories from before metadata.json was written
+    are recognised by their subdirectories and yielded with no metadata path.
+    """
+    for dirpath, dirnames, filenames in os.walk(runs_root):
+        if METADATA_FILE in filenames:
+            yield dirpath, os.path.join(dirpath, METADATA_FILE)
+        elif dirpath != runs_root and all(d in dirnames for d in RUN_SUBDIRS):
+            yield dirpath, None
+        else:
+            continue
+        dirnames[:] = []
+
+def _read_metadata(run_dir, path, run_store):
+    if path is None:
+        run_id = os.path.basename(run_dir)
+        return {"run_id": run_id} if run_store.get_run(run_id) else None
+    try:
+        with open(path) as f:
+            metadata = json.load(f)
+        return metadata if isinstance(metadata, dict) and metadata.get("run_id") else None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Unreadable run metadata {path}: {e}")
+        return None
+
+def reconcile_run_index(runs_root, run_store):
+    """Rebuild the run index from the run directories on disk.
+
+    Runs found on disk are (re-)indexed at their current location; runs missing
+    from the database entirely are restored from their metadata.json. Index
+    entries under ``runs_root`` whose directory no longer exists are dropped.
+    Returns counts of ``indexed``, ``restored``, ``removed`` and ``unreadable`` runs.
+    """
+    runs_root = os.path.abspath(runs_root)
+    counts = {"indexed": 0, "restored": 0, "removed": 0, "unreadable": 0}
+    seen = set()
+    for run_dir, path in _run_directories(runs_root):
+        metadata = _read_metadata(run_dir, path, run_store)
+        if metadata is None:
+            counts["unreadable"] += 1
+            continue
+        run_id = metadata["run_id"]
+        if path and run_store.restore_run(run_id, metadata.get("created") or metadata.get("timestamp"),
+                                          metadata.get("input_files", []),
+                                          metadata.get("output_dir") or os.path.join(run_dir, "output"),
+                                          metadata.get("status")):
+            counts["restored"] += 1
+        run_store.index_run(run_id, run_dir)
+        seen.add(run_id)
+        counts["indexed"] += 1
+
+    stale = [run_id for run_id, run_dir in run_store.indexed_runs(runs_root)
+             if run_id not in seen and not os.path.isdir(run_dir)]
+    counts["removed"] = run_store.unindex_runs(stale)
+    logging.info(f"Reconciled run index under {runs_root}: {counts}")
+    return counts
+
+def move_input_files(input_files, destination_dir, mode="auto", content_store=None):
+    """Stage input files into the designated input directory.
+
+    Files are reflinked, hardlinked or symlinked where possible and only copied
+    across filesystems (see ``staging.stage_file``). With a ``ContentStore`` each
+    file is first deduplicated into the store by checksum and linked from there.
+    """
     os.makedirs(destination_dir, exist_ok=True)
     for file_path in input_files:
         if os.path.exists(file_path):
-            shutil.copy(file_path, os.path.join(destination_dir, os.path.basename(file_path)))
+            dest = os.path.join(destination_dir, os.path.basename(file_path))
+            if content_store is not None:
+                content_store.stage(file_path, dest, mode)
+            else:
+                used = stage_file(file_path, dest, mode)
+                logging.debug(f"Staged {file_path} -> {dest} ({used})")
     return destination_dir
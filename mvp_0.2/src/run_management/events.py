@@ -0,0 +1,154 @@
+import time
+import threading
+import itertools
+from collections import OrderedDict, deque
+
+TERMINAL_STATUSES = ('completed', 'partial', 'failed', 'cancelled')
+DEFAULT_HISTORY = 200        # Events kept per run, replayed to late or reconnecting subscribers
+DEFAULT_MAX_RUNS = 1000      # Runs whose history is kept in memory (least recently active dropped)
+DEFAULT_QUEUE_SIZE = 1000    # Undelivered events per subscriber before the oldest are dropped
+
+
+class Subscription:
+    """One subscriber's queue of run events.
+
+    Read with ``get`` from a thread or ``await aget()`` on an event loop; both
+    return None on timeout or once the subscription is closed. A subscriber
+    that falls more than ``maxsize`` events behind loses the oldest ones
+    (counted in ``dropped``) rather than slowing publishers down.
+    """
+
+    def __init__(self, bus, run_id, maxsize=DEFAULT_QUEUE_SIZE):
+        self.bus = bus
+        self.run_id = run_id
+        self.dropped = 0
+        self.closed = False
+        self._events = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._waiter = None  # (loop, asyncio.Event) of a pending aget()
+
+    def _push(self, event):
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify_all()
+            waiter = self._waiter
+        if waiter is not None:
+            loop, ready = waiter
+            loop.call_soon_threadsafe(ready.set)
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._events or self.closed, timeout):
+                return None
+            return self._events.popleft() if self._events else None
+
+    async def aget(self, timeout=None):
+        import asyncio  # Only event-loop consumers pay for importing asyncio
+
+        with self._cond:
+            if self._events or self.closed:
+                return self._events.popleft() if self._events else None
+            ready = asyncio.Event()
+            self._waiter = (asyncio.get_running_loop(), ready)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self._cond:
+                self._waiter = None
+        with self._cond:
+            return self._events.popleft() if self._events else None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            waiter = self._waiter
+        if waiter is not None:
+            loop, ready = waiter
+            loop.call_soon_threadsafe(ready.set)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class EventBus:
+    """In-process publish/subscribe of run status and progress events.
+
+    Executors publish as they update the run store; any number of subscribers
+    (e.g. the ``/runs/<run_id>/events`` stream) receive each event without
+    polling SQLite. Every event carries an increasing ``id`` and the last
+    ``history`` events of a run are kept, so a subscriber can resume after
+    a reconnect with ``last_event_id``.
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY, max_runs=DEFAULT_MAX_RUNS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.history = history
+        self.max_runs = max_runs
+        self.queue_size = queue_size
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = {}        # run_id -> set of Subscription
+        self._history = OrderedDict()  # run_id -> deque of recent events
+
+    def publish(self, run_id, event_type, **data):
+        """Deliver an event to the run's subscribers; returns the event dict."""
+        with self._lock:
+            event = {"id": next(self._ids), "run_id": run_id, "type": event_type, "time": time.time(), **data}
+            recent = self._history.pop(run_id, None) or deque(maxlen=self.history)
+            recent.append(event)
+            self._history[run_id] = recent
+            while len(self._history) > self.max_runs:
+                self._history.popitem(last=False)
+            subscribers = list(self._subscribers.get(run_id, ()))
+        for subscription in subscribers:
+            subscription._push(event)
+        return event
+
+    def subscribe(self, run_id, last_event_id=None):
+        """Start receiving a run's events.
+
+        With ``last_event_id``, kept events published after it are queued first.
+        """
+        subscription = Subscription(self, run_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(run_id, set()).add(subscription)
+            if last_event_id is not None:
+                for event in self._history.get(run_id, ()):
+                    if event["id"] > last_event_id:
+                        subscription._push(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.run_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.run_id]
+
+    def subscriber_count(self, run_id=None):
+        with self._lock:
+            if run_id is not None:
+                return len(self._subscribers.get(run_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+_bus = EventBus()
+
+def get_event_bus():
+    """Return the process-wide EventBus."""
+    return _bus
+
+def publish(run_id, event_type, **data):
+    """Publish an event on the process-wide bus."""
+    return _bus.publish(run_id, event_type, **data)
@@ -0,0 +1,87 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.run_management.run_tracking import RunStore, get_store, set_store
+from src.run_management import events
+
+# Where queued jobs run: "local" (threads of the API process), "process" (a pool of worker processes
+# on the API host) or "remote" (``remote_worker`` processes on this or other hosts pull them).
+EXECUTORS = ("local", "process", "remote")
+
+
+class LocalExecutor:
+    """Runs each handler on the worker thread that claimed the job; tools run as local subprocesses."""
+
+    def run(self, handler, run_id, payload, is_cancelled):
+        return handler(run_id, payload, is_cancelled)
+
+    def close(self):
+        pass
+
+
+_queue = None  # JobQueue of a ProcessExecutor worker process, for cancellation checks
+
+def _init_process(db_path):
+    global _queue
+    from src.run_management.job_queue import JobQueue
+
+    os.environ["BBD_RUNS_DB"] = db_path
+    _queue = JobQueue(set_store(RunStore(db_path)))
+
+def _run_in_process(handler, run_id, payload):
+    return handler(run_id, payload, lambda: _queue.is_cancel_requested(run_id))
+
+
+class ProcessExecutor:
+    """Runs each handler in a pool of spawned worker processes sharing the run store.
+
+    Handlers must be importable module-level functions. A tool or native
+    extension that crashes takes down only its worker process (the job fails
+    and the pool is replaced), and CPU-bound handlers such as NativeQC do not
+    contend for the parent's GIL. Children read cancellation from the jobs
+    table. Their status events never reach this process's event bus, so the
+    run's final status is re-published here when the handler returns.
+    """
+
+    def __init__(self, workers=2, run_store=None):
+        self.workers = workers
+        self.run_store = run_store or get_store()
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_process, initargs=(self.run_store.db_path,))
+
+    def run(self, handler, run_id, payload, is_cancelled):
+        pool = self._pool
+        try:
+            return pool.submit(_run_in_process, handler, run_id, payload).result()
+        except BrokenProcessPool:
+            logging.error(f"A worker process died while running job {run_id}; restarting the pool")
+            with self._lock:
+                if self._pool is pool:  # Jobs that broke with it must not replace the new pool again
+                    pool.shutdown(wait=False)  # Its pending futures already failed with BrokenProcessPool
+                    self._pool = self._new_pool()
+            raise RuntimeError("Worker process died")
+        finally:
+            run = self.run_store.get_run(run_id)
+            if run is not None:
+                events.publish(run_id, "status", status=run[4])
+
+    def close(self):
+        self._pool.shutdown(wait=False)  # JobWorkerPool.stop has already waited for running jobs
+
+
+def make_executor(name, workers=2, run_store=None):
+    """The executor called ``name`` (see EXECUTORS); None for "remote", which runs nothing in this process."""
+    if name == "local":
+        return LocalExecutor()
+    if name == "process":
+        return ProcessExecutor(workers, run_store)
+    if name == "remote":
+        return None
+    raise ValueError(f"Unknown executor {name!r}; expected one of {', '.join(EXECUTORS)}")
@@ -0,0 +1,312 @@
+"""
+Parallel FASTQ reader shared by run management and QC.
+
+Inflating gzip is single-threaded, which caps every Python-side pass over a
+FASTQ.gz file. Multi-member gzip files, including BGZF (the blocked gzip
+written by bgzip and samtools), can be split at member boundaries and each
+piece inflated on its own thread; zlib releases the GIL while it works.
+Pieces are decompressed ahead of the consumer into a bounded window and
+handed out in file order. Single-member files are inflated by one background
+thread instead, which still overlaps decompression with processing.
+"""
+import os
+import mmap
+import zlib
+import gzip
+import queue
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 4 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+SEGMENT_SIZE = 1024 * 1024  # Compressed bytes handed to one decompression task
+MAX_SEGMENT_SIZE = 64 * 1024 * 1024  # Files with larger members are streamed rather than split
+MAX_THREADS = 8
+GZIP_MAGIC = b"\x1f\x8b"
+
+BGZF_BLOCK_SIZE = 0xff00  # Uncompressed bytes per block, as bgzip
+_BGZF_HEADER = struct.Struct("<4BI2BH2BHH")
+_BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+class _BadSplit(Exception):
+    """A segment did not start and end on gzip member boundaries."""
+
+
+def default_threads():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, min(cpus, MAX_THREADS))
+
+
+def is_gzip(path):
+    with open(path, "rb") as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def _bgzf_block_size(data, offset):
+    """Total size of the BGZF block at ``offset``, or None if it is not one."""
+    header = data[offset:offset + _BGZF_HEADER.size]
+    if len(header) < _BGZF_HEADER.size:
+        return None
+    id1, id2, cm, flags, _, _, _, xlen, si1, si2, slen, bsize = _BGZF_HEADER.unpack(header)
+    if (id1, id2, cm) != (31, 139, 8) or not flags & 4 or xlen != 6 or (si1, si2, slen) != (66, 67, 2):
+        return None
+    return bsize + 1
+
+
+def member_offsets(data):
+    """Offsets where gzip members (probably) start.
+
+    BGZF block sizes are read from the block headers, so those offsets are
+    exact. For other files every gzip header signature is a candidate; a false
+    match inside compressed data is caught when the segments are inflated.
+    """
+    if _bgzf_block_size(data, 0):
+        offsets, offset = [], 0
+        while offset < len(data):
+            size = _bgzf_block_size(data, offset)
+            if size is None:
+                break
+            offsets.append(offset)
+            offset += size
+        if offset >= len(data):
+            return offsets
+
+    offsets = []
+    offset = data.find(b"\x1f\x8b\x08")
+    while offset != -1:
+        flags = data[offset + 3:offset + 4]
+        if flags and not flags[0] & 0xe0:  # Reserved flag bits must be clear
+            offsets.append(offset)
+        offset = data.find(b"\x1f\x8b\x08", offset + 1)
+    return offsets
+
+
+def _segments(offsets, size, segment_size):
+    """Group member offsets into (start, end) byte ranges of about ``segment_size``.
+
+    Returns None when some member is too large to inflate in one piece.
+    """
+    bounds = [offsets[0]]
+    for offset in offsets[1:]:
+        if offset - bounds[-1] >= segment_size:
+            bounds.append(offset)
+    bounds.append(size)
+    segments = list(zip(bounds, bounds[1:]))
+    if len(segments) < 2 or any(end - start > MAX_SEGMENT_SIZE for start, end in segments):
+        return None
+    return segments
+
+
+def _inflate_segment(data):
+    """Inflate a run of whole gzip members; raises _BadSplit if it is not one."""
+    out = []
+    while data and data[:1] != b"\x00":  # Trailing zero padding is allowed, as in gzip
+        inflater = zlib.decompressobj(31)
+        try:
+            out.append(inflater.decompress(data))
+        except zlib.error as e:
+            raise _BadSplit(str(e))
+        if not inflater.eof:
+            raise _BadSplit("Segment ends inside a gzip member")
+        data = inflater.unused_data
+    return b"".join(out)
+
+
+def _inflate_stream(data, start, chunk_size):
+    """Inflate members sequentially from ``start``, yielding blocks of about ``chunk_size`` bytes."""
+    pos, pending = start, b""
+    out, out_size = [], 0
+    while True:
+        if not pending:
+            pending = data[pos:pos + READ_SIZE]
+            pos += len(pending)
+        if not pending or pending[:1] == b"\x00":  # Trailing zero padding is allowed, as in gzip
+            break
+        inflater = zlib.decompressobj(31)
+        while True:
+            try:
+                block = inflater.decompress(pending, chunk_size - out_size)
+            except zlib.error as e:
+                raise gzip.BadGzipFile(str(e))
+            out.append(block)
+            out_size += len(block)
+            if out_size >= chunk_size:
+                yield b"".join(out)
+                out, out_size = [], 0
+            if inflater.eof:
+                pending = inflater.unused_data
+                break
+            pending = inflater.unconsumed_tail
+            if not pending:
+                pending = data[pos:pos + READ_SIZE]
+                pos += len(pending)
+                if not pending:
+                    raise gzip.BadGzipFile("Compressed file ended before the end-of-stream marker")
+    if out_size:
+        yield b"".join(out)
+
+
+def _read_ahead(chunks, depth):
+    """Run a chunk generator on a background thread, buffering at most ``depth`` chunks."""
+    buffer = queue.Queue(depth)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for chunk in chunks:
+                while not stop.is_set():
+                    try:
+                        buffer.put(chunk, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            item = done
+        except BaseException as e:
+            item = e
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    thread = threading.Thread(target=produce, name="fastq-read-ahead", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _parallel_chunks(data, segments, threads, depth, chunk_size):
+    """Inflate segments on a thread pool and yield them in order.
+
+    If a segment turns out not to start on a member boundary (a false header
+    match), reading continues sequentially from the last verified boundary.
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="fastq-inflate") as pool:
+        try:
+            for start, end in segments:
+                pending.append((start, pool.submit(_inflate_segment, data[start:end])))
+                if len(pending) < depth:
+                    continue
+                yield _take(pending)
+            while pending:
+                yield _take(pending)
+        except _BadSplit as e:
+            for _, future in pending:
+                future.cancel()
+            yield from _inflate_stream(data, e.args[1], chunk_size)
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _take(pending):
+    start, future = pending.popleft()
+    try:
+        return future.result()
+    except _BadSplit as e:
+        raise _BadSplit(str(e), start)
+
+
+def read_chunks(path, threads=None, chunk_size=CHUNK_SIZE, read_ahead=None):
+    """Yield the decompressed content of a FASTQ(.gz) file as byte blocks, in order.
+
+    Multi-member and BGZF files are inflated on up to ``threads`` threads with
+    at most ``read_ahead`` blocks (default twice the thread count) decompressed
+    ahead of the consumer. Plain files are read as-is.
+    """
+    threads = threads or default_threads()
+    depth = read_ahead or 2 * threads
+    with open(path, "rb") as f:
+        if f.read(2) != GZIP_MAGIC:
+            f.seek(0)
+            yield from iter(lambda: f.read(chunk_size), b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            segments = None
+            if threads > 1:
+                segments = _segments(member_offsets(data), len(data), SEGMENT_SIZE)
+            if segments:
+                yield from _parallel_chunks(data, segments, threads, depth, chunk_size)
+            else:
+                yield from _read_ahead(_inflate_stream(data, 0, chunk_size), depth)
+
+
+def record_batches(chunks):
+    """Turn byte chunks into (buffer, newline positions) batches holding whole records only.
+
+    Buffers are NumPy uint8 views over the decompressed bytes, so records are
+    never split into per-line strings.
+    """
+    import numpy as np
+
+    leftover = b""
+    for chunk in chunks:
+        data = leftover + chunk if leftover else chunk
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == 10)
+        complete = len(newlines) // 4 * 4
+        if complete == 0:
+            leftover = data
+            continue
+        end = newlines[complete - 1] + 1
+        yield buf[:end], newlines[:complete]
+        leftover = data[end:]
+    if leftover.strip():
+        data = leftover if leftover.endswith(b"\n") else leftover + b"\n"
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == 10)
+        if len(newlines) % 4:
+            raise ValueError("Truncated FASTQ record at end of file")
+        yield buf, newlines
+
+
+def read_batches(path, threads=None, chunk_size=CHUNK_SIZE, read_ahead=None):
+    """Stream a FASTQ(.gz) file as batches of whole records; see record_batches."""
+    return record_batches(read_chunks(path, threads, chunk_size, read_ahead))
+
+
+def count_records(path, threads=None):
+    """Number of FASTQ records in a file."""
+    return sum(len(newlines) // 4 for _, newlines in read_batches(path, threads))
+
+
+def write_bgzf(chunks, dest, level=6):
+    """Write byte chunks to ``dest`` as BGZF, which this reader can inflate in parallel."""
+    with open(dest, "wb") as out:
+        pending = b""
+        for chunk in chunks:
+            pending += chunk
+            while len(pending) >= BGZF_BLOCK_SIZE:
+                out.write(_bgzf_block(pending[:BGZF_BLOCK_SIZE], level))
+                pending = pending[BGZF_BLOCK_SIZE:]
+        if pending:
+            out.write(_bgzf_block(pending, level))
+        out.write(_BGZF_EOF)
+
+
+def _bgzf_block(block, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = compressor.compress(block) + compressor.flush()
+    header = _BGZF_HEADER.pack(31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2,
+                               _BGZF_HEADER.size + len(deflated) + 8 - 1)
+    return header + deflated + struct.pack("<II", zlib.crc32(block), len(block))
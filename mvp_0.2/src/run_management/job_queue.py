@@ -0,0 +1,466 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from src.run_management.run_tracking import get_store
+from src.run_management import events
+from src.run_management.scheduler import DEFAULT_USER, job_demand, pick_job, allocation, free_capacity
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+# A claimed job belongs to its worker only while the worker keeps renewing its lease with heartbeats.
+LEASE_SECONDS = float(os.environ.get("BBD_JOB_LEASE_SECONDS", 60))
+MAX_ATTEMPTS = int(os.environ.get("BBD_JOB_MAX_ATTEMPTS", 3))  # Claims before a repeatedly lost job is failed
+# Columns added after the jobs table was first released, with their declarations.
+ADDED_COLUMNS = {"lease_expires": "REAL", "heartbeat_at": "REAL", "attempts": "INTEGER DEFAULT 0",
+                 "user_id": f"TEXT DEFAULT '{DEFAULT_USER}'", "priority": "INTEGER DEFAULT 0",
+                 "cpus": "INTEGER DEFAULT 1", "memory_mb": "INTEGER DEFAULT 0"}
+CANDIDATES = 200  # Queued jobs considered per claim, best-ranked first
+WAIT_WINDOW_SECONDS = 3600  # Jobs started this recently make up the reported queue wait times
+
+
+class JobCancelled(Exception):
+    """Raised by a job handler that stopped because cancellation was requested."""
+
+
+def raise_for_run_status(run_id, is_cancelled, run_store=None):
+    """End a workflow job handler: JobCancelled if the run was cancelled, an error unless it completed.
+
+    A failed job is what ``JobQueue.resubmit`` (and ``POST /runs/<run_id>/resume``) re-queues.
+    """
+    run = (run_store or get_store()).get_run(run_id)
+    status = run[4] if run else None
+    if is_cancelled() or status == "cancelled":
+        raise JobCancelled()
+    if status != "completed":
+        raise RuntimeError(f"Workflow finished with status {status}")
+
+
+class JobQueue:
+    """Durable FIFO of run jobs kept in the run store.
+
+    Submitting a job also creates its 'pending' row in ``runs``, so the returned
+    run_id can be polled straight away. Jobs are claimed atomically, which lets
+    any number of worker threads or processes share one queue. A claim is a
+    lease: workers renew it with ``heartbeat`` and ``requeue_expired`` hands
+    jobs whose worker went silent to another worker.
+
+    Each job carries the user who submitted it, a priority and the resources
+    it needs (see ``scheduler``); ``claim`` picks by fair share among users.
+    """
+
+    INSERT_JOB_SQL = '''
+        INSERT OR IGNORE INTO jobs (run_id, kind, payload, status, submitted_at, user_id, priority, cpus, memory_mb)
+        VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)
+    '''
+    # Queued jobs in scheduling order: fair share across users, then priority, then submission.
+    CANDIDATES_SQL = '''
+        SELECT q.run_id, q.cpus, q.memory_mb, q.submitted_at FROM jobs q
+        LEFT JOIN (SELECT user_id, SUM(cpus) AS cpus FROM jobs WHERE status = 'running' GROUP BY user_id) r
+               ON r.user_id = q.user_id
+        WHERE q.status = 'queued'
+        ORDER BY COALESCE(r.cpus, 0), q.priority DESC, q.submitted_at
+        LIMIT ?
+    '''
+
+    def __init__(self, run_store=None):
+        self.run_store = run_store or get_store()
+        with self.run_store.transaction() as conn:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    run_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT CHECK(status IN ({", ".join(f"'{s}'" for s in JOB_STATUSES)})),
+                    cancel_requested INTEGER DEFAULT 0,
+                    worker_id TEXT,
+                    error TEXT,
+                    submitted_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, declaration in ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {declaration}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_submitted ON jobs(status, submitted_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_lease ON jobs(status, lease_expires)")
+
+    def submit(self, kind, payload, input_files=(), user=DEFAULT_USER, priority=0, resources=None):
+        """Queue a job and create its run; returns the new run_id immediately.
+
+        ``resources`` is what the job needs ({"cpus", "memory_mb"}); by default
+        ``scheduler.job_demand`` works it out from module_metadata.json.
+        """
+        run_id = str(uuid.uuid4())
+        resources = resources or job_demand(kind, payload, input_files)
+        with self.run_store.transaction() as conn:
+            conn.execute('''
+                INSERT INTO runs (run_id, input_files, output_path, status) VALUES (?, ?, '', 'pending')
+            ''', (run_id, json.dumps(list(input_files))))
+            conn.executemany(self.run_store.RUN_INPUT_SQL,
+                             [(run_id, f, os.path.basename(f)) for f in input_files])
+            conn.execute(self.INSERT_JOB_SQL, (run_id, kind, json.dumps(payload), time.time(), user or DEFAULT_USER,
+                                               priority, resources["cpus"], resources["memory_mb"]))
+        logging.info(f"Queued {kind} job for run {run_id} (user {user}, priority {priority})")
+        events.publish(run_id, "job", status="queued")
+        return run_id
+
+    def enqueue(self, run_id, kind, payload, user=DEFAULT_USER, priority=0, resources=None):
+        """Queue a job for a run that already exists (e.g. from ``create-runs``); False if it has one."""
+        if resources is None:
+            run = self.run_store.get_run(run_id)
+            resources = job_demand(kind, payload, json.loads(run[2]) if run else ())
+        with self.run_store.transaction() as conn:
+            queued = conn.execute(self.INSERT_JOB_SQL, (
+                run_id, kind, json.dumps(payload), time.time(), user or DEFAULT_USER, priority,
+                resources["cpus"], resources["memory_mb"])).rowcount == 1
+        if queued:
+            events.publish(run_id, "job", status="queued")
+        return queued
+
+    def claim(self, worker_id, lease_seconds=LEASE_SECONDS, free=None):
+        """Atomically take the next queued job under a lease; returns (run_id, kind, payload) or None.
+
+        Users whose running jobs hold the fewest CPUs go first, then higher
+        priorities, then earlier submissions. With ``free`` ({"cpus",
+        "memory_mb"} left on the claiming pool), only a job that fits is taken
+        (see ``scheduler.pick_job``). The payload handed back carries the job's
+        requirements under "resources".
+        """
+        for _ in range(3):  # Another worker may take the chosen job first
+            now = time.time()
+            with self.run_store.transaction() as conn:
+                candidates = conn.execute(self.CANDIDATES_SQL, (CANDIDATES,)).fetchall()
+                run_id = pick_job(candidates, free, now)
+                if run_id is None:
+                    return None
+                cursor = conn.execute('''
+                    UPDATE jobs SET status = 'running', worker_id = ?, started_at = ?, heartbeat_at = ?,
+                                    lease_expires = ?, attempts = COALESCE(attempts, 0) + 1
+                    WHERE run_id = ? AND status = 'queued'
+                ''', (worker_id, now, now, now + lease_seconds, run_id))
+                if cursor.rowcount == 0:
+                    continue
+                kind, payload, cpus, memory_mb = conn.execute(
+                    "SELECT kind, payload, cpus, memory_mb FROM jobs WHERE run_id = ?", (run_id,)).fetchone()
+            events.publish(run_id, "job", status="running", worker_id=worker_id)
+            return run_id, kind, {**json.loads(payload), "resources": {"cpus": cpus, "memory_mb": memory_mb}}
+        return None
+
+    def heartbeat(self, run_id, worker_id, lease_seconds=LEASE_SECONDS):
+        """Renew ``worker_id``'s lease on a running job.
+
+        Returns whether cancellation was requested, or None if the worker no
+        longer holds the job (its lease expired and the job was re-queued).
+        """
+        now = time.time()
+        with self.run_store.transaction() as conn:
+            renewed = conn.execute('''
+                UPDATE jobs SET heartbeat_at = ?, lease_expires = ?
+                WHERE run_id = ? AND worker_id = ? AND status = 'running'
+            ''', (now, now + lease_seconds, run_id, worker_id)).rowcount
+            if not renewed:
+                return None
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE run_id = ?", (run_id,)).fetchone()
+        return bool(row[0])
+
+    def finish(self, run_id, status, error=None, worker_id=None):
+        """Record the final job status ('completed', 'failed' or 'cancelled').
+
+        A cancelled job cancels its run, and a failed one fails a run that
+        its handler left pending or running (a 'partial' run stays partial).
+        With ``worker_id``, the status is only recorded while that worker still
+        holds the job, so a worker that lost its lease cannot overwrite the
+        attempt that replaced it. Returns whether the status was recorded.
+        """
+        with self.run_store.transaction() as conn:
+            if worker_id is None:
+                conn.execute('''
+                    UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE run_id = ?
+                ''', (status, error, time.time(), run_id))
+            elif not conn.execute('''
+                UPDATE jobs SET status = ?, error = ?, finished_at = ?
+                WHERE run_id = ? AND worker_id = ? AND status = 'running'
+            ''', (status, error, time.time(), run_id, worker_id)).rowcount:
+                return False
+            if status == "cancelled":
+                conn.execute(self.run_store.UPDATE_STATUS_SQL, ("cancelled", run_id))
+            failed_run = status == "failed" and conn.execute(
+                "UPDATE runs SET status = 'failed' WHERE run_id = ? AND status IN ('pending', 'running')",
+                (run_id,)).rowcount
+        events.publish(run_id, "job", status=status, error=error)
+        if status == "cancelled" or failed_run:
+            events.publish(run_id, "status", status=status)
+        return True
+
+    def cancel(self, run_id):
+        """Cancel a job: queued jobs stop at once, running ones at the next checkpoint.
+
+        Returns the job status after the request, or None for an unknown run_id.
+        """
+        with self.run_store.transaction() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ?
+                WHERE run_id = ? AND status = 'queued'
+            ''', (time.time(), run_id))
+            conn.execute('''
+                UPDATE jobs SET cancel_requested = 1 WHERE run_id = ? AND status = 'running'
+            ''', (run_id,))
+            row = conn.execute("SELECT status FROM jobs WHERE run_id = ?", (run_id,)).fetchone()
+            if row and row[0] == "cancelled":
+                conn.execute(self.run_store.UPDATE_STATUS_SQL, ("cancelled", run_id))
+        if row and row[0] == "cancelled":
+            events.publish(run_id, "job", status="cancelled")
+            events.publish(run_id, "status", status="cancelled")
+        return row[0] if row else None
+
+    def resubmit(self, run_id):
+        """Queue a failed or cancelled job again under the same run_id; returns True if re-queued."""
+        with self.run_store.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE jobs SET status = 'queued', cancel_requested = 0, worker_id = NULL, error = NULL,
+                                submitted_at = ?, started_at = NULL, finished_at = NULL
+                WHERE run_id = ? AND status IN ('failed', 'cancelled')
+            ''', (time.time(), run_id))
+            if cursor.rowcount:
+                conn.execute(self.run_store.UPDATE_STATUS_SQL, ("pending", run_id))
+        if cursor.rowcount:
+            events.publish(run_id, "job", status="queued")
+            events.publish(run_id, "status", status="pending")
+        return cursor.rowcount > 0
+
+    def queue_stats(self, now=None):
+        """Per-user queue state and recent queue wait times.
+
+        Returns ``{"users": [{"user", "queued", "running", "running_cpus",
+        "oldest_wait_seconds"}], "wait_seconds": {"count", "mean", "p95",
+        "max"}}``; wait times cover jobs started in the last WAIT_WINDOW_SECONDS.
+        """
+        now = now or time.time()
+        conn = self.run_store.connection()
+        users = [dict(zip(("user", "queued", "running", "running_cpus", "oldest_wait_seconds"), row))
+                 for row in conn.execute('''
+                     SELECT user_id, SUM(status = 'queued'), SUM(status = 'running'),
+                            SUM(CASE WHEN status = 'running' THEN cpus ELSE 0 END),
+                            ? - MIN(CASE WHEN status = 'queued' THEN submitted_at END)
+                     FROM jobs WHERE status IN ('queued', 'running') GROUP BY user_id ORDER BY user_id
+                 ''', (now,))]
+        waits = sorted(wait for (wait,) in conn.execute('''
+            SELECT started_at - submitted_at FROM jobs WHERE started_at >= ?
+        ''', (now - WAIT_WINDOW_SECONDS,)))
+        summary = {"count": len(waits), "mean": None, "p95": None, "max": None}
+        if waits:
+            summary.update(mean=sum(waits) / len(waits), max=waits[-1],
+                           p95=waits[min(len(waits) - 1, int(0.95 * len(waits)))])
+        return {"users": users, "wait_seconds": summary}
+
+    def is_cancel_requested(self, run_id):
+        row = self.run_store.connection().execute(
+            "SELECT cancel_requested FROM jobs WHERE run_id = ?", (run_id,)).fetchone()
+        return bool(row and row[0])
+
+    def get(self, run_id):
+        """Job details as a dict, or None for an unknown run_id."""
+        row = self.run_store.connection().execute('''
+            SELECT run_id, kind, status, cancel_requested, worker_id, error, submitted_at, started_at, finished_at,
+                   user_id, priority, cpus, memory_mb
+            FROM jobs WHERE run_id = ?
+        ''', (run_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ("run_id", "kind", "status", "cancel_requested", "worker_id", "error",
+                "submitted_at", "started_at", "finished_at", "user", "priority", "cpus", "memory_mb")
+        job = dict(zip(keys, row))
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        if job["status"] == "queued" or job["started_at"]:
+            job["queue_wait_seconds"] = (job["started_at"] or time.time()) - job["submitted_at"]
+        return job
+
+    def requeue_expired(self, max_attempts=MAX_ATTEMPTS):
+        """Re-queue running jobs whose lease expired without a heartbeat.
+
+        The job keeps its place at the front of the queue. Jobs already claimed
+        ``max_attempts`` times are failed instead, and jobs whose cancellation
+        was requested are cancelled. Returns ``{"requeued", "failed", "cancelled"}`` run_id lists.
+        """
+        now = time.time()
+        outcome = {"requeued": [], "failed": [], "cancelled": []}
+        transitions = []
+        with self.run_store.transaction() as conn:
+            expired = conn.execute('''
+                SELECT run_id, worker_id, COALESCE(attempts, 0), cancel_requested FROM jobs
+                WHERE status = 'running' AND lease_expires < ?
+            ''', (now,)).fetchall()
+            for run_id, worker_id, attempts, cancel_requested in expired:
+                if cancel_requested:
+                    status, run_status, error = "cancelled", "cancelled", None
+                elif attempts >= max_attempts:
+                    status, run_status = "failed", "failed"
+                    error = f"Lease expired {attempts} time(s); last worker {worker_id}"
+                else:
+                    status, run_status, error = "queued", "pending", None
+                conn.execute('''
+                    UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires = NULL,
+                                    started_at = CASE WHEN ? = 'queued' THEN NULL ELSE started_at END,
+                                    finished_at = CASE WHEN ? = 'queued' THEN NULL ELSE ? END
+                    WHERE run_id = ?
+                ''', (status, error, status, status, now, run_id))
+                conn.execute(self.run_store.UPDATE_STATUS_SQL, (run_status, run_id))
+                outcome["requeued" if status == "queued" else status].append(run_id)
+                transitions.append((run_id, worker_id, status, run_status))
+        for run_id, worker_id, status, run_status in transitions:
+            logging.warning(f"Lease of worker {worker_id} on job {run_id} expired; job is now {status}")
+            events.publish(run_id, "job", status=status)
+            events.publish(run_id, "status", status=run_status)
+        return outcome
+
+
+class JobWorkerPool:
+    """Background threads that drain a JobQueue.
+
+    ``handlers`` maps a job kind to ``handler(run_id, payload, is_cancelled)``.
+    A handler that notices ``is_cancelled()`` should raise ``JobCancelled``.
+    ``executor`` decides where handlers run (see ``executors``; by default on
+    the worker thread itself). A maintenance thread renews the lease of every
+    running job and, with ``reap``, re-queues jobs whose worker elsewhere has
+    stopped heartbeating; with ``workers=0`` the pool only does the latter.
+    ``queue`` may be any object with JobQueue's claim/heartbeat/finish API.
+
+    With a ``capacity`` ({"cpus", "memory_mb"}, see ``scheduler.host_capacity``)
+    workers only claim jobs that fit next to the running ones, and each
+    handler's payload "resources" is the share it was admitted with.
+    ``workers`` then only caps how many jobs run at once.
+    """
+
+    def __init__(self, queue, handlers, workers=2, poll_interval=1.0, executor=None,
+                 lease_seconds=LEASE_SECONDS, reap=True, capacity=None):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.executor = executor
+        self.lease_seconds = lease_seconds
+        self.reap = reap
+        self.capacity = capacity
+        self._allocations = {}  # run_id -> resources admitted for the jobs this pool is executing
+        self._admit_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+        self._running = {}  # run_id -> worker_id of the jobs this pool is executing
+        self._lost = set()  # run_ids whose lease this pool lost
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._threads:
+            return self
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{uuid.uuid4().hex[:8]}-{i}",),
+                                      name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._maintain, name="job-leases", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def notify(self):
+        """Wake idle workers after a submission instead of waiting for the next poll."""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.executor is not None:
+            self.executor.close()
+
+    def _work(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                job = self._admit(worker_id)
+            except Exception as e:  # E.g. the backend of an HttpJobQueue is restarting
+                logging.warning(f"Worker {worker_id} could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.run_job(*job, worker_id=worker_id)
+
+    def _admit(self, worker_id):
+        """Claim a job that fits the capacity left and reserve its share; one worker at a time."""
+        if self.capacity is None:
+            return self.queue.claim(worker_id, self.lease_seconds)
+        with self._admit_lock:
+            free = free_capacity(self.capacity, list(self._allocations.values()))
+            job = self.queue.claim(worker_id, self.lease_seconds, free)
+            if job is None:
+                return None
+            run_id, kind, payload = job
+            share = allocation(payload.get("resources") or {"cpus": 1, "memory_mb": 0}, self.capacity)
+            self._allocations[run_id] = share
+        return run_id, kind, {**payload, "resources": share}
+
+    def _maintain(self):
+        """Renew leases of running jobs and reap expired ones, a few times per lease period."""
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                running = list(self._running.items())
+            for run_id, worker_id in running:
+                try:
+                    if self.queue.heartbeat(run_id, worker_id, self.lease_seconds) is None:
+                        logging.warning(f"Lost the lease on job {run_id}; it was handed to another worker")
+                        with self._lock:
+                            self._lost.add(run_id)
+                except Exception as e:  # A missed heartbeat is retried; the lease outlives a few
+                    logging.warning(f"Heartbeat for job {run_id} failed: {e}")
+            if self.reap:
+                try:
+                    self.queue.requeue_expired()
+                except Exception as e:
+                    logging.warning(f"Could not re-queue expired jobs: {e}")
+
+    def is_cancelled(self, run_id):
+        """Whether a running job should stop: cancellation was requested or its lease was lost."""
+        return run_id in self._lost or self.queue.is_cancel_requested(run_id)
+
+    def run_job(self, run_id, kind, payload, worker_id=None):
+        handler = self.handlers.get(kind)
+        if handler is None:
+            self.queue.finish(run_id, "failed", f"No handler for job kind {kind!r}", worker_id=worker_id)
+            return
+        with self._lock:
+            self._running[run_id] = worker_id
+        try:
+            if self.executor is None:
+                handler(run_id, payload, lambda: self.is_cancelled(run_id))
+            else:
+                self.executor.run(handler, run_id, payload, lambda: self.is_cancelled(run_id))
+        except JobCancelled:
+            logging.info(f"Job {run_id} cancelled")
+            status, error = "cancelled", None
+        except Exception as e:
+            logging.error(f"Job {run_id} failed: {e}")
+            status, error = "failed", str(e)
+        else:
+            status, error = "completed", None
+        finally:
+            with self._lock:
+                self._running.pop(run_id, None)
+                lost = run_id in self._lost
+                self._lost.discard(run_id)
+            with self._admit_lock:
+                freed = self._allocations.pop(run_id, None) is not None
+            if freed:
+                self._wake.set()  # Capacity was freed; let idle workers claim again
+        if lost:
+            logging.warning(f"Discarding the {status} result of job {run_id}: its lease was lost")
+            return
+        if not self.queue.finish(run_id, status, error, worker_id=worker_id):
+            logging.warning(f"Job {run_id} was re-queued while running; its {status} result was discarded")
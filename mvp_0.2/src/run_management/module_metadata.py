@@ -0,0 +1,25 @@
+import os
+import json
+from functools import lru_cache
+
+# Module descriptions shipped with the repository; override with BBD_MODULE_METADATA.
+DEFAULT_METADATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "module_metadata.json"))
+
+@lru_cache(maxsize=8)
+def _load(path, mtime_ns):
+    with open(path) as f:
+        return {module["name"].lower(): module for module in json.load(f)}
+
+def load_module_metadata(path=None):
+    """Return module_metadata.json as a dict keyed by lower-cased module name."""
+    path = os.path.abspath(path or os.environ.get("BBD_MODULE_METADATA", DEFAULT_METADATA_PATH))
+    return _load(path, os.stat(path).st_mtime_ns)
+
+def get_module(name, path=None):
+    """Look up a module description by name (case-insensitive); None if unknown."""
+    return load_module_metadata(path).get(str(name).lower())
+
+def module_version(name, path=None):
+    """Version string of a module, or "unknown" if it is not described."""
+    module = get_module(name, path)
+    return module.get("version", "unknown") if module else "unknown"
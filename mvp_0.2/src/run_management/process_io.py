@@ -0,0 +1,227 @@
+import os
+import gzip
+import shutil
+import logging
+import threading
+import selectors
+from collections import deque
+
+# Per-log limits; override with BBD_LOG_MAX_BYTES, BBD_LOG_BACKUPS, BBD_LOG_COMPRESS and BBD_LOG_TAIL_LINES.
+DEFAULT_MAX_BYTES = int(os.environ.get("BBD_LOG_MAX_BYTES", 64 * 1024 * 1024))
+DEFAULT_BACKUPS = int(os.environ.get("BBD_LOG_BACKUPS", 3))
+DEFAULT_COMPRESS = os.environ.get("BBD_LOG_COMPRESS", "1") == "1"
+DEFAULT_TAIL_LINES = int(os.environ.get("BBD_LOG_TAIL_LINES", 200))
+MAX_LINE_BYTES = 4096   # Longer lines (e.g. progress bars without newlines) are cut in the tail
+READ_SIZE = 64 * 1024   # Bytes read from a pipe at a time
+DRAIN_TIMEOUT = 10      # Seconds to keep reading after the child exits, for output of orphaned grandchildren
+
+_active = {}
+_active_lock = threading.Lock()
+
+
+class LogTail:
+    """Thread-safe ring buffer of the last ``maxlen`` lines written to a log."""
+
+    def __init__(self, maxlen=DEFAULT_TAIL_LINES):
+        self._lines = deque(maxlen=maxlen)
+        self._partial = b""
+        self._lock = threading.Lock()
+
+    def feed(self, data):
+        with self._lock:
+            *complete, self._partial = (self._partial + data).split(b"\n")
+            self._partial = self._partial[-MAX_LINE_BYTES:]
+            for line in complete[-self._lines.maxlen:]:
+                self._lines.append(line[:MAX_LINE_BYTES].rstrip(b"\r").decode("utf-8", "replace"))
+
+    @property
+    def maxlen(self):
+        return self._lines.maxlen
+
+    def lines(self, n=None):
+        """The last ``n`` (default: all buffered) lines, including an unterminated last line."""
+        with self._lock:
+            lines = list(self._lines)
+            if self._partial:
+                lines.append(self._partial.rstrip(b"\r").decode("utf-8", "replace"))
+        return lines[-n:] if n else lines
+
+
+class StepLog:
+    """Size-capped, rotating log of one step's output, with an in-memory tail.
+
+    Once the log reaches ``max_bytes`` it is renamed to ``<path>.1`` (older
+    backups shift up, at most ``backups`` are kept) and, with ``compress``,
+    gzipped in the background so writers are never held up; disk use is
+    bounded by roughly ``max_bytes * (backups + 1)``. Accepts ``str`` and
+    ``bytes``. While open, the log is registered so ``tail_log`` can serve its
+    last lines from memory.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS, compress=DEFAULT_COMPRESS,
+                 tail_lines=DEFAULT_TAIL_LINES):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.tail = LogTail(tail_lines)
+        self.bytes_written = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._compressor = None
+        self._file = open(self.path, "wb")
+        self._size = 0
+        with _active_lock:
+            _active[self.path] = self
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8", "replace")
+        written = len(data)
+        with self._lock:
+            self.tail.feed(data)
+            self.bytes_written += written
+            while data:
+                room = self.max_bytes - self._size
+                if room <= 0:
+                    self._rotate()
+                    room = self.max_bytes
+                self._file.write(data[:room])
+                self._size += min(room, len(data))
+                data = data[room:]
+            self._file.flush()  # Keep the file on disk current for readers in other processes
+        return written
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def _backup(self, n):
+        return f"{self.path}.{n}"
+
+    def _rotate(self):
+        self._file.close()
+        if self._compressor is not None:
+            self._compressor.join()  # The previous backup must be compressed before it is shifted
+        for n in range(self.backups, 0, -1):
+            for suffix in ("", ".gz"):
+                source = self._backup(n) + suffix
+                if not os.path.exists(source):
+                    continue
+                if n == self.backups:
+                    os.remove(source)
+                else:
+                    os.replace(source, self._backup(n + 1) + suffix)
+        if self.backups > 0:
+            os.replace(self.path, self._backup(1))
+            if self.compress:
+                self._compressor = threading.Thread(target=_gzip_file, args=(self._backup(1),), daemon=True)
+                self._compressor.start()
+        self._file = open(self.path, "wb")
+        self._size = 0
+        self.rotations += 1
+
+    def close(self):
+        with _active_lock:
+            if _active.get(self.path) is self:
+                del _active[self.path]
+        with self._lock:
+            self._file.close()
+        if self._compressor is not None:
+            self._compressor.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _gzip_file(path):
+    try:
+        with open(path, "rb") as src, gzip.open(f"{path}.gz.tmp", "wb", compresslevel=6) as dest:
+            shutil.copyfileobj(src, dest)
+        os.replace(f"{path}.gz.tmp", f"{path}.gz")
+        os.remove(path)
+    except OSError as e:
+        logging.warning(f"Could not compress rotated log {path}: {e}")
+
+
+def is_sink(target):
+    """Whether ``target`` is an in-process writer (like StepLog) rather than a file descriptor."""
+    return target is not None and not isinstance(target, int) and hasattr(target, "write") \
+        and not hasattr(target, "fileno")
+
+
+def pump_output(streams):
+    """Start a thread copying each pipe in ``{pipe: sink}`` to its sink until all reach EOF.
+
+    Pipes are switched to non-blocking mode and multiplexed with a selector,
+    so a chatty stderr is drained even while stdout is idle and the child
+    never stalls on a full pipe. Returns the (daemon) thread.
+    """
+    selector = selectors.DefaultSelector()
+    for pipe, sink in streams.items():
+        os.set_blocking(pipe.fileno(), False)
+        selector.register(pipe, selectors.EVENT_READ, sink)
+
+    def run():
+        try:
+            while selector.get_map():
+                for key, _ in selector.select():
+                    try:
+                        data = os.read(key.fd, READ_SIZE)
+                    except BlockingIOError:
+                        continue
+                    if data:
+                        key.data.write(data)
+                    else:
+                        selector.unregister(key.fileobj)
+        except (OSError, ValueError) as e:  # Pipes closed underneath us after DRAIN_TIMEOUT
+            logging.debug(f"Output pump stopped: {e}")
+        finally:
+            selector.close()
+
+    thread = threading.Thread(target=run, name="output-pump", daemon=True)
+    thread.start()
+    return thread
+
+
+def _read_last_lines(path, n):
+    """Last ``n`` lines of a file on disk, reading backwards at most ``n * MAX_LINE_BYTES`` bytes."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        start = max(0, end - n * MAX_LINE_BYTES)
+        pos, data = end, b""
+        while pos > start and data.count(b"\n") <= n:
+            step = min(READ_SIZE, pos - start)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.split(b"\n")
+    if lines and lines[-1] == b"":
+        lines.pop()
+    if pos > 0 and lines:
+        lines.pop(0)  # Probably cut mid-line
+    return [line[:MAX_LINE_BYTES].rstrip(b"\r").decode("utf-8", "replace") for line in lines[-n:]]
+
+
+def tail_log(path, n=DEFAULT_TAIL_LINES):
+    """``(lines, active)``: the last ``n`` lines of a step log, from memory while it is being written.
+
+    Requests for more lines than an active log keeps in memory are read from
+    its file, which is flushed on every write (lines rotated out are not included).
+    """
+    with _active_lock:
+        log = _active.get(os.path.abspath(path))
+    if log is not None:
+        if n <= log.tail.maxlen:
+            return log.tail.lines(n), True
+        return _read_last_lines(path, n), True
+    return _read_last_lines(path, n), False
+
+
+def is_active(path):
+    with _active_lock:
+        return os.path.abspath(path) in _active
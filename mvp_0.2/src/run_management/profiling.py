@@ -0,0 +1,218 @@
+import os
+import time
+import bisect
+import resource
+import threading
+import subprocess
+from contextlib import contextmanager
+from src.run_management.process_io import is_sink, pump_output, DRAIN_TIMEOUT
+
+METRIC_FIELDS = ("wall_seconds", "user_cpu_seconds", "system_cpu_seconds", "max_rss_kb",
+                 "read_bytes", "write_bytes", "exit_code")
+
+# Upper bounds (seconds) of the orchestrator stage histogram buckets.
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _proc_io(path):
+    """(read_bytes, write_bytes) from a /proc/.../io file; zeros where /proc is unavailable."""
+    try:
+        with open(path) as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["read_bytes"]), int(fields["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def _exit_code(status):
+    """Return code for a wait status, negative for a signal as ``subprocess`` reports it."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_profiled(args, stdout=None, stderr=None, check=False, **kwargs):
+    """``subprocess.run`` for a pipeline step that also measures the child.
+
+    Returns a CompletedProcess with a ``metrics`` dict (see METRIC_FIELDS): wall
+    time, CPU time and peak RSS from ``wait4`` and storage I/O from
+    ``/proc/<pid>/io``, read after the child exits but before it is reaped.
+    Both include descendants the child waited for, e.g. under ``shell=True``.
+    With ``check``, a non-zero exit raises CalledProcessError carrying the
+    same ``metrics``. ``stdout``/``stderr`` may also be writers without a
+    file descriptor, such as a ``process_io.StepLog``: the output is then
+    streamed to them through pipes as it is produced.
+    """
+    sinks = {name: target for name, target in (("stdout", stdout), ("stderr", stderr)) if is_sink(target)}
+    started = time.monotonic()
+    with subprocess.Popen(args, stdout=subprocess.PIPE if "stdout" in sinks else stdout,
+                          stderr=subprocess.PIPE if "stderr" in sinks else stderr, **kwargs) as proc:
+        pump = pump_output({getattr(proc, name): sink for name, sink in sinks.items()}) if sinks else None
+        reaped = False
+        try:
+            read_bytes = write_bytes = 0
+            if hasattr(os, "waitid"):
+                os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+                read_bytes, write_bytes = _proc_io(f"/proc/{proc.pid}/io")
+            _, status, usage = os.wait4(proc.pid, 0)
+            reaped = True
+            proc.returncode = _exit_code(status)
+        except BaseException:
+            if not reaped:  # Once reaped, the PID may already belong to another process
+                proc.kill()
+            raise
+        finally:
+            if pump is not None:
+                pump.join(DRAIN_TIMEOUT)
+    metrics = {
+        "wall_seconds": time.monotonic() - started,
+        "user_cpu_seconds": usage.ru_utime,
+        "system_cpu_seconds": usage.ru_stime,
+        "max_rss_kb": usage.ru_maxrss,
+        "read_bytes": read_bytes,
+        "write_bytes": write_bytes,
+        "exit_code": proc.returncode,
+    }
+    if check and proc.returncode:
+        error = subprocess.CalledProcessError(proc.returncode, args)
+        error.metrics = metrics
+        raise error
+    result = subprocess.CompletedProcess(args, proc.returncode)
+    result.metrics = metrics
+    return result
+
+
+@contextmanager
+def profile_block():
+    """Measure in-process work on the calling thread; yields the metrics dict, filled on exit.
+
+    CPU time and I/O are the thread's own; peak RSS is the whole process's,
+    since threads share one address space. ``exit_code`` is 1 if the block raised.
+    """
+    usage_of = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+    io_path = f"/proc/self/task/{threading.get_native_id()}/io"
+    metrics = {}
+    read_start, write_start = _proc_io(io_path)
+    usage_start = resource.getrusage(usage_of)
+    started = time.monotonic()
+    metrics["exit_code"] = 1
+    try:
+        yield metrics
+        metrics["exit_code"] = 0
+    finally:
+        usage = resource.getrusage(usage_of)
+        read_end, write_end = _proc_io(io_path)
+        metrics.update({
+            "wall_seconds": time.monotonic() - started,
+            "user_cpu_seconds": usage.ru_utime - usage_start.ru_utime,
+            "system_cpu_seconds": usage.ru_stime - usage_start.ru_stime,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "read_bytes": read_end - read_start,
+            "write_bytes": write_end - write_start,
+        })
+
+
+class Histogram:
+    """Thread-safe cumulative histogram per label value, in Prometheus' bucket layout."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}  # label -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label, value):
+        with self._lock:
+            series = self._series.setdefault(label, [0] * (len(self.buckets) + 1) + [0.0])
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def collect(self):
+        """{label: (cumulative bucket counts incl. +Inf, sum)}."""
+        with self._lock:
+            snapshot = {label: list(series) for label, series in self._series.items()}
+        collected = {}
+        for label, series in snapshot.items():
+            counts, total = series[:-1], series[-1]
+            cumulative = [sum(counts[:i + 1]) for i in range(len(counts))]
+            collected[label] = (cumulative, total)
+        return collected
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+stage_seconds = Histogram()
+
+
+@contextmanager
+def timed(stage):
+    """Record how long the enclosed orchestrator stage takes (e.g. "llm_call")."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(stage, time.monotonic() - started)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_metrics(run_store, queue_stats=None):
+    """Prometheus text exposition of run, step and orchestrator-stage metrics.
+
+    ``queue_stats`` (``JobQueue.queue_stats()``) adds per-user queue gauges and recent queue wait times.
+    """
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_labels(**labels) if labels else ''} {value}")
+
+    runs = run_store.runs_by_status()
+    metric("bbd_runs", "gauge", "Runs by current status.",
+           [("", {"status": status}, count) for status, count in runs])
+
+    if queue_stats is not None:
+        users = queue_stats["users"]
+        metric("bbd_jobs", "gauge", "Queued and running jobs by user.",
+               [("", {"user": u["user"], "status": status}, u[status])
+                for u in users for status in ("queued", "running")])
+        metric("bbd_jobs_running_cpus", "gauge", "CPUs held by each user's running jobs.",
+               [("", {"user": u["user"]}, u["running_cpus"]) for u in users])
+        waits = queue_stats["wait_seconds"]
+        metric("bbd_queue_wait_seconds", "summary", "Time jobs started in the last hour spent queued.",
+               [("", {"quantile": "0.95"}, waits["p95"] or 0),
+                ("_sum", {}, (waits["mean"] or 0) * waits["count"]), ("_count", {}, waits["count"])])
+
+    steps = run_store.step_metrics_summary()
+    metric("bbd_step_executions_total", "counter", "Measured step executions by module and outcome.",
+           [("", {"module": s["module"], "outcome": outcome}, s[outcome])
+            for s in steps for outcome in ("succeeded", "failed")])
+    metric("bbd_step_wall_seconds", "summary", "Wall-clock time of measured steps.",
+           [(suffix, {"module": s["module"]}, s[key]) for s in steps
+            for suffix, key in (("_sum", "wall_seconds"), ("_count", "executions"))])
+    metric("bbd_step_cpu_seconds_total", "counter", "CPU time of measured steps.",
+           [("", {"module": s["module"], "mode": mode}, s[f"{mode}_cpu_seconds"])
+            for s in steps for mode in ("user", "system")])
+    metric("bbd_step_max_rss_bytes", "gauge", "Largest peak resident set size of any step of the module.",
+           [("", {"module": s["module"]}, s["max_rss_kb"] * 1024) for s in steps])
+    metric("bbd_step_io_bytes_total", "counter", "Storage I/O of measured steps.",
+           [("", {"module": s["module"], "direction": d}, s[f"{d}_bytes"])
+            for s in steps for d in ("read", "write")])
+
+    samples = []
+    for stage, (cumulative, total) in sorted(stage_seconds.collect().items()):
+        bounds = [str(b) for b in stage_seconds.buckets] + ["+Inf"]
+        samples += [("_bucket", {"stage": stage, "le": le}, count) for le, count in zip(bounds, cumulative)]
+        samples += [("_sum", {"stage": stage}, total), ("_count", {"stage": stage}, cumulative[-1])]
+    metric("bbd_orchestrator_stage_seconds", "histogram",
+           "Duration of workflow-generation stages (registry fetch, LLM call, JSON parse).", samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,182 @@
+"""
+Remote job worker: claims queued jobs from the run store and executes them on this host.
+
+On a host that can open the run store's database (its own disk, not NFS):
+
+    python -m src.run_management.remote_worker --db /srv/bbd/runs.db --workers 4
+
+On any other host, through the backend API (run directories must be on storage
+shared with the API host):
+
+    python -m src.run_management.remote_worker --url http://api-host:5000 --workers 4
+
+Every claim is a lease the worker renews with heartbeats; if a worker dies,
+its jobs go back to the queue once the lease (``BBD_JOB_LEASE_SECONDS``)
+expires. Workers run ``qc`` and ``workflow`` jobs, only as many as fit in
+the host's CPUs and memory (``--cpus``/``--memory-mb``), and stop after
+their running jobs finish on SIGTERM or Ctrl-C.
+"""
+import os
+import time
+import signal
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+from src.run_management.run_tracking import RunStore, set_store
+from src.run_management.job_queue import JobQueue, JobWorkerPool, LEASE_SECONDS, raise_for_run_status
+from src.run_management.run_executor import run_qc_job, available_cpus
+from src.run_management.executors import make_executor
+from src.run_management.scheduler import host_capacity
+
+HTTP_RETRIES = 3  # Attempts per request to the backend before an error is raised
+FILE_FIELDS = ("input_file", "status", "return_code", "log_path")
+
+_orchestrator = None
+
+def run_workflow_job(run_id, payload, is_cancelled):
+    """Job handler for ``workflow`` jobs queued by the backend; executing a plan makes no LLM calls."""
+    global _orchestrator
+    if _orchestrator is None:
+        from src.ai_orchestrator import AIOrchestrator
+        _orchestrator = AIOrchestrator(os.getenv("OPENAI_API_KEY") or "unused")
+    _orchestrator.execute_workflow(payload["workflow"], payload["base_path"],
+                                   input_files=payload.get("input_files"), run_id=run_id, cancel_check=is_cancelled,
+                                   resources=payload.get("resources"))
+    raise_for_run_status(run_id, is_cancelled)
+
+JOB_HANDLERS = {"qc": run_qc_job, "workflow": run_workflow_job}
+
+
+class HttpJobQueue:
+    """JobQueue's worker-side API, served by the backend's ``/jobs`` endpoints.
+
+    Each claimed run is mirrored into ``run_store``, a scratch store on the
+    worker that handlers write to; the run's status, per-file statuses and
+    step metrics are sent back with ``finish``. Cancellation requests arrive
+    with heartbeat replies.
+    """
+
+    def __init__(self, url, run_store, timeout=30):
+        import requests
+
+        self.url = url.rstrip("/")
+        self.run_store = run_store
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._retryable = (requests.ConnectionError, requests.Timeout)
+        self._cancel = {}
+
+    def _post(self, path, body):
+        for attempt in range(HTTP_RETRIES):
+            try:
+                return self.session.post(f"{self.url}{path}", json=body, timeout=self.timeout)
+            except self._retryable as e:
+                if attempt == HTTP_RETRIES - 1:
+                    raise
+                logging.warning(f"POST {path} failed ({e}); retrying")
+                time.sleep(2 ** attempt)
+
+    def claim(self, worker_id, lease_seconds=LEASE_SECONDS, free=None):
+        response = self._post("/jobs/claim", {"worker_id": worker_id, "lease_seconds": lease_seconds, "free": free})
+        if response.status_code == 204:
+            return None
+        response.raise_for_status()
+        job = response.json()
+        run_id, run = job["run_id"], job["run"]
+        self._forget(run_id)  # Left over from an earlier attempt on this worker
+        self.run_store.restore_run(run_id, None, run["input_files"], run["output_path"], "pending")
+        if run.get("run_dir"):
+            self.run_store.index_run(run_id, run["run_dir"])
+        self._cancel[run_id] = False
+        return run_id, job["kind"], job["payload"]
+
+    def heartbeat(self, run_id, worker_id, lease_seconds=LEASE_SECONDS):
+        response = self._post(f"/jobs/{run_id}/heartbeat", {"worker_id": worker_id, "lease_seconds": lease_seconds})
+        if response.status_code == 409:
+            return None
+        response.raise_for_status()
+        self._cancel[run_id] = response.json()["cancel_requested"]
+        return self._cancel[run_id]
+
+    def is_cancel_requested(self, run_id):
+        return self._cancel.get(run_id, False)
+
+    def finish(self, run_id, status, error=None, worker_id=None):
+        run = self.run_store.get_run(run_id)
+        response = self._post(f"/jobs/{run_id}/finish", {
+            "worker_id": worker_id,
+            "status": status,
+            "error": error,
+            "run_status": run[4] if run else None,
+            "files": [dict(zip(FILE_FIELDS, row)) for row in self.run_store.get_file_statuses(run_id)],
+            "metrics": self.run_store.get_step_metrics(run_id),
+        })
+        self._cancel.pop(run_id, None)
+        self._forget(run_id)
+        if response.status_code == 409:
+            return False
+        response.raise_for_status()
+        return True
+
+    def requeue_expired(self):
+        """Expired leases are reaped by the backend."""
+        return {"requeued": [], "failed": [], "cancelled": []}
+
+    def _forget(self, run_id):
+        with self.run_store.transaction() as conn:
+            for table in ("run_files", "run_steps", "step_metrics", "run_inputs", "run_index", "runs"):
+                conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Execute queued BBD.bio jobs on this host")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--db", help="Run store database to claim jobs from directly")
+    source.add_argument("--url", help="Backend API to claim jobs through, e.g. http://api-host:5000")
+    parser.add_argument("--workers", type=int, default=available_cpus(), help="Jobs run concurrently")
+    parser.add_argument("--executor", choices=("local", "process"), default="local",
+                        help="Run jobs on worker threads or in a pool of worker processes")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS, help="Lease renewed by heartbeats")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between claims when idle")
+    capacity = host_capacity()
+    parser.add_argument("--cpus", type=int, default=capacity["cpus"], help="CPUs the jobs on this host may use")
+    parser.add_argument("--memory-mb", type=int, default=capacity["memory_mb"],
+                        help="Memory the jobs on this host may use (0: not limited)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    scratch = None
+    if args.db:
+        store = set_store(RunStore(args.db))
+        store.initialize()
+        queue = JobQueue(store)
+    else:
+        scratch = tempfile.mkdtemp(prefix="bbd-worker-")
+        store = set_store(RunStore(os.path.join(scratch, "runs.db")))
+        store.initialize()
+        queue = HttpJobQueue(args.url, store)
+
+    pool = JobWorkerPool(queue, JOB_HANDLERS, workers=args.workers, poll_interval=args.poll_interval,
+                         executor=make_executor(args.executor, args.workers, store),
+                         lease_seconds=args.lease_seconds, reap=bool(args.db),
+                         capacity={"cpus": args.cpus, "memory_mb": args.memory_mb})
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    logging.info(f"Worker started with {args.workers} slot(s), {args.cpus} CPU(s) and {args.memory_mb or 'unlimited'} MB, "
+                 f"claiming from {args.db or args.url}")
+    pool.start()
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logging.info("Worker stopping after its running jobs finish")
+        pool.stop()
+        store.close()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
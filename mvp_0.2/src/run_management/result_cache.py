@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from src.run_management.run_tracking import get_store
+from src.run_management.staging import cached_checksum, clone_or_copy
+from src.run_management.module_metadata import module_version
+
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+
+class ResultCache:
+    """Step-level cache of module outputs.
+
+    Entries are keyed on the content hash of every input, the module name and
+    version (from module_metadata.json) and the step parameters. Output files
+    live under ``<root>/<key>/``; the index, LRU timestamps and hit/miss counters
+    live in the run store. The cache is kept under ``max_bytes`` by evicting the
+    least recently used entries. Entries are reflinked or copied, never
+    hardlinked, so a step that rewrites its outputs in place cannot change them.
+    """
+
+    def __init__(self, root, run_store=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.run_store = run_store or get_store()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        with self.run_store.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    module TEXT NOT NULL,
+                    files TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hit_count INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_lru ON result_cache(last_access)")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS result_cache_stats (
+                    counter TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+
+    @staticmethod
+    def make_key(input_digests, module, version, params=None):
+        """Cache key for a module run over inputs with the given content digests."""
+        payload = json.dumps({
+            "inputs": list(input_digests),
+            "module": str(module).lower(),
+            "version": version,
+            "params": params or {},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def key_for(self, input_files, module, params=None):
+        """Cache key for running ``module`` with ``params`` on ``input_files``."""
+        digests = [cached_checksum(f, self.run_store) for f in input_files]
+        return self.make_key(digests, module, module_version(module), params)
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _count(self, conn, counter):
+        conn.execute('''
+            INSERT INTO result_cache_stats (counter, value) VALUES (?, 1)
+            ON CONFLICT(counter) DO UPDATE SET value = value + 1
+        ''', (counter,))
+
+    def lookup(self, key):
+        """Return the cached output paths for ``key``, or None on a miss."""
+        with self.run_store.transaction() as conn:
+            row = conn.execute("SELECT files FROM result_cache WHERE cache_key = ?", (key,)).fetchone()
+            files = [os.path.join(self.entry_dir(key), f) for f in json.loads(row[0])] if row else None
+            if files is None or not all(os.path.exists(f) for f in files):
+                if row:
+                    conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (key,))
+                self._count(conn, "misses")
+                return None
+            conn.execute('''
+                UPDATE result_cache SET last_access = ?, hit_count = hit_count + 1 WHERE cache_key = ?
+            ''', (time.time(), key))
+            self._count(conn, "hits")
+        return files
+
+    def materialise(self, key, output_dir):
+        """Place the cached outputs for ``key`` in ``output_dir``; None on a miss."""
+        files = self.lookup(key)
+        if files is None:
+            return None
+        os.makedirs(output_dir, exist_ok=True)
+        placed = []
+        for path in files:
+            dest = os.path.join(output_dir, os.path.basename(path))
+            clone_or_copy(path, dest)
+            placed.append(dest)
+        return placed
+
+    def put(self, key, module, output_files):
+        """Store ``output_files`` as the result for ``key`` and evict old entries if needed."""
+        target = self.entry_dir(key)
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".incoming-")
+        try:
+            names = []
+            for path in output_files:
+                name = os.path.basename(path)
+                clone_or_copy(path, os.path.join(tmp, name))
+                names.append(name)
+            size = sum(os.path.getsize(os.path.join(tmp, n)) for n in names)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.rename(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+
+        now = time.time()
+        with self.run_store.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO result_cache (cache_key, module, files, size_bytes, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, module, json.dumps(names), size, now, now))
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in ``max_bytes``."""
+        with self._lock:
+            conn = self.run_store.connection()
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM result_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, size in conn.execute("SELECT cache_key, size_bytes FROM result_cache ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+            with self.run_store.transaction() as conn:
+                conn.executemany("DELETE FROM result_cache WHERE cache_key = ?", [(k,) for k in evicted])
+                conn.execute('''
+                    INSERT INTO result_cache_stats (counter, value) VALUES ('evictions', ?)
+                    ON CONFLICT(counter) DO UPDATE SET value = value + excluded.value
+                ''', (len(evicted),))
+            for key in evicted:
+                shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+            logging.info(f"Result cache evicted {len(evicted)} entr{'y' if len(evicted) == 1 else 'ies'}")
+
+    def stats(self):
+        """Hit/miss counters plus current entry count and size."""
+        conn = self.run_store.connection()
+        counters = dict(conn.execute("SELECT counter, value FROM result_cache_stats").fetchall())
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM result_cache").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """Return the process-wide ResultCache.
+
+    It lives next to the run database unless BBD_RESULT_CACHE is set;
+    BBD_RESULT_CACHE_MAX_BYTES overrides the size bound.
+    """
+    global _cache
+    with _cache_lock:
+        store = get_store()
+        if _cache is None or _cache.run_store is not store:
+            root = os.environ.get("BBD_RESULT_CACHE",
+                                  os.path.join(os.path.dirname(store.db_path), "result_cache"))
+            max_bytes = int(os.environ.get("BBD_RESULT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            _cache = ResultCache(root, store, max_bytes)
+        return _cache
@@ -1,21 +1,211 @@
 import os
 import subprocess
 import json
+import shutil
+import sqlite3
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from src.run_management import update_run_status
+from src.run_management.run_tracking import get_store
+from src.run_management.result_cache import get_result_cache
+from src.run_management.profiling import run_profiled, profile_block
+from src.run_management.process_io import StepLog
+from src.run_management.directory_manager import update_run_metadata
+from src.run_management.job_queue import JobCancelled
+from src.run_management.scatter import merge_strategy
 
-def execute_run(run_id, input_files, output_dir, log_dir):
-    """Execute a bioinformatics module (e.g., FastQC)."""
-    update_run_status(run_id, "running")
-    log_file = os.path.join(log_dir, "execution.log")
-    
+MODULE_NAME = "FastQC"
+# In-process alternative to FastQC (fastqc_module.native_qc); no JVM per file.
+NATIVE_QC_MODULE = "NativeQC"
+
+# Rough per-process footprint of a FastQC JVM (default -Xmx250m plus overhead).
+DEFAULT_TASK_MEMORY_MB = 512
+
+def available_cpus():
+    """Number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
 
-    
+def available_memory_mb():
+    """Currently available physical memory in MB, or None if it cannot be determined."""
     try:
-        with open(log_file, "w") as log:
-            for file in input_files:
-                command = ["fastqc", file, "-o", output_dir]
-                process = subprocess.run(command, stdout=log, stderr=log, check=True)
-        
-        update_run_status(run_id, "completed")
-    except subprocess.CalledProcessError:
-        update_run_status(run_id, "failed")
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def resolve_max_workers(max_workers=None, cpu_budget=None, memory_budget_mb=None,
+                        task_memory_mb=DEFAULT_TASK_MEMORY_MB):
+    """Pick a worker count that fits both the CPU and the memory budget."""
+    cpus = min(cpu_budget or available_cpus(), available_cpus())
+    workers = min(max_workers or cpus, cpus)
+    memory_mb = memory_budget_mb or available_memory_mb()
+    if memory_mb:
+        workers = min(workers, memory_mb // task_memory_mb)
+    return max(1, workers)
+
+def _file_log_names(input_files):
+    """Map each input file to a unique per-file log name."""
+    names, seen = [], {}
+    for file in input_files:
+        base = os.path.basename(file)
+        seen[base] = seen.get(base, 0) + 1
+        names.append(f"{base}.log" if seen[base] == 1 else f"{base}.{seen[base]}.log")
+    return names
+
+def _run_module(module, file, work_dir, log, chunk_workers=1):
+    """Run a per-file QC module on ``file``, writing its reports to ``work_dir``.
+
+    A mergeable module may scatter a large file over ``chunk_workers``.
+    Returns its resource usage (see profiling.METRIC_FIELDS), or None if it was not measured.
+    """
+    if module.lower() == NATIVE_QC_MODULE.lower():
+        from fastqc_module.native_qc import run_native_qc
+        with profile_block() as metrics:
+            for path in run_native_qc(file, work_dir, workers=chunk_workers):
+                log.write(f"Wrote {path}\n")
+        return metrics
+    result = run_profiled(["fastqc", file, "-o", work_dir], stdout=log, stderr=log, check=True)
+    return getattr(result, "metrics", None)
+
+def _cache_result(cache, key, module, outputs):
+    """Store a fresh result in the cache; a cache that cannot take it (e.g. a full disk) only logs a warning."""
+    try:
+        cache.put(key, module, outputs)
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"Could not cache the {module} result {key}: {e}")
+
+def _run_file(batch, run_id, file, output_dir, log_path, cache=None, params=None, cancel_check=None,
+              module=MODULE_NAME, step_id=None, chunk_workers=1):
+    """Run ``module`` on one input file, or reuse its cached result; returns ``(file, status, return_code)``.
+
+    A file not started before ``cancel_check()`` turns true is skipped and reported 'cancelled'.
+    """
+    if cancel_check is not None and cancel_check():
+        return file, "cancelled", None
+    batch.log_file_status(run_id, file, "running", log_path=log_path)
+    key, work_dir, outputs = None, output_dir, []
+    if cache is not None and os.path.isfile(file):
+        key = cache.key_for([file], module, params)
+        if cache.materialise(key, output_dir) is not None:
+            logging.info(f"Run {run_id}: result cache hit for {file}")
+            with open(log_path, "w") as log:
+                log.write(f"Result cache hit ({key}); {module} was not re-run.\n")
+            batch.log_file_status(run_id, file, "completed", return_code=0, log_path=log_path)
+            return file, "completed", 0
+        work_dir = tempfile.mkdtemp(dir=output_dir, prefix=".work-")
+
+    try:
+        with StepLog(log_path) as log:
+            metrics = _run_module(module, file, work_dir, log, chunk_workers)
+        if metrics:
+            batch.record_step_metrics(run_id, step_id, module, metrics, input_file=file)
+        if key is not None:
+            for name in os.listdir(work_dir):
+                outputs.append(os.path.join(output_dir, name))
+                os.replace(os.path.join(work_dir, name), outputs[-1])
+    except subprocess.CalledProcessError as e:
+        if getattr(e, "metrics", None):
+            batch.record_step_metrics(run_id, step_id, module, e.metrics, input_file=file)
+        batch.log_file_status(run_id, file, "failed", return_code=e.returncode, log_path=log_path)
+        return file, "failed", e.returncode
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not run {module} on {file}: {e}")
+        batch.log_file_status(run_id, file, "failed", log_path=log_path)
+        return file, "failed", None
+    finally:
+        if work_dir != output_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if key is not None:
+        _cache_result(cache, key, module, outputs)
+    batch.log_file_status(run_id, file, "completed", return_code=0, log_path=log_path)
+    return file, "completed", 0
+
+def execute_run(run_id, input_files, output_dir, log_dir, max_workers=None,
+                cpu_budget=None, memory_budget_mb=None, params=None, use_cache=True,
+                cancel_check=None, update_status=True, module=MODULE_NAME, step_id=None, scatter=True):
+    """Execute a bioinformatics module (e.g., FastQC) on each input file in parallel.
+
+    ``module`` is "FastQC" (one FastQC process per file) or "NativeQC" (the
+    in-process NumPy QC engine, which writes the same metrics without a JVM).
+
+    Every file gets its own log in ``log_dir`` and its own row in ``run_files``;
+    ``execution.log`` holds a per-file summary. The run ends as 'completed' if all
+    files succeed, 'failed' if none do and 'partial' otherwise. Unless
+    ``use_cache`` is False, unchanged inputs reuse cached results. If
+    ``cancel_check`` is given and returns True, files that have not started yet
+    are skipped and the run ends as 'cancelled'. Pass ``update_status=False``
+    when the caller (e.g. the workflow engine) owns the run status; ``step_id``
+    labels the per-file resource measurements. Workers left over when there
+    are fewer files than workers scatter large files of a mergeable module
+    (see ``scatter``) unless ``scatter`` is False. An input listed more than
+    once is run once, as its outputs and status row would collide.
+    """
+    unique_files = list(dict.fromkeys(input_files))
+    if len(unique_files) < len(input_files):
+        logging.warning(f"Run {run_id}: ignoring {len(input_files) - len(unique_files)} repeated input file(s)")
+        input_files = unique_files
+    if update_status:
+        update_run_status(run_id, "running")
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = os.path.join(log_dir, "execution.log")
+
+    workers = resolve_max_workers(max_workers, cpu_budget, memory_budget_mb)
+    chunk_workers = max(1, workers // max(1, min(workers, len(input_files)))) \
+        if scatter and merge_strategy(module) else 1
+    log_paths = [os.path.join(log_dir, name) for name in _file_log_names(input_files)]
+    cache = get_result_cache() if use_cache else None
+    logging.info(f"Run {run_id}: executing {len(input_files)} file(s) with {workers} worker(s)")
+
+    # Per-file status updates from all workers are committed together.
+    with get_store().batch() as batch, ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda args: _run_file(batch, run_id, *args, cache=cache, params=params,
+                                                          cancel_check=cancel_check, module=module,
+                                                          step_id=step_id, chunk_workers=chunk_workers),
+                                [(file, output_dir, log_path) for file, log_path in zip(input_files, log_paths)]))
+
+    with open(log_file, "w") as log:
+        for file, status, return_code in results:
+            log.write(json.dumps({"input_file": file, "status": status, "return_code": return_code}) + "\n")
+
+    succeeded = sum(1 for _, status, _ in results if status == "completed")
+    if any(status == "cancelled" for _, status, _ in results):
+        status = "cancelled"
+    elif succeeded == len(results):
+        status = "completed"
+    elif succeeded == 0:
+        status = "failed"
+    else:
+        status = "partial"
+    if update_status:
+        update_run_status(run_id, status)
+    return status
+
+def run_qc_job(run_id, payload, is_cancelled):
+    """Job handler for ``qc`` jobs: run a QC module over the inputs of an existing run.
+
+    ``payload`` may set ``module`` and ``max_workers``; files run within the
+    "resources" the scheduler admitted the job with. A run where every file
+    failed fails the job; a partial run completes it.
+    """
+    store = get_store()
+    run = store.get_run(run_id)
+    if run is None:
+        raise ValueError(f"Run {run_id} not found")
+    run_dir = store.get_run_directory(run_id) or os.path.dirname(os.path.normpath(run[3]))
+    input_files = json.loads(run[2])
+    resources = payload.get("resources") or {}
+    status = execute_run(run_id, input_files, os.path.join(run_dir, "output"), os.path.join(run_dir, "logs"),
+                         max_workers=payload.get("max_workers"), module=payload.get("module", MODULE_NAME),
+                         cpu_budget=resources.get("cpus"), memory_budget_mb=resources.get("memory_mb") or None,
+                         cancel_check=is_cancelled)
+    update_run_metadata(run_dir, status=status)
+    if status == "cancelled":
+        raise JobCancelled()
+    if status == "failed":
+        raise RuntimeError(f"{payload.get('module', MODULE_NAME)} failed on all {len(input_files)} input file(s)")
+    return status
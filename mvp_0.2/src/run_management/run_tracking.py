@@ -1,67 +1,536 @@
-import sqlite3
+import os
 import json
+import time
 import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from src.run_management.sqlite_pool import SQLiteConnectionPool
+from src.run_management import events
+from src.run_management.profiling import METRIC_FIELDS
+
+# 'partial' marks a run where some, but not all, input files succeeded.
+RUN_STATUSES = ('pending', 'running', 'completed', 'partial', 'failed', 'cancelled')
+FILE_STATUSES = ('pending', 'running', 'completed', 'failed')
+STEP_STATUSES = ('pending', 'running', 'completed', 'failed', 'skipped')
+
+# The repository-level runs.db; override with BBD_RUNS_DB.
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "runs.db"))
+
+def _status_check(statuses):
+    return "CHECK(status IN ({}))".format(", ".join(f"'{s}'" for s in statuses))
+
+def _format_timestamp(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+def encode_cursor(row):
+    """Build a keyset pagination cursor from a runs row."""
+    return f"{row[1]}|{row[0]}"
+
+def decode_cursor(cursor):
+    """Split a pagination cursor into its (timestamp, run_id) key."""
+    timestamp, sep, run_id = cursor.rpartition("|")
+    if not sep:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}")
+    return timestamp, run_id
+
+
+class WriteBatch:
+    """Collects writes from any number of threads and commits them together.
+
+    Pending statements are flushed in a single transaction when ``max_size``
+    statements have queued up, ``max_delay`` seconds after the first of them
+    was queued (a timer commits them even if no further write arrives), or
+    when the batch is closed. Commits happen under the batch lock, so they
+    land in the order the writes were queued. Status events are published as
+    writes are queued, so they can precede the commit by up to ``max_delay``.
+    """
+
+    def __init__(self, store, max_size=100, max_delay=0.5):
+        self.store = store
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.max_size:
+                self._commit()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def update_run_status(self, run_id, status):
+        self.execute(RunStore.UPDATE_STATUS_SQL, (status, run_id))
+        events.publish(run_id, "status", status=status)
+
+    def log_file_status(self, run_id, input_file, status, return_code=None, log_path=None):
+        if status not in FILE_STATUSES:
+            raise ValueError("Invalid file status value")
+        self.execute(RunStore.FILE_STATUS_SQL, (run_id, input_file, status, return_code, log_path))
+        events.publish(run_id, "file", input_file=input_file, status=status, return_code=return_code)
+
+    def record_step_metrics(self, run_id, step_id, module, metrics, input_file=None):
+        self.execute(*RunStore.step_metrics_params(run_id, step_id, module, metrics, input_file))
+
+    def flush(self):
+        """Commit everything queued so far as one transaction."""
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        # Called with the lock held
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            with self.store.transaction() as conn:
+                for sql, params in pending:
+                    conn.execute(sql, params)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            logging.error(f"Could not commit batched run writes: {e}")
+        finally:
+            self.store.pool.release()  # The timer thread exits; don't keep its connection open
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+class RunStore:
+    """SQLite-backed run tracking with pooled, WAL-mode connections."""
+
+    UPDATE_STATUS_SQL = "UPDATE runs SET status = ? WHERE run_id = ?"
+    FILE_STATUS_SQL = '''
+        INSERT OR REPLACE INTO run_files (run_id, input_file, status, return_code, log_path, updated_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    '''
+    INSERT_RUN_SQL = "INSERT INTO runs (run_id, input_files, output_path, status) VALUES (?, ?, ?, 'pending')"
+    INDEX_RUN_SQL = "INSERT OR REPLACE INTO run_index (run_id, run_dir, indexed_at) VALUES (?, ?, ?)"
+    RUN_INPUT_SQL = "INSERT OR IGNORE INTO run_inputs (run_id, input_file, input_name) VALUES (?, ?, ?)"
+    STEP_METRICS_SQL = f'''
+        INSERT INTO step_metrics (run_id, step_id, module, input_file, {", ".join(METRIC_FIELDS)}, recorded_at)
+        VALUES (?, ?, ?, ?, {", ".join("?" * len(METRIC_FIELDS))}, ?)
+    '''
+
+    def __init__(self, db_path=None, busy_timeout_ms=5000, synchronous="NORMAL"):
+        self.db_path = os.path.abspath(db_path or os.environ.get("BBD_RUNS_DB", DEFAULT_DB_PATH))
+        self.pool = SQLiteConnectionPool(self.db_path, pragmas={
+            "journal_mode": "WAL",
+            "synchronous": synchronous,
+            "busy_timeout": busy_timeout_ms,
+            "foreign_keys": "ON",
+        })
+
+    def connection(self):
+        return self.pool.connection()
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in one transaction on this thread's connection."""
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def batch(self, max_size=100, max_delay=0.5):
+        """Return a WriteBatch that groups writes from parallel workers into few commits."""
+        return WriteBatch(self, max_size=max_size, max_delay=max_delay)
+
+    def close(self):
+        self.pool.close_all()
+
+    def initialize(self):
+        """Create the run tables and the indexes used by query_runs."""
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            self._migrate_runs_table(cursor)
+            self._create_runs_table(cursor)
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS run_files (
+                    run_id TEXT NOT NULL,
+                    input_file TEXT NOT NULL,
+                    status TEXT {_status_check(FILE_STATUSES)},
+                    return_code INTEGER,
+                    log_path TEXT,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (run_id, input_file)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS run_inputs (
+                    run_id TEXT NOT NULL,
+                    input_file TEXT NOT NULL,
+                    input_name TEXT NOT NULL,
+                    PRIMARY KEY (run_id, input_file)
+                )
+            ''')
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS run_steps (
+                    run_id TEXT NOT NULL,
+                    step_id TEXT NOT NULL,
+                    module TEXT,
+                    status TEXT {_status_check(STEP_STATUSES)},
+                    outputs TEXT,
+                    error TEXT,
+                    started_at REAL,
+                    finished_at REAL,
+                    PRIMARY KEY (run_id, step_id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS step_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    step_id TEXT,
+                    module TEXT,
+                    input_file TEXT,
+                    wall_seconds REAL,
+                    user_cpu_seconds REAL,
+                    system_cpu_seconds REAL,
+                    max_rss_kb INTEGER,
+                    read_bytes INTEGER,
+                    write_bytes INTEGER,
+                    exit_code INTEGER,
+                    recorded_at REAL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_step_metrics_run ON step_metrics(run_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_step_metrics_module ON step_metrics(module)")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS file_digests (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    digest TEXT NOT NULL
+                )
+            ''')
+            # Where each run lives on disk; run_dir is indexed for prefix (subtree) scans.
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS run_index (
+                    run_id TEXT PRIMARY KEY,
+                    run_dir TEXT NOT NULL,
+                    indexed_at REAL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_index_dir ON run_index(run_dir)")
+            # Secondary indexes backing query_runs(); (timestamp, run_id) is the keyset order.
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs(timestamp, run_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_status_timestamp ON runs(status, timestamp, run_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_inputs_file ON run_inputs(input_file)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_inputs_name ON run_inputs(input_name)")
+            self._backfill_run_inputs(cursor)
+
+    @staticmethod
+    def _backfill_run_inputs(cursor):
+        """Index the input files of runs logged before run_inputs existed."""
+        rows = cursor.execute('''
+            SELECT run_id, input_files FROM runs
+            WHERE run_id NOT IN (SELECT run_id FROM run_inputs)
+        ''').fetchall()
+        for run_id, input_files in rows:
+            try:
+                files = json.loads(input_files or "[]")
+            except ValueError:
+                continue
+            cursor.executemany(RunStore.RUN_INPUT_SQL, [(run_id, f, os.path.basename(f)) for f in files])
+
+    @staticmethod
+    def _create_runs_table(cursor):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+                input_files TEXT,
+                output_path TEXT,
+                status TEXT {_status_check(RUN_STATUSES)}
+            )
+        ''')
+
+    @classmethod
+    def _migrate_runs_table(cls, cursor):
+        """Rebuild the runs table if it was created with an older status CHECK constraint."""
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'runs'")
+        row = cursor.fetchone()
+        if row is None or all(f"'{s}'" in row[0] for s in RUN_STATUSES):
+            return
+        cursor.execute("ALTER TABLE runs RENAME TO runs_old")
+        cls._create_runs_table(cursor)
+        cursor.execute('''
+            INSERT INTO runs (run_id, timestamp, input_files, output_path, status)
+            SELECT run_id, timestamp, input_files, output_path, status FROM runs_old
+        ''')
+        cursor.execute("DROP TABLE runs_old")
+
+    def log_run(self, input_files, output_path, run_id=None, run_dir=None):
+        """Log a new run in the database; returns its run_id (a new UUID unless given)."""
+        return self.log_runs([(run_id, input_files, output_path, run_dir)])[0]
+
+    def log_runs(self, runs):
+        """Log many runs in one transaction: all of them are recorded or none are.
+
+        ``runs`` holds ``(run_id, input_files, output_path, run_dir)`` tuples; a
+        None run_id is allocated here and a run_dir, if given, is indexed.
+        Returns the run IDs in order.
+        """
+        runs = [(run_id or str(uuid.uuid4()), files, output_path, run_dir)
+                for run_id, files, output_path, run_dir in runs]
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(self.INSERT_RUN_SQL, [(run_id, json.dumps(files), output_path)
+                                                   for run_id, files, output_path, _ in runs])
+            conn.executemany(self.RUN_INPUT_SQL, [(run_id, f, os.path.basename(f))
+                                                  for run_id, files, _, _ in runs for f in files])
+            conn.executemany(self.INDEX_RUN_SQL, [(run_id, os.path.abspath(run_dir), now)
+                                                  for run_id, _, _, run_dir in runs if run_dir])
+        return [run[0] for run in runs]
+
+    def set_output_path(self, run_id, output_path):
+        """Point a run at its output directory."""
+        with self.transaction() as conn:
+            conn.execute("UPDATE runs SET output_path = ? WHERE run_id = ?", (output_path, run_id))
+
+    def update_run_status(self, run_id, status):
+        """Update the status of a run and publish a ``status`` event."""
+        with self.transaction() as conn:
+            conn.execute(self.UPDATE_STATUS_SQL, (status, run_id))
+        events.publish(run_id, "status", status=status)
+
+    def log_file_status(self, run_id, input_file, status, return_code=None, log_path=None):
+        """Record the execution status of a single input file within a run."""
+        if status not in FILE_STATUSES:
+            raise ValueError("Invalid file status value")
+        with self.transaction() as conn:
+            conn.execute(self.FILE_STATUS_SQL, (run_id, input_file, status, return_code, log_path))
+        events.publish(run_id, "file", input_file=input_file, status=status, return_code=return_code)
+
+    def get_file_statuses(self, run_id):
+        """Retrieve the per-file statuses recorded for a run."""
+        return self.connection().execute('''
+            SELECT input_file, status, return_code, log_path FROM run_files WHERE run_id = ?
+        ''', (run_id,)).fetchall()
+
+    def get_step_states(self, run_id):
+        """Recorded status, outputs and error of each workflow step of a run."""
+        rows = self.connection().execute(
+            "SELECT step_id, status, outputs, error FROM run_steps WHERE run_id = ?", (run_id,)).fetchall()
+        return {step_id: {"status": status, "outputs": json.loads(outputs or "[]"), "error": error}
+                for step_id, status, outputs, error in rows}
+
+    @classmethod
+    def step_metrics_params(cls, run_id, step_id, module, metrics, input_file=None):
+        return cls.STEP_METRICS_SQL, (run_id, step_id, module, input_file,
+                                      *(metrics.get(f) for f in METRIC_FIELDS), time.time())
+
+    def record_step_metrics(self, run_id, step_id, module, metrics, input_file=None):
+        """Store the resource usage of one step execution (see profiling.METRIC_FIELDS)."""
+        with self.transaction() as conn:
+            conn.execute(*self.step_metrics_params(run_id, step_id, module, metrics, input_file))
+
+    def get_step_metrics(self, run_id):
+        """Measured step executions of a run, oldest first."""
+        fields = ("step_id", "module", "input_file") + METRIC_FIELDS
+        rows = self.connection().execute(
+            f"SELECT {', '.join(fields)} FROM step_metrics WHERE run_id = ? ORDER BY id", (run_id,)).fetchall()
+        return [dict(zip(fields, row)) for row in rows]
+
+    def step_metrics_summary(self):
+        """Per-module totals over all measured step executions, for /metrics."""
+        fields = ("module", "executions", "succeeded", "failed", "wall_seconds", "user_cpu_seconds",
+                  "system_cpu_seconds", "max_rss_kb", "read_bytes", "write_bytes")
+        rows = self.connection().execute('''
+            SELECT module, COUNT(*), SUM(exit_code = 0), SUM(exit_code != 0), TOTAL(wall_seconds),
+                   TOTAL(user_cpu_seconds), TOTAL(system_cpu_seconds), COALESCE(MAX(max_rss_kb), 0),
+                   COALESCE(SUM(read_bytes), 0), COALESCE(SUM(write_bytes), 0)
+            FROM step_metrics GROUP BY module ORDER BY module
+        ''').fetchall()
+        return [dict(zip(fields, row)) for row in rows]
+
+    def runs_by_status(self):
+        """(status, count) for every run status in use."""
+        return self.connection().execute(
+            "SELECT status, COUNT(*) FROM runs GROUP BY status ORDER BY status").fetchall()
+
+    def index_run(self, run_id, run_dir):
+        """Record (or move) the directory of a run."""
+        with self.transaction() as conn:
+            conn.execute(self.INDEX_RUN_SQL, (run_id, os.path.abspath(run_dir), time.time()))
+
+    def get_run_directory(self, run_id):
+        """The indexed directory of a run, or None."""
+        row = self.connection().execute("SELECT run_dir FROM run_index WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def indexed_runs(self, root):
+        """(run_id, run_dir) of every indexed run below the directory ``root``."""
+        prefix = os.path.join(os.path.abspath(root), "")
+        # A half-open range over the prefix, so the run_dir index is used rather than a LIKE scan.
+        return self.connection().execute(
+            "SELECT run_id, run_dir FROM run_index WHERE run_dir >= ? AND run_dir < ?",
+            (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))).fetchall()
+
+    def unindex_runs(self, run_ids):
+        """Forget the directories of ``run_ids``; returns how many were indexed."""
+        with self.transaction() as conn:
+            return sum(conn.execute("DELETE FROM run_index WHERE run_id = ?", (run_id,)).rowcount
+                       for run_id in run_ids)
+
+    def restore_run(self, run_id, timestamp, input_files, output_path, status):
+        """Re-create a run known only from its metadata.json; returns False if it is already logged."""
+        if status not in RUN_STATUSES:
+            status = "pending"
+        try:
+            timestamp = _format_timestamp(datetime.fromisoformat(timestamp)) if timestamp else None
+        except (TypeError, ValueError):
+            timestamp = None
+        with self.transaction() as conn:
+            restored = conn.execute('''
+                INSERT OR IGNORE INTO runs (run_id, timestamp, input_files, output_path, status)
+                VALUES (?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?)
+            ''', (run_id, timestamp, json.dumps(input_files), output_path, status)).rowcount == 1
+            if restored:
+                conn.executemany(self.RUN_INPUT_SQL, [(run_id, f, os.path.basename(f)) for f in input_files])
+        return restored
+
+    def get_cached_digest(self, path, size, mtime_ns):
+        """Return the cached checksum of ``path`` if the file is unchanged since it was hashed."""
+        row = self.connection().execute(
+            "SELECT digest FROM file_digests WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, size, mtime_ns)).fetchone()
+        return row[0] if row else None
+
+    def cache_digest(self, path, size, mtime_ns, digest):
+        """Remember the checksum of ``path`` at the given size and modification time."""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO file_digests (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                         (path, size, mtime_ns, digest))
+
+    def get_all_runs(self):
+        """Retrieve all runs from the database.
+
+        Prefer ``query_runs``/``iter_runs`` for anything user-facing; this loads
+        the whole table into memory.
+        """
+        return self.connection().execute("SELECT * FROM runs").fetchall()
+
+    def query_runs(self, status=None, since=None, until=None, input_file=None, after=None, limit=100):
+        """Return one page of runs, newest first, and the cursor for the next page.
+
+        ``since``/``until`` bound the run timestamp (inclusive/exclusive) and accept
+        datetimes or ``YYYY-MM-DD[ HH:MM:SS]`` strings. ``input_file`` matches either
+        the full path or the file name. ``after`` is the cursor returned by the
+        previous call; the returned cursor is None on the last page.
+        """
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(_format_timestamp(since))
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(_format_timestamp(until))
+        if input_file:
+            clauses.append('''run_id IN (
+                SELECT run_id FROM run_inputs WHERE input_file = ?
+                UNION SELECT run_id FROM run_inputs WHERE input_name = ?)''')
+            params.extend([input_file, os.path.basename(input_file)])
+        if after:
+            clauses.append("(timestamp, run_id) < (?, ?)")
+            params.extend(decode_cursor(after))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection().execute(
+            f"SELECT * FROM runs {where} ORDER BY timestamp DESC, run_id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def iter_runs(self, page_size=500, **filters):
+        """Stream runs matching ``filters`` (see ``query_runs``) one page at a time."""
+        cursor = filters.pop("after", None)
+        while True:
+            rows, cursor = self.query_runs(after=cursor, limit=page_size, **filters)
+            yield from rows
+            if cursor is None:
+                return
+
+    def get_run(self, run_id):
+        """Retrieve details of a specific run."""
+        return self.connection().execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the process-wide RunStore, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RunStore()
+        return _store
+
+def set_store(store):
+    """Replace the process-wide RunStore (e.g. to point at another database)."""
+    global _store
+    with _store_lock:
+        if _store is not None and _store is not store:
+            _store.close()
+        _store = store
+    return store
 
 def initialize_db():
-    """Create the SQLite database and runs table."""
-    conn = sqlite3.connect("runs.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS runs (
-            run_id TEXT PRIMARY KEY,
-            timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
-            input_files TEXT,
-            output_path TEXT,
-            status TEXT CHECK(status IN ('pending', 'running', 'completed', 'failed'))
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def log_run(input_files, output_path):
+    """Create the SQLite database, runs table and per-file status table."""
+    get_store().initialize()
+
+def log_run(input_files, output_path, run_id=None, run_dir=None):
     """Log a new run in the database."""
-    run_id = str(uuid.uuid4())
-    input_files_json = json.dumps(input_files)
-    
-    conn = sqlite3.connect("runs.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO runs (run_id, input_files, output_path, status)
-        VALUES (?, ?, ?, 'pending')
-    ''', (run_id, input_files_json, output_path))
-    conn.commit()
-    conn.close()
-    
-    return run_id
+    return get_store().log_run(input_files, output_path, run_id=run_id, run_dir=run_dir)
 
 def update_run_status(run_id, status):
     """Update the status of a run."""
-    conn = sqlite3.connect("runs.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE runs SET status = ? WHERE run_id = ?
-    ''', (status, run_id))
-    conn.commit()
-    conn.close()
+    get_store().update_run_status(run_id, status)
+
+def log_file_status(run_id, input_file, status, return_code=None, log_path=None):
+    """Record the execution status of a single input file within a run."""
+    get_store().log_file_status(run_id, input_file, status, return_code, log_path)
+
+def get_file_statuses(run_id):
+    """Retrieve the per-file statuses recorded for a run."""
+    return get_store().get_file_statuses(run_id)
 
 def get_all_runs():
     """Retrieve all runs from the database."""
-    conn = sqlite3.connect("runs.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM runs")
-    runs = cursor.fetchall()
-    conn.close()
-    return runs
+    return get_store().get_all_runs()
 
 def get_run(run_id):
     """Retrieve details of a specific run."""
-    conn = sqlite3.connect("runs.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,))
-    run = cursor.fetchone()
-    conn.close()
-    return run
+    return get_store().get_run(run_id)
+
+def query_runs(status=None, since=None, until=None, input_file=None, after=None, limit=100):
+    """Return one page of matching runs and the cursor for the next page."""
+    return get_store().query_runs(status, since, until, input_file, after, limit)
+
+def iter_runs(page_size=500, **filters):
+    """Stream matching runs without loading the whole table."""
+    return get_store().iter_runs(page_size=page_size, **filters)
 
 if __name__ == "__main__":
     initialize_db()
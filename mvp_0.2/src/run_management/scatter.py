@@ -0,0 +1,140 @@
+"""
+Scatter-gather execution of one module over a large FASTQ.
+
+The input is streamed into record-aligned chunks, the module runs on the
+chunks in parallel as soon as each is written, and the per-chunk results are
+merged. Only modules that declare ``"mergeable": true`` and a ``"merge"``
+strategy in module_metadata.json are scattered:
+
+    qc_stats   per-chunk NativeQC counters are summed (fastqc_module.native_qc.merge_stats)
+    sam        SAM files are concatenated under the first chunk's header
+    bam        BAM files are concatenated with ``samtools cat``
+"""
+import os
+import shutil
+import logging
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src.run_management.fastq_reader import read_batches, is_gzip, CHUNK_SIZE
+from src.run_management.module_metadata import get_module
+
+MERGE_STRATEGIES = ("qc_stats", "sam", "bam")
+# Uncompressed bytes per chunk; files smaller than one chunk are not split. Set BBD_SCATTER=0 to disable.
+DEFAULT_CHUNK_BYTES = int(os.environ.get("BBD_SCATTER_CHUNK_MB", 256)) * 1024 * 1024
+SCATTER_ENABLED = os.environ.get("BBD_SCATTER", "1") == "1"
+GZIP_RATIO = 4  # Rough FASTQ compression ratio, to estimate the uncompressed size of .gz inputs
+
+
+def merge_strategy(module):
+    """The merge strategy a module declares in module_metadata.json, or None if it is not mergeable."""
+    definition = get_module(module) if module else None
+    if not definition or not definition.get("mergeable"):
+        return None
+    strategy = definition.get("merge")
+    if strategy not in MERGE_STRATEGIES:
+        raise ValueError(f"{module} declares unknown merge strategy {strategy!r}")
+    return strategy
+
+
+def should_scatter(path, workers, chunk_bytes=None):
+    """Whether ``path`` is worth splitting across ``workers``: more than one chunk of it and more than one worker."""
+    if not SCATTER_ENABLED or workers < 2 or not os.path.isfile(path):
+        return False
+    size = os.path.getsize(path) * (GZIP_RATIO if is_gzip(path) else 1)
+    return size > (chunk_bytes or DEFAULT_CHUNK_BYTES)
+
+
+def split_fastq(path, chunk_dir, chunk_bytes=None):
+    """Stream ``path`` into plain-FASTQ chunks of whole records, yielding each chunk path once it is complete.
+
+    Chunks are named ``chunk00000.fastq``, ``chunk00001.fastq``, ... and
+    hold at least ``chunk_bytes`` bytes each (the last one may hold fewer).
+    """
+    chunk_bytes = chunk_bytes or DEFAULT_CHUNK_BYTES
+    os.makedirs(chunk_dir, exist_ok=True)
+    index, out, size = 0, None, 0
+    try:
+        for buf, _ in read_batches(path, chunk_size=min(CHUNK_SIZE, chunk_bytes)):
+            if out is None:
+                chunk = os.path.join(chunk_dir, f"chunk{index:05d}.fastq")
+                out, size = open(chunk, "wb"), 0
+            out.write(buf)
+            size += len(buf)
+            if size >= chunk_bytes:
+                out.close()
+                out = None
+                index += 1
+                yield chunk
+        if out is not None:
+            out.close()
+            out = None
+            yield chunk
+    finally:
+        if out is not None:
+            out.close()
+
+
+def _process_chunk(run_chunk, chunk):
+    try:
+        return run_chunk(chunk)
+    finally:
+        os.remove(chunk)
+
+
+def scatter_gather(path, run_chunk, merge, workers, chunk_bytes=None, processes=False,
+                   scratch_dir=None):
+    """Run ``run_chunk(chunk_path)`` on chunks of ``path`` concurrently and return ``merge(results)``.
+
+    Splitting overlaps with processing: a chunk is submitted as soon as it is
+    written, at most ``2 * workers`` chunks wait on disk at a time, and each
+    is deleted once processed. Results reach ``merge`` in chunk order. With
+    ``processes``, chunks run in spawned processes (``run_chunk`` must then be
+    a module-level function); the first failing chunk stops the split.
+    """
+    chunk_dir = tempfile.mkdtemp(prefix=".scatter-", dir=scratch_dir)
+    pool = (ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if processes
+            else ThreadPoolExecutor(workers, thread_name_prefix="scatter"))
+    futures = []
+    try:
+        for chunk in split_fastq(path, chunk_dir, chunk_bytes):
+            futures.append(pool.submit(_process_chunk, run_chunk, chunk))
+            while sum(not f.done() for f in futures) >= 2 * workers:
+                wait(futures, return_when=FIRST_COMPLETED)
+            for future in futures:
+                if future.done():
+                    future.result()  # Raise the first failure now rather than after splitting everything
+        results = [future.result() for future in futures]
+        logging.info(f"Scattered {path} into {len(results)} chunk(s) over {workers} worker(s)")
+    finally:
+        for future in futures:
+            future.cancel()  # Chunks not yet started after a failure; a no-op once all are done
+        pool.shutdown(wait=True)
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+    return merge(results)
+
+
+def merge_sam(paths, dest):
+    """Concatenate SAM files: the header of the first, then the alignments of each in order."""
+    with open(dest, "wb") as out:
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                if i > 0:
+                    line = f.readline()
+                    while line.startswith(b"@"):  # Skip the repeated header
+                        line = f.readline()
+                    out.write(line)
+                shutil.copyfileobj(f, out, 1024 * 1024)
+    return dest
+
+
+def merge_bam(paths, dest):
+    """Concatenate BAM files sharing one header with ``samtools cat``."""
+    if shutil.which("samtools") is None:
+        raise RuntimeError("Merging BAM chunks needs samtools on the PATH")
+    subprocess.run(["samtools", "cat", "-o", dest, *paths], check=True, capture_output=True)
+    return dest
+
+
+FILE_MERGERS = {"sam": merge_sam, "bam": merge_bam}
@@ -0,0 +1,102 @@
+"""
+Resource-aware admission of queued jobs.
+
+Every job records at submission what one run of it needs (``job_demand``):
+the CPUs and memory declared for its modules in the ``module_resources``
+table of module_database.db, else in module_metadata.json, else
+DEFAULT_RESOURCES. A worker pool with a ``capacity`` only claims jobs whose
+demand fits what its running jobs leave free (``pick_job``), so a burst of
+submissions waits in the queue instead of oversubscribing the host.
+
+Among the queued jobs, the user whose running jobs hold the fewest CPUs
+goes first (fair share); within that, higher ``priority`` and then earlier
+submission. A job that does not fit lets smaller ones past it, until it has
+waited RESERVE_AFTER_SECONDS; from then on nothing is admitted ahead of it.
+"""
+import os
+from src.run_management.module_metadata import get_module
+
+DEFAULT_USER = "default"
+DEFAULT_RESOURCES = {"cpus": 1, "memory_mb": 512}
+# Seconds a job may be overtaken by smaller jobs that fit before capacity is held back for it.
+RESERVE_AFTER_SECONDS = float(os.environ.get("BBD_SCHED_RESERVE_SECONDS", 300))
+
+
+def module_resources(module, overrides=None):
+    """CPUs and memory one run of ``module`` needs.
+
+    ``overrides`` maps lower-cased module names to requirements recorded in
+    module_database.db (``ModuleStore.module_resources()``); they take
+    precedence over the ``resources`` a module declares in module_metadata.json.
+    """
+    resources = dict(DEFAULT_RESOURCES)
+    definition = get_module(module) if module else None
+    if definition:
+        resources.update(definition.get("resources", {}))
+    resources.update((overrides or {}).get(str(module).lower(), {}))
+    return resources
+
+
+def job_demand(kind, payload, input_files=(), overrides=None):
+    """Resources to admit a job against.
+
+    A ``workflow`` job needs as much as its largest step, since the workflow
+    engine runs within the budget it is given. A ``qc`` job runs its module
+    on up to ``max_workers`` input files at once.
+    """
+    if kind == "workflow":
+        steps = [module_resources(step.get("module"), overrides) for step in payload.get("workflow", [])]
+        if not steps:
+            return dict(DEFAULT_RESOURCES)
+        return {"cpus": max(s["cpus"] for s in steps), "memory_mb": max(s["memory_mb"] for s in steps)}
+    resources = module_resources(payload.get("module", "FastQC"), overrides)
+    parallel = max(1, min(payload.get("max_workers") or len(input_files), len(input_files)))
+    return {"cpus": resources["cpus"] * parallel, "memory_mb": resources["memory_mb"] * parallel}
+
+
+def host_capacity():
+    """What a worker pool on this host may allocate; override with BBD_SCHED_CPUS and BBD_SCHED_MEMORY_MB."""
+    from src.run_management.run_executor import available_cpus, available_memory_mb
+
+    return {"cpus": int(os.environ.get("BBD_SCHED_CPUS") or available_cpus()),
+            "memory_mb": int(os.environ.get("BBD_SCHED_MEMORY_MB") or available_memory_mb() or 0)}
+
+
+def fits(demand, free):
+    """Whether ``demand`` fits in ``free``; a ``memory_mb`` of None in ``free`` means memory is not tracked."""
+    if demand["cpus"] > free["cpus"]:
+        return False
+    return free.get("memory_mb") is None or demand["memory_mb"] <= free["memory_mb"]
+
+
+def pick_job(candidates, free, now):
+    """The run_id to admit from ``candidates``, or None.
+
+    ``candidates`` are ``(run_id, cpus, memory_mb, submitted_at)`` rows in
+    scheduling order; ``free`` is the capacity left, or None to admit the
+    first candidate whatever it needs (an idle pool always makes progress).
+    """
+    for run_id, cpus, memory_mb, submitted_at in candidates:
+        if free is None or fits({"cpus": cpus, "memory_mb": memory_mb}, free):
+            return run_id
+        if now - submitted_at > RESERVE_AFTER_SECONDS:
+            return None  # Hold capacity back until this job fits
+    return None
+
+
+def allocation(demand, capacity):
+    """The share of a pool's ``capacity`` a job gets: its demand, capped at the whole pool."""
+    if capacity is None:
+        return dict(demand)
+    memory_mb = demand["memory_mb"] if not capacity["memory_mb"] else min(demand["memory_mb"], capacity["memory_mb"])
+    return {"cpus": min(demand["cpus"], capacity["cpus"]), "memory_mb": memory_mb}
+
+
+def free_capacity(capacity, allocations):
+    """Capacity minus the jobs holding ``allocations``; None when no job is running."""
+    if not allocations:
+        return None
+    free = {"cpus": capacity["cpus"] - sum(a["cpus"] for a in allocations)}
+    free["memory_mb"] = capacity["memory_mb"] - sum(a["memory_mb"] for a in allocations) \
+        if capacity["memory_mb"] else None
+    return free
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import weakref
+import threading
+
+
+class _ThreadConnection:
+    """A thread's connection, held in the pool's thread-local storage; dropped when the thread exits."""
+    __slots__ = ("conn", "pid", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pid = os.getpid()
+
+
+class SQLiteConnectionPool:
+    """Hands out one reusable SQLite connection per (process, thread).
+
+    Connections are opened lazily, configured once with the given PRAGMAs and
+    then reused for every statement issued from the same thread, and closed
+    when that thread exits. A forked child never reuses its parent's connections.
+    """
+
+    def __init__(self, db_path, pragmas=None, timeout=30.0, cached_statements=128):
+        self.db_path = db_path
+        self.pragmas = dict(pragmas or {})
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use."""
+        held = getattr(self._local, "held", None)
+        if held is not None and held.pid == os.getpid():
+            return held.conn
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        held = _ThreadConnection(conn)
+        # Thread-local values are released when their thread exits, e.g. an executor worker or step thread.
+        weakref.finalize(held, self._discard, conn, held.pid)
+        self._local.held = held
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _discard(self, conn, pid):
+        if pid != os.getpid():
+            return  # A forked child must not close (and checkpoint) its parent's connection
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def release(self):
+        """Close this thread's connection now rather than when the thread exits."""
+        held = getattr(self._local, "held", None)
+        self._local.held = None
+        if held is not None:
+            self._discard(held.conn, held.pid)
+
+    def close_all(self):
+        """Close every connection opened by this process."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,181 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+
+# Staging modes, tried in order by "auto". Linked inputs share storage with the
+# source, so modules must treat staged inputs as read-only.
+STAGING_MODES = ("reflink", "hardlink", "symlink", "copy")
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Linux FICLONE ioctl: copy-on-write clone on btrfs, XFS (reflink=1), etc.
+_FICLONE = 0x40049409
+
+
+def _reflink(src, dest):
+    import fcntl
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dest)
+            raise
+
+
+def _hardlink(src, dest):
+    os.link(src, dest)
+
+
+def _symlink(src, dest):
+    os.symlink(os.path.abspath(src), dest)
+
+
+def _copy(src, dest):
+    """Stream src to dest in large blocks without loading it into memory."""
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        shutil.copyfileobj(s, d, COPY_BUFFER_SIZE)
+    shutil.copystat(src, dest)
+
+
+_STAGERS = {"reflink": _reflink, "hardlink": _hardlink, "symlink": _symlink, "copy": _copy}
+
+
+def _place(src, dest, modes):
+    for mode in modes:
+        try:
+            return stage_file(src, dest, mode)
+        except OSError as e:
+            logging.debug(f"Placing {src} via {mode} failed: {e}")
+    raise OSError(f"Could not place {src} at {dest}")
+
+
+def link_or_copy(src, dest):
+    """Place an independent-path copy of ``src`` at ``dest`` (reflink, hardlink or copy; never a symlink)."""
+    return _place(src, dest, ("reflink", "hardlink", "copy"))
+
+
+def clone_or_copy(src, dest):
+    """Place a copy of ``src`` at ``dest`` that shares no inode with it (reflink or copy)."""
+    return _place(src, dest, ("reflink", "copy"))
+
+
+def same_device(src, dest_dir):
+    """Whether src and dest_dir live on the same filesystem."""
+    return os.stat(src).st_dev == os.stat(dest_dir).st_dev
+
+
+def stage_file(src, dest, mode="auto"):
+    """Make ``src`` available at ``dest`` as cheaply as possible.
+
+    In "auto" mode a reflink, a hardlink and then a symlink are attempted when both
+    paths are on the same filesystem; a streaming copy is only made across
+    devices. Returns the mode that was used.
+    """
+    if mode != "auto" and mode not in _STAGERS:
+        raise ValueError(f"Unknown staging mode: {mode}")
+    if os.path.lexists(dest):
+        os.remove(dest)
+
+    if mode != "auto":
+        _STAGERS[mode](src, dest)
+        return mode
+
+    modes = ("copy",)
+    if same_device(src, os.path.dirname(os.path.abspath(dest))):
+        modes = ("reflink", "hardlink", "symlink", "copy")
+    for candidate in modes:
+        try:
+            _STAGERS[candidate](src, dest)
+            return candidate
+        except OSError as e:
+            logging.debug(f"Staging {src} via {candidate} failed: {e}")
+    raise OSError(f"Could not stage {src} to {dest}")
+
+
+def file_checksum(path, algorithm="sha256"):
+    """Stream a file through a hash and return its hex digest."""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cached_checksum(path, run_store=None):
+    """Digest of ``path``, reusing the value cached in ``run_store`` while the file is unchanged."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if run_store is not None:
+        cached = run_store.get_cached_digest(*key)
+        if cached:
+            return cached
+    digest = file_checksum(path)
+    if run_store is not None:
+        run_store.cache_digest(*key, digest)
+    return digest
+
+
+class ContentStore:
+    """Content-addressed file store keyed by checksum.
+
+    Each distinct file is kept once under ``<root>/<aa>/<bb>/<digest>`` and runs
+    link to it, so a sample shared by many runs occupies disk space only once.
+    Digests are cached in the run store by (path, size, mtime) so unchanged
+    inputs are not re-hashed. Sources on the same filesystem are reflinked or
+    hardlinked into the store and others copied. Objects are made read-only,
+    which makes a hardlinked source read-only as well, so neither the source
+    nor a run's linked input can be edited in place under the store.
+    """
+
+    def __init__(self, root, run_store=None):
+        self.root = os.path.abspath(root)
+        self.run_store = run_store
+        os.makedirs(self.root, exist_ok=True)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def checksum(self, path):
+        """Digest of ``path``, reusing a cached value while the file is unchanged."""
+        return cached_checksum(path, self.run_store)
+
+    def put(self, path):
+        """Add ``path`` to the store (if not already present) and return its digest."""
+        digest = self.checksum(path)
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            return digest
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Stage to a temporary name first so concurrent writers never expose a partial object.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".incoming-")
+        os.close(fd)
+        try:
+            self._ingest(path, tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+        return digest
+
+    @staticmethod
+    def _ingest(src, dest):
+        """Place ``src`` at ``dest`` as a read-only object; a source that cannot be made read-only is copied."""
+        mode = link_or_copy(src, dest)
+        try:
+            os.chmod(dest, 0o444)
+        except OSError as e:
+            if mode != "hardlink":
+                raise
+            logging.debug(f"Could not make hardlinked {src} read-only, copying it instead: {e}")
+            stage_file(src, dest, "copy")
+            os.chmod(dest, 0o444)
+        return mode
+
+    def stage(self, path, dest, mode="auto"):
+        """Store ``path`` and link the stored object to ``dest``; returns the digest."""
+        digest = self.put(path)
+        stage_file(self.object_path(digest), dest, mode)
+        return digest
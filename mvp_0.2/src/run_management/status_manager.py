@@ -1,16 +1,14 @@
-import sqlite3
+from src.run_management.run_tracking import RUN_STATUSES, get_store
 
-def update_run_status(run_id, status):
-    """Update the status of a run."""
-    if status not in ('pending', 'running', 'completed', 'failed'):
+def update_run_status(run_id, status, batch=None):
+    """Update the status of a run.
+
+    Pass a ``WriteBatch`` (see ``RunStore.batch``) to group the update with
+    other writes instead of committing it on its own.
+    """
+    if status not in RUN_STATUSES:
         raise ValueError("Invalid status value")
     
-    conn = sqlite3.connect("runs.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE runs SET status = ? WHERE run_id = ?
-    ''', (status, run_id))
-    conn.commit()
-    conn.close()
+    (batch or get_store()).update_run_status(run_id, status)
     
     return f"Run {run_id} updated to {status}"
@@ -0,0 +1,345 @@
+import os
+import re
+import json
+import time
+import shlex
+import shutil
+import logging
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from src.run_management.run_tracking import get_store
+from src.run_management import events
+from src.run_management.module_metadata import get_module
+from src.run_management.run_executor import execute_run, available_cpus, available_memory_mb
+from src.run_management.profiling import run_profiled
+from src.run_management.process_io import StepLog
+from src.run_management.scatter import FILE_MERGERS, merge_strategy, should_scatter, scatter_gather
+
+DEFAULT_STEP_RESOURCES = {"cpus": 1, "memory_mb": 512}
+# Modules that run once per input file rather than once per step.
+PER_FILE_MODULES = ("fastqc", "nativeqc")
+
+_FORMAT_ALIASES = {"fq": "fastq", "fa": "fasta", "fna": "fasta"}
+_COMPRESSION_SUFFIXES = (".gz", ".bz2", ".zst")
+
+
+def file_format(name):
+    """Format of a file from its name, ignoring compression (reads.fastq.gz -> fastq)."""
+    name = os.path.basename(name).lower()
+    for suffix in _COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    ext = os.path.splitext(name)[1].lstrip(".")
+    return _FORMAT_ALIASES.get(ext, ext)
+
+
+class WorkflowStep:
+    def __init__(self, index, spec):
+        self.module = spec.get("module")
+        self.params = spec.get("params", {}) or {}
+        self.step_id = str(spec.get("id") or f"{index + 1:02d}_{self.module}")
+        self.explicit_deps = [str(d) for d in spec.get("depends_on", [])]
+        self.definition = get_module(self.module) if self.module else None
+        self.depends_on = set()
+        resources = dict(DEFAULT_STEP_RESOURCES)
+        if self.definition:
+            resources.update(self.definition.get("resources", {}))
+        self.resources = resources
+
+    @property
+    def input_formats(self):
+        return [file_format(name) for name in (self.definition or {}).get("input", [])]
+
+    @property
+    def output_formats(self):
+        return [file_format(name) for name in (self.definition or {}).get("output", [])]
+
+
+def build_dag(workflow):
+    """Turn workflow steps into WorkflowSteps with dependency sets.
+
+    A step depends on the most recent earlier step whose module declares an
+    output in a format the step consumes (per module_metadata.json), plus any
+    steps named in its ``depends_on``. Inputs no earlier step produces come
+    from the run's input files, so independent branches share no edges.
+    """
+    steps = []
+    for index, spec in enumerate(workflow):
+        if not spec.get("module"):
+            logging.warning("Skipping step with missing module name.")
+            continue
+        step = WorkflowStep(index, spec)
+        for fmt in step.input_formats:
+            producer = next((s for s in reversed(steps) if fmt in s.output_formats), None)
+            if producer is not None:
+                step.depends_on.add(producer.step_id)
+        step.depends_on.update(step.explicit_deps)
+        steps.append(step)
+
+    ids = {s.step_id for s in steps}
+    for step in steps:
+        unknown = step.depends_on - ids
+        if unknown:
+            raise ValueError(f"Step {step.step_id} depends on unknown step(s): {sorted(unknown)}")
+    _check_acyclic(steps)
+    return steps
+
+
+def _check_acyclic(steps):
+    by_id = {s.step_id: s for s in steps}
+    state = {}
+
+    def visit(step_id):
+        if state.get(step_id) == "done":
+            return
+        if state.get(step_id) == "visiting":
+            raise ValueError(f"Workflow has a dependency cycle through {step_id}")
+        state[step_id] = "visiting"
+        for dep in by_id[step_id].depends_on:
+            visit(dep)
+        state[step_id] = "done"
+
+    for step in steps:
+        visit(step.step_id)
+
+
+class WorkflowEngine:
+    """Runs a workflow DAG for one run, executing ready steps concurrently.
+
+    Steps start once all their dependencies completed and the CPU/memory budget
+    has room for their declared resources. Each step's outputs feed its
+    dependants. Step state is kept in the ``run_steps`` table, so re-running a
+    run resumes from the failure and skips steps that already completed.
+    """
+
+    def __init__(self, run_id, run_dir, input_files, run_store=None, cpu_budget=None,
+                 memory_budget_mb=None, max_parallel_steps=None):
+        self.run_id = run_id
+        self.run_dir = run_dir
+        self.input_files = list(input_files)
+        self.run_store = run_store or get_store()
+        self.cpu_budget = cpu_budget or available_cpus()
+        self.memory_budget_mb = memory_budget_mb or available_memory_mb() or 0
+        self.max_parallel_steps = max_parallel_steps or self.cpu_budget
+
+    def _record(self, step, status, outputs=None, error=None):
+        now = time.time()
+        with self.run_store.transaction() as conn:
+            conn.execute('''
+                INSERT INTO run_steps (run_id, step_id, module, status, outputs, error, started_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(run_id, step_id) DO UPDATE SET
+                    status = excluded.status, outputs = excluded.outputs, error = excluded.error,
+                    started_at = COALESCE(excluded.started_at, started_at), finished_at = excluded.finished_at
+            ''', (self.run_id, step.step_id, step.module, status, json.dumps(outputs or []), error,
+                  now if status == "running" else None, now if status != "running" else None))
+        events.publish(self.run_id, "step", step_id=step.step_id, module=step.module, status=status,
+                       outputs=outputs or [], error=error)
+
+    def step_states(self):
+        """Recorded status and outputs of each step of this run."""
+        return self.run_store.get_step_states(self.run_id)
+
+    def _resolve_inputs(self, step, outputs):
+        """Files a step consumes: its dependencies' outputs, falling back to run inputs, by format."""
+        upstream = [f for dep in sorted(step.depends_on) for f in outputs.get(dep, [])]
+        wanted = step.input_formats
+        if not wanted:
+            return upstream or list(self.input_files)
+        resolved = []
+        for fmt in dict.fromkeys(wanted):
+            matches = [f for f in upstream if file_format(f) == fmt]
+            resolved.extend(matches or [f for f in self.input_files if file_format(f) == fmt])
+        return resolved
+
+    def _run_step(self, step, inputs, cancel_check):
+        output_dir = os.path.join(self.run_dir, "output", step.step_id)
+        log_dir = os.path.join(self.run_dir, "logs", step.step_id)
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(log_dir, exist_ok=True)
+
+        if step.definition is None:
+            raise RuntimeError(f"Module {step.module} is not described in module_metadata.json")
+        if not inputs:
+            raise RuntimeError(f"No inputs available for {step.module}")
+
+        scatter_input = self._scatter_input(step, inputs)
+        if step.module.lower() in PER_FILE_MODULES:
+            status = execute_run(self.run_id, inputs, output_dir, log_dir, params=step.params,
+                                 cancel_check=cancel_check, max_workers=step.resources["cpus"],
+                                 update_status=False, module=step.definition["name"], step_id=step.step_id)
+            if status != "completed":
+                raise RuntimeError(f"{step.module} finished with status {status}")
+        elif scatter_input:
+            self._run_scattered(step, inputs, scatter_input, output_dir, log_dir)
+        else:
+            command = self._command_for(step, inputs, output_dir)
+            logging.info(f"Run {self.run_id} step {step.step_id}: {command}")
+            try:
+                with StepLog(os.path.join(log_dir, "execution.log")) as log:
+                    result = run_profiled(command, shell=True, cwd=output_dir, stdout=log, stderr=log, check=True)
+            except subprocess.CalledProcessError as e:
+                self.run_store.record_step_metrics(self.run_id, step.step_id, step.module, e.metrics)
+                raise
+            self.run_store.record_step_metrics(self.run_id, step.step_id, step.module, result.metrics)
+
+        return sorted(os.path.join(output_dir, f) for f in os.listdir(output_dir)
+                      if not f.startswith(".") and os.path.isfile(os.path.join(output_dir, f)))
+
+    @staticmethod
+    def _scatter_input(step, inputs):
+        """The FASTQ input to split for a mergeable step with a single FASTQ input, if it is large enough."""
+        if step.params.get("scatter") is False or merge_strategy(step.module) not in FILE_MERGERS:
+            return None
+        if [file_format(name) for name in step.definition.get("input", [])].count("fastq") != 1:
+            return None  # Paired inputs would have to be split in lockstep
+        fastq = next((f for f in inputs if file_format(f) == "fastq"), None)
+        return fastq if fastq and should_scatter(fastq, step.resources["cpus"]) else None
+
+    def _run_scattered(self, step, inputs, fastq, output_dir, log_dir):
+        """Run a step on record-aligned chunks of ``fastq`` across its CPUs and concatenate the chunk outputs."""
+        strategy = merge_strategy(step.module)
+        unmergeable = [name for name in step.definition.get("output", []) if file_format(name) != strategy]
+        if unmergeable:
+            raise RuntimeError(f"{step.module} declares '{strategy}' merging but also outputs {unmergeable}")
+        scratch = tempfile.mkdtemp(prefix=".scatter-out-", dir=output_dir)
+
+        def run_chunk(chunk):
+            name = os.path.splitext(os.path.basename(chunk))[0]
+            chunk_dir = os.path.join(scratch, name)
+            os.makedirs(chunk_dir)
+            command = self._command_for(step, [chunk if f == fastq else f for f in inputs], chunk_dir)
+            try:
+                with StepLog(os.path.join(log_dir, f"execution.{name}.log")) as log:
+                    result = run_profiled(command, shell=True, cwd=chunk_dir, stdout=log, stderr=log, check=True)
+            except subprocess.CalledProcessError as e:
+                self.run_store.record_step_metrics(self.run_id, step.step_id, step.module, e.metrics, input_file=fastq)
+                raise
+            self.run_store.record_step_metrics(self.run_id, step.step_id, step.module, result.metrics,
+                                               input_file=fastq)
+            return chunk_dir
+
+        def merge(chunk_dirs):
+            for name in step.definition["output"]:
+                FILE_MERGERS[strategy]([os.path.join(d, name) for d in chunk_dirs], os.path.join(output_dir, name))
+
+        logging.info(f"Run {self.run_id} step {step.step_id}: scattering {fastq} over {step.resources['cpus']} CPU(s)")
+        try:
+            scatter_gather(fastq, run_chunk, merge, step.resources["cpus"], scratch_dir=output_dir)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    @staticmethod
+    def _command_for(step, inputs, output_dir):
+        """Fill the module's ``execution`` template with actual input and output paths.
+
+        ``{name}`` placeholders take the step's ``params``; every substituted
+        value is shell-quoted, since the command runs with ``shell=True``. All
+        names are replaced in one pass, so a substituted value is never expanded again.
+        """
+        command = step.definition.get("execution", "")
+        values = {f"{{{key}}}": shlex.quote(str(value)) for key, value in step.params.items()}
+        for name in step.definition.get("input", []):
+            fmt = file_format(name)
+            match = next((f for f in inputs if file_format(f) == fmt), None)
+            if match is None:
+                raise RuntimeError(f"{step.module} needs a {fmt} input ({name})")
+            values[name] = shlex.quote(os.path.abspath(match))
+        for name in step.definition.get("output", []):
+            values[name] = shlex.quote(os.path.join(output_dir, name))
+        if not values:
+            return command
+        # Longest first, so e.g. reads.fastq.gz wins over reads.fastq
+        pattern = "|".join(re.escape(name) for name in sorted(values, key=len, reverse=True))
+        return re.sub(pattern, lambda m: values[m.group(0)], command)
+
+    def _fits(self, step, cpus_in_use, memory_in_use, running):
+        if not running:
+            return True  # Always make progress, even if one step alone exceeds the budget.
+        if running >= self.max_parallel_steps:
+            return False
+        if cpus_in_use + step.resources["cpus"] > self.cpu_budget:
+            return False
+        return not self.memory_budget_mb or memory_in_use + step.resources["memory_mb"] <= self.memory_budget_mb
+
+    def run(self, workflow, cancel_check=None, resume=True):
+        """Execute ``workflow``; returns the final run status."""
+        steps = build_dag(workflow)
+        states = self.step_states() if resume else {}
+        reusable = {s.step_id for s in steps if states.get(s.step_id, {}).get("status") == "completed"
+                    and all(os.path.exists(f) for f in states[s.step_id]["outputs"])}
+        # A step re-runs when any step upstream of it does, so it never keeps outputs of stale inputs.
+        stale = True
+        while stale:
+            stale = {s.step_id for s in steps if s.step_id in reusable and not s.depends_on <= reusable}
+            reusable -= stale
+        outputs, status = {}, {}
+        for step in steps:
+            if step.step_id in reusable:
+                outputs[step.step_id] = states[step.step_id]["outputs"]
+                status[step.step_id] = "completed"
+                logging.info(f"Run {self.run_id}: reusing completed step {step.step_id}")
+            else:
+                status[step.step_id] = "pending"
+                self._record(step, "pending")
+
+        self.run_store.update_run_status(self.run_id, "running")
+        cpus_in_use = memory_in_use = 0
+        cancelled = False
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, len(steps))) as pool:
+            while True:
+                if cancel_check is not None and not cancelled and cancel_check():
+                    cancelled = True
+                # Steps downstream of a failure can never run.
+                for step in steps:
+                    if status[step.step_id] == "pending" and any(
+                            status[d] in ("failed", "skipped") for d in step.depends_on):
+                        status[step.step_id] = "skipped"
+                        self._record(step, "skipped", error="Upstream step did not complete")
+
+                ready = [] if cancelled else [
+                    s for s in steps if status[s.step_id] == "pending"
+                    and all(status[d] == "completed" for d in s.depends_on)]
+                for step in ready:
+                    if not self._fits(step, cpus_in_use, memory_in_use, len(futures)):
+                        continue
+                    cpus_in_use += step.resources["cpus"]
+                    memory_in_use += step.resources["memory_mb"]
+                    inputs = self._resolve_inputs(step, outputs)
+                    status[step.step_id] = "running"
+                    self._record(step, "running")
+                    futures[pool.submit(self._run_step, step, inputs, cancel_check)] = step
+
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = futures.pop(future)
+                    cpus_in_use -= step.resources["cpus"]
+                    memory_in_use -= step.resources["memory_mb"]
+                    try:
+                        outputs[step.step_id] = future.result()
+                    except Exception as e:
+                        logging.error(f"Run {self.run_id} step {step.step_id} failed: {e}")
+                        status[step.step_id] = "failed"
+                        self._record(step, "failed", error=str(e))
+                    else:
+                        status[step.step_id] = "completed"
+                        self._record(step, "completed", outputs[step.step_id])
+
+        final = self._final_status(status.values(), cancelled)
+        self.run_store.update_run_status(self.run_id, final)
+        return final
+
+    @staticmethod
+    def _final_status(statuses, cancelled):
+        statuses = list(statuses)
+        if cancelled:
+            return "cancelled"
+        completed = statuses.count("completed")
+        if completed == len(statuses):
+            return "completed"
+        return "failed" if completed == 0 else "partial"
@@ -1,8 +1,14 @@
+import os
 import pytest
 import sqlite3
+import tempfile
 from src.run_management import initialize_db
 
+# Set before test modules are imported: the backend opens its module database at import time.
+os.environ["BBD_MODULE_DB"] = os.path.join(tempfile.mkdtemp(prefix="bbd-modules-"), "module_database.db")
+
 @pytest.fixture(scope="session", autouse=True)
-def setup_database():
-    """Initialize the database before running any tests."""
+def setup_database(tmp_path_factory):
+    """Initialize a throwaway run database before running any tests."""
+    os.environ["BBD_RUNS_DB"] = str(tmp_path_factory.mktemp("db") / "runs.db")
     initialize_db()
@@ -0,0 +1,113 @@
+import os
+import json
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+from src.backend import asgi  # noqa: E402
+from src.ai_orchestrator.ai_orchestrator import AIOrchestrator  # noqa: E402
+from src.ai_orchestrator.response_cache import ResponseCache  # noqa: E402
+from src.ai_orchestrator.stub_client import AsyncStubChatClient  # noqa: E402
+from src.run_management.run_tracking import RunStore  # noqa: E402
+
+PLAN = {"workflow": [{"module": "FastQC"}, {"module": "BWA"}], "missing_modules": []}
+
+@pytest.fixture
+def orchestrator(tmp_path):
+    """Patch the backend's orchestrator with an offline, async-capable one."""
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    registry = MagicMock()
+    registry.amodules = AsyncMock(return_value={"FastQC": {}, "BWA": {}})
+    registry.atickets = AsyncMock(return_value=[])
+    orchestrator = AIOrchestrator(None, registry=registry, client=MagicMock(), response_cache=ResponseCache(store),
+                                  async_client=AsyncStubChatClient(default=json.dumps(PLAN), chunk_size=5))
+    with patch.object(asgi.backend_api, "orchestrator", orchestrator):
+        yield orchestrator
+    store.close()
+
+async def _call(method, path, body=b"", query=b""):
+    """Drive the ASGI app with one request; returns (status, body)."""
+    scope = {"type": "http", "http_version": "1.1", "scheme": "http", "method": method, "path": path,
+             "root_path": "", "headers": [], "query_string": query, "server": ("testserver", 80)}
+    incoming = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.sleep(3600)  # The client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app(scope, receive, send)
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+def test_generate_workflow(orchestrator):
+    status, body = asyncio.run(_call("POST", "/generate-workflow", json.dumps({"request": "QC"}).encode()))
+    assert status == 200
+    assert json.loads(body) == PLAN
+
+def test_generate_workflow_stream(orchestrator):
+    status, body = asyncio.run(_call("GET", "/generate-workflow/stream", query=b"request=QC"))
+    assert status == 200
+    events = [frame.split("\n")[0] for frame in body.decode().strip().split("\n\n")]
+    assert events == ["event: step", "event: step", "event: done"]
+
+def test_concurrent_requests_share_one_event_loop(orchestrator):
+    """Test that many generations can be in flight at once on a single thread."""
+    async def many():
+        return await asyncio.gather(*(_call("POST", "/generate-workflow", json.dumps({"request": f"QC {i}"}).encode())
+                                      for i in range(200)))
+    results = asyncio.run(many())
+    assert all(status == 200 for status, _ in results)
+    assert len(orchestrator.async_client.calls) == 200
+
+def test_missing_request(orchestrator):
+    status, _ = asyncio.run(_call("POST", "/generate-workflow", b"{}"))
+    assert status == 400
+
+def test_other_routes_are_served_by_flask(orchestrator):
+    status, body = asyncio.run(_call("GET", "/generate-workflow/cache-stats"))
+    assert status == 200
+    assert "hit_rate" in json.loads(body)
+
+def test_run_events_are_streamed_natively(tmp_path):
+    """Test that many run event subscribers are served on the event loop."""
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    run_id = store.log_run(["a.fastq"], "")
+
+    async def subscribe_and_finish():
+        streams = [asyncio.ensure_future(_call("GET", f"/runs/{run_id}/events")) for _ in range(100)]
+        while asgi.backend_api.get_event_bus().subscriber_count(run_id) < 100:
+            await asyncio.sleep(0.01)
+        await asyncio.get_running_loop().run_in_executor(None, store.update_run_status, run_id, "completed")
+        return await asyncio.gather(*streams)
+
+    with patch.object(asgi.backend_api, "get_store", return_value=store):
+        results = asyncio.run(subscribe_and_finish())
+        assert asyncio.run(_call("GET", "/runs/unknown/events"))[0] == 404
+    store.close()
+    assert all(status == 200 and body.decode().count("event: status") == 2 for status, body in results)
+
+def test_missing_modules_are_ticketed_in_process(tmp_path):
+    """Test that an in-process orchestrator writes tickets to its module database instead of POSTing them."""
+    from src.backend.module_store import ModuleStore
+    plan = {"workflow": [{"module": "STAR"}], "missing_modules": ["STAR"]}
+    module_store = ModuleStore(str(tmp_path / "module_database.db"))
+    registry = MagicMock()
+    registry.amodules = AsyncMock(return_value={})
+    registry.atickets = AsyncMock(return_value=[])
+    orchestrator = AIOrchestrator(None, registry=registry, client=MagicMock(), module_store=module_store,
+                                  response_cache=ResponseCache(RunStore(str(tmp_path / "runs.db"))),
+                                  async_client=AsyncStubChatClient(default=json.dumps(plan)))
+
+    with patch("httpx.AsyncClient") as http:
+        assert asyncio.run(orchestrator.agenerate_workflow("align")) == plan
+    http.assert_not_called()
+    assert [t["module_name"] for t in module_store.list_tickets()[0]] == ["STAR"]
+    registry.invalidate.assert_called_with("tickets")
+    module_store.close()
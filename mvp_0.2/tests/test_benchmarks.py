@@ -0,0 +1,31 @@
+import os
+import importlib.util
+from src.run_management.run_tracking import get_store
+
+spec = importlib.util.spec_from_file_location(
+    "bench_suite", os.path.join(os.path.dirname(__file__), "..", "benchmarks", "bench_suite.py"))
+bench_suite = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_suite)
+
+def test_quick_suite_is_machine_readable():
+    """Test that a quick run reports every metric with unit and direction and restores global state."""
+    store, cwd = get_store(), os.getcwd()
+    report = bench_suite.run_suite(("status", "generation"), "quick")
+
+    assert report["meta"]["profile"] == "quick"
+    assert {"status.direct.updates_per_s", "generation.cache_hit.p50_ms"} <= set(report["results"])
+    assert all(metric["value"] > 0 and metric["better"] in ("higher", "lower")
+               for metric in report["results"].values())
+    assert get_store() is store and os.getcwd() == cwd
+
+def test_compare_flags_regressions_in_either_direction():
+    baseline = {"results": {"throughput": bench_suite.result(100, "MB/s"),
+                            "latency": bench_suite.result(10, "ms", "lower"),
+                            "retired": bench_suite.result(1, "ms", "lower")}}
+    current = {"results": {"throughput": bench_suite.result(70, "MB/s"),
+                           "latency": bench_suite.result(5, "ms", "lower")}}
+
+    rows = {row["metric"]: row for row in bench_suite.compare(current, baseline, tolerance=0.25)}
+    assert set(rows) == {"throughput", "latency"}
+    assert rows["throughput"]["regressed"] and rows["throughput"]["speedup"] == 0.7
+    assert not rows["latency"]["regressed"] and rows["latency"]["speedup"] == 2.0
@@ -2,7 +2,8 @@ import pytest
 import argparse
 import os
 from unittest.mock import patch
-from src.run_management.cli_run_manager import create_run, start_run, main
+from src.run_management.cli_run_manager import (create_run, create_runs, read_sample_sheet, start_run, list_runs,
+                                                seed_modules, main)
 
 @pytest.fixture
 def mock_base_path():
@@ -13,16 +14,67 @@ def mock_base_path():
 @patch("src.run_management.cli_run_manager.setup_run_directory", return_value="/tmp/test_runs/runs/test-run-id")
 @patch("src.run_management.cli_run_manager.move_input_files")
 def test_create_run(mock_move, mock_setup, mock_log, mock_base_path):
-    """Test CLI run creation."""
+    """Test CLI run creation: the run is logged once, with its output path and directory."""
     input_files = ["sample1.fastq"]
     run_id = create_run(input_files, mock_base_path)
 
     assert run_id == "test-run-id"
-    mock_log.assert_called_with(input_files, os.path.join(mock_base_path, "runs", "test-run-id", "output"))  # First call generates run_id
-    mock_log.assert_called_with(input_files, os.path.join(mock_base_path, "runs", "test-run-id", "output"))  # Second call updates the run
-    mock_setup.assert_called_once_with(mock_base_path, "test-run-id")
+    allocated = mock_setup.call_args.args[1]
+    mock_setup.assert_called_once_with(mock_base_path, allocated)
+    mock_log.assert_called_once_with(input_files, os.path.join(mock_base_path, "runs", "test-run-id", "output"),
+                                     run_id=allocated, run_dir="/tmp/test_runs/runs/test-run-id")
     mock_move.assert_called_once()
 
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    from src.run_management import run_tracking
+    store = run_tracking.RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    monkeypatch.setattr(run_tracking, "_store", store)  # Restored untouched afterwards, unlike set_store()
+    yield store
+    store.close()
+
+def test_create_run_rolls_back_on_failure(tmp_path, store):
+    """Test that a run is either fully created (row, index, directory) or not at all."""
+    sample = tmp_path / "sample.fastq"
+    sample.write_text("@r\nACGT\n+\nIIII\n")
+    run_id = create_run([str(sample)], str(tmp_path))
+    run_dir = store.get_run_directory(run_id)
+    assert store.get_run(run_id)[3] == os.path.join(run_dir, "output")
+    assert os.path.exists(os.path.join(run_dir, "input", "sample.fastq"))
+    assert len(store.get_all_runs()) == 1
+
+    with patch("src.run_management.cli_run_manager.move_input_files", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            create_run([str(sample)], str(tmp_path))
+    with patch.object(store, "log_runs", side_effect=RuntimeError("database is locked")):
+        with pytest.raises(RuntimeError):
+            create_run([str(sample)], str(tmp_path))
+    assert len(store.get_all_runs()) == 1
+    assert len(store.indexed_runs(str(tmp_path))) == 1
+
+def test_create_runs_from_sample_sheet(tmp_path, store, capsys):
+    """Test batch creation from a sample sheet, and that a failing sample leaves nothing behind."""
+    for name in ("a_1.fq", "a_2.fq", "b_1.fq"):
+        (tmp_path / name).write_text("@r\nACGT\n+\nIIII\n")
+    sheet = tmp_path / "samples.csv"
+    sheet.write_text("sample,fastq_1,fastq_2\nA,a_1.fq,a_2.fq\nB,b_1.fq,\n")
+
+    samples = read_sample_sheet(str(sheet))
+    assert samples == [("A", [str(tmp_path / "a_1.fq"), str(tmp_path / "a_2.fq")]), ("B", [str(tmp_path / "b_1.fq")])]
+    created = create_runs(samples, str(tmp_path / "base"))
+    assert [sample for sample, _ in created] == ["A", "B"]
+    assert [row[0] for row in store.query_runs(input_file="a_2.fq")[0]] == [created[0][1]]
+
+    with patch("src.run_management.cli_run_manager.move_input_files", side_effect=[None, OSError("disk full")]):
+        with pytest.raises(OSError):
+            create_runs(samples, str(tmp_path / "failed"))
+    assert len(store.get_all_runs()) == 2
+    assert not any(files for _, _, files in os.walk(tmp_path / "failed" / "runs"))
+
+    with pytest.raises(FileNotFoundError):
+        create_runs([("C", [str(tmp_path / "missing.fq")])], str(tmp_path / "base"))
+
 @patch("src.run_management.cli_run_manager.get_run", return_value=("test-run-id", "timestamp", "['sample1.fastq']", "/output", "pending"))
 @patch("src.run_management.cli_run_manager.execute_run")
 def test_start_run(mock_execute, mock_get, mock_base_path):
@@ -35,7 +87,9 @@ def test_start_run(mock_execute, mock_get, mock_base_path):
 @patch("argparse.ArgumentParser.parse_args", return_value=argparse.Namespace(
     command="create-run",
     input_files=["sample1.fastq"],
-    base_path="/tmp/test_runs"
+    base_path="/tmp/test_runs",
+    staging_mode="auto",
+    no_content_store=False
 ))
 @patch("src.run_management.cli_run_manager.create_run")
 def test_main_create_run(mock_create, mock_args):
@@ -46,10 +100,39 @@ def test_main_create_run(mock_create, mock_args):
 @patch("argparse.ArgumentParser.parse_args", return_value=argparse.Namespace(
     command="start-run",
     run_id="test-run-id",
-    base_path="/tmp/test_runs"
+    base_path="/tmp/test_runs",
+    max_workers=None,
+    memory_budget_mb=None,
+    module="FastQC"
 ))
 @patch("src.run_management.cli_run_manager.start_run")
 def test_main_start_run(mock_start, mock_args):
     """Test CLI argument parsing for starting a run."""
     main()
     mock_start.assert_called_once()
+
+@patch("src.run_management.cli_run_manager.query_runs", return_value=([
+    ("test-run-id", "2025-03-12 10:00:00", '["sample1.fastq"]', "/output", "completed")
+], "2025-03-12 10:00:00|test-run-id"))
+def test_list_runs(mock_query, capsys):
+    """Test listing a page of runs."""
+    next_cursor = list_runs(status="completed", limit=1)
+
+    mock_query.assert_called_once_with(after=None, limit=1, status="completed", since=None, until=None, input_file=None)
+    assert next_cursor == "2025-03-12 10:00:00|test-run-id"
+    assert "test-run-id" in capsys.readouterr().out
+
+@patch("requests.post")
+def test_seed_modules(mock_post, capsys):
+    """Test that module_metadata.json is registered with one bulk request."""
+    mock_post.return_value.json.side_effect = lambda: {"results": [
+        {"name": m["name"], "status": "created"} for m in mock_post.call_args.kwargs["json"]]}
+    results = seed_modules("http://localhost:5000/module-database/")
+
+    mock_post.assert_called_once()
+    assert mock_post.call_args.args[0] == "http://localhost:5000/module-database/bulk"
+    rows = {row["name"]: row for row in mock_post.call_args.kwargs["json"]}
+    assert rows["BWA"]["input_format"] == "fasta, fastq"
+    assert rows["Bioconductor"]["environment"] == "R"
+    assert len(results) == len(rows)
+    assert "Seeded" in capsys.readouterr().out
@@ -1,7 +1,10 @@
 import os
 import shutil
 import pytest
-from src.run_management.directory_manager import setup_run_directory, move_input_files
+from datetime import datetime, timezone
+from src.run_management.directory_manager import (setup_run_directory, move_input_files, create_run_layout,
+                                                  update_run_metadata, find_run_directory,
+                                                  reconcile_run_index)
 
 @pytest.fixture(scope="function")
 def test_dir():
@@ -40,3 +43,45 @@ def test_move_input_files(test_dir):
     # Cleanup
     for f in input_files:
         os.remove(f)
+
+@pytest.fixture
+def store(tmp_path):
+    from src.run_management.run_tracking import RunStore
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield store
+    store.close()
+
+def test_run_directories_are_sharded(tmp_path):
+    """Test that runs land under date and id-prefix shards rather than one flat directory."""
+    created = datetime(2025, 3, 12, tzinfo=timezone.utc)
+    run_dir = setup_run_directory(str(tmp_path), "ab12cd", created=created)
+    assert run_dir == os.path.join(str(tmp_path), "runs", "2025", "03", "12", "ab", "ab12cd")
+    assert all(os.path.isdir(os.path.join(run_dir, d)) for d in ("input", "output", "logs"))
+
+def test_reconcile_rebuilds_index(tmp_path, store):
+    """Test that reconcile indexes runs from disk, restores unknown ones and drops vanished ones."""
+    runs_root = str(tmp_path / "runs")
+    known = store.log_run(["/data/a.fastq"], "")
+    known_dir = setup_run_directory(str(tmp_path), known)
+    update_run_metadata(known_dir, input_files=["/data/a.fastq"], output_dir=os.path.join(known_dir, "output"))
+
+    # A run whose database row was lost, one from before metadata.json existed, and a deleted one.
+    lost_dir = create_run_layout(runs_root, "lost-run")
+    update_run_metadata(lost_dir, input_files=["/data/b.fastq"], status="completed")
+    flat = store.log_run(["/data/c.fastq"], "")
+    for d in ("input", "output", "logs"):
+        os.makedirs(os.path.join(runs_root, flat, d))
+    store.index_run("deleted-run", os.path.join(runs_root, "2024", "01", "01", "de", "deleted-run"))
+
+    counts = reconcile_run_index(runs_root, store)
+    assert counts == {"indexed": 3, "restored": 1, "removed": 1, "unreadable": 0}
+    assert store.get_run_directory(known) == known_dir
+    assert find_run_directory(store, str(tmp_path), flat) == os.path.join(runs_root, flat)
+    assert store.get_run_directory("deleted-run") is None
+    assert store.get_run("lost-run")[4] == "completed"
+    assert [row[0] for row in store.query_runs(input_file="b.fastq")[0]] == ["lost-run"]
+
+    # Reconciling is idempotent.
+    assert reconcile_run_index(runs_root, store)["restored"] == 0
+    assert len(store.indexed_runs(runs_root)) == 3 and store.indexed_runs(str(tmp_path / "run")) == []
@@ -0,0 +1,88 @@
+import os
+import json
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from src.run_management.events import EventBus, get_event_bus
+from src.run_management.run_tracking import RunStore
+from src.run_management.job_queue import JobQueue
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield store
+    store.close()
+
+def test_fan_out_and_replay():
+    """Test that every subscriber gets each event and reconnects resume after Last-Event-ID."""
+    bus = EventBus(history=10)
+    subscribers = [bus.subscribe("run-1") for _ in range(50)]
+    other = bus.subscribe("run-2")
+    first = bus.publish("run-1", "status", status="running")
+    bus.publish("run-1", "step", step_id="step1", status="completed")
+
+    assert all([sub.get(0)["type"], sub.get(0)["type"]] == ["status", "step"] for sub in subscribers)
+    assert other.get(0) is None
+
+    resumed = bus.subscribe("run-1", last_event_id=first["id"])
+    assert resumed.get(0)["type"] == "step"
+    for sub in subscribers + [other, resumed]:
+        sub.close()
+    assert bus.subscriber_count() == 0
+
+def test_slow_subscriber_drops_oldest():
+    bus = EventBus(queue_size=2)
+    with bus.subscribe("run-1") as sub:
+        for i in range(5):
+            bus.publish("run-1", "file", n=i)
+        assert [sub.get(0)["n"], sub.get(0)["n"]] == [3, 4]
+        assert sub.dropped == 3
+
+def test_async_subscriber_wakes_on_publish_from_thread():
+    bus = EventBus()
+
+    async def consume():
+        with bus.subscribe("run-1") as sub:
+            threading.Timer(0.05, bus.publish, ("run-1", "status"), {"status": "completed"}).start()
+            return await sub.aget(timeout=5)
+
+    assert asyncio.run(consume())["status"] == "completed"
+
+def test_store_and_queue_publish_transitions(store):
+    """Test that status changes made through the run store and job queue are published."""
+    queue = JobQueue(store)
+    run_id = queue.submit("workflow", {})
+    with get_event_bus().subscribe(run_id) as sub:
+        queue.claim("w1")
+        store.log_file_status(run_id, "a.fastq", "completed", return_code=0)
+        store.update_run_status(run_id, "completed")
+        queue.finish(run_id, "completed")
+        received = [(e["type"], e["status"]) for e in iter(lambda: sub.get(0), None)]
+    assert received == [("job", "running"), ("file", "completed"), ("status", "completed"), ("job", "completed")]
+
+def test_run_events_endpoint(store):
+    """Test the SSE stream: current status first, then events until a final status."""
+    from src.backend import backend_api
+    queue = JobQueue(store)
+    run_id = queue.submit("workflow", {})
+    with patch.object(backend_api, "get_store", return_value=store):
+        client = backend_api.app.test_client()
+        assert client.get("/runs/unknown/events").status_code == 404
+
+        response = client.get(f"/runs/{run_id}/events", buffered=False)
+        frames = response.iter_encoded()
+        assert json.loads(next(frames).split(b"data: ")[1])["status"] == "pending"
+        store.update_run_status(run_id, "running")
+        store.update_run_status(run_id, "completed")
+        rest = b"".join(frames).decode()
+        assert [line for line in rest.splitlines() if line.startswith("event:")] == ["event: status"] * 2
+        assert get_event_bus().subscriber_count(run_id) == 0
+
+        # A finished run replays what the client missed, then the stream ends.
+        last_id = int(rest.split("id: ")[1].split("\n")[0])
+        replay = client.get(f"/runs/{run_id}/events", headers={"Last-Event-ID": str(last_id)}).data.decode()
+        assert replay.count("event: status") == 2 and '"completed"' in replay
@@ -0,0 +1,51 @@
+import gzip
+import pytest
+from unittest.mock import patch
+from src.run_management import fastq_reader
+from src.run_management.fastq_reader import count_records, member_offsets, read_chunks, write_bgzf
+
+RECORDS = b"".join(b"@read%d\nACGTNACGTA\n+\nIIIII#####\n" % i for i in range(5000))
+
+@pytest.fixture
+def bgzf_file(tmp_path):
+    path = tmp_path / "reads.fastq.gz"
+    write_bgzf([RECORDS], str(path))
+    return path
+
+def test_bgzf_is_readable_by_gzip(bgzf_file):
+    """Test that written BGZF is valid gzip with exactly known block offsets."""
+    assert gzip.decompress(bgzf_file.read_bytes()) == RECORDS
+    assert len(member_offsets(bgzf_file.read_bytes())) == len(RECORDS) // fastq_reader.BGZF_BLOCK_SIZE + 2
+
+def test_parallel_read_matches_gzip(bgzf_file):
+    """Test that blocks inflated on several threads come back complete and in order."""
+    with patch.object(fastq_reader, "SEGMENT_SIZE", 1024):
+        chunks = list(read_chunks(str(bgzf_file), threads=4, read_ahead=2))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == RECORDS
+    assert count_records(str(bgzf_file), threads=4) == 5000
+
+def test_multi_member_with_false_boundaries(tmp_path):
+    """Test that a header signature inside member data does not corrupt the output."""
+    path = tmp_path / "reads.fastq.gz"
+    decoy = b"\x1f\x8b\x08\x00" * 64  # Stored uncompressed, so it appears verbatim in the file
+    members = [gzip.compress(RECORDS[i:i + 20000] + decoy, compresslevel=0) for i in range(0, len(RECORDS), 20000)]
+    path.write_bytes(b"".join(members))
+    with patch.object(fastq_reader, "SEGMENT_SIZE", 500):
+        content = b"".join(read_chunks(str(path), threads=3))
+    assert content == gzip.decompress(path.read_bytes())
+
+def test_single_member_and_plain_files(tmp_path):
+    packed, plain = tmp_path / "reads.fastq.gz", tmp_path / "reads.fastq"
+    packed.write_bytes(gzip.compress(RECORDS))
+    plain.write_bytes(RECORDS)
+    assert b"".join(read_chunks(str(packed), chunk_size=1000)) == RECORDS
+    assert b"".join(read_chunks(str(plain), chunk_size=1000)) == RECORDS
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_truncated_file_raises(bgzf_file, threads):
+    data = bgzf_file.read_bytes()
+    bgzf_file.write_bytes(data[:len(data) // 2])
+    with patch.object(fastq_reader, "SEGMENT_SIZE", 1024):
+        with pytest.raises(gzip.BadGzipFile):
+            b"".join(read_chunks(str(bgzf_file), threads=threads))
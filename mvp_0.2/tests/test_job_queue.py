@@ -0,0 +1,125 @@
+import os
+import time
+import pytest
+from src.run_management import run_tracking
+from src.run_management.run_tracking import RunStore
+from src.run_management.job_queue import JobQueue, JobWorkerPool, JobCancelled
+from src.run_management.scheduler import DEFAULT_RESOURCES
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+DEFAULT = {"resources": DEFAULT_RESOURCES}  # What a claimed job without modules carries in its payload
+
+@pytest.fixture
+def queue(tmp_path):
+    """Provide a JobQueue backed by a throwaway run store."""
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield JobQueue(store)
+    store.close()
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_submit_returns_pending_run(queue):
+    """Test that submission records the run and a queued job immediately."""
+    run_id = queue.submit("workflow", {"workflow": [{"module": "FastQC"}]}, ["a.fastq"])
+
+    assert queue.run_store.get_run(run_id)[4] == "pending"
+    assert queue.get(run_id)["status"] == "queued"
+
+def test_claim_is_fifo_and_exclusive(queue):
+    """Test that each job is claimed exactly once, oldest first."""
+    first = queue.submit("workflow", {"n": 1})
+    second = queue.submit("workflow", {"n": 2})
+
+    assert queue.claim("w1") == (first, "workflow", {"n": 1, **DEFAULT})
+    assert queue.claim("w2") == (second, "workflow", {"n": 2, **DEFAULT})
+    assert queue.claim("w3") is None
+
+def test_cancel_queued_job(queue):
+    """Test that cancelling a queued job prevents it from running."""
+    run_id = queue.submit("workflow", {})
+
+    assert queue.cancel(run_id) == "cancelled"
+    assert queue.claim("w1") is None
+    assert queue.run_store.get_run(run_id)[4] == "cancelled"
+    assert queue.cancel("unknown") is None
+
+def test_worker_pool_runs_and_cancels_jobs(queue):
+    """Test that workers complete jobs and honour cancellation of running ones."""
+    def handler(run_id, payload, is_cancelled):
+        if payload.get("wait"):
+            _wait_for(is_cancelled)
+            raise JobCancelled()
+
+    pool = JobWorkerPool(queue, {"workflow": handler}, workers=2, poll_interval=0.05).start()
+    try:
+        done = queue.submit("workflow", {})
+        slow = queue.submit("workflow", {"wait": True})
+        _wait_for(lambda: queue.get(done)["status"] == "completed")
+        _wait_for(lambda: queue.get(slow)["status"] == "running")
+
+        assert queue.cancel(slow) == "running"
+        _wait_for(lambda: queue.get(slow)["status"] == "cancelled")
+        assert queue.run_store.get_run(slow)[4] == "cancelled"
+    finally:
+        pool.stop()
+
+def test_failed_job_fails_only_unsettled_runs(queue):
+    """Test that finishing a job as failed fails a pending or running run but keeps a partial one."""
+    crashed, partial = queue.submit("workflow", {}), queue.submit("workflow", {})
+    queue.run_store.update_run_status(partial, "partial")
+    for run_id in (crashed, partial):
+        queue.claim("w1")
+        assert queue.finish(run_id, "failed", "boom", worker_id="w1")
+
+    assert [queue.run_store.get_run(r)[4] for r in (crashed, partial)] == ["failed", "partial"]
+
+def test_expired_lease_is_requeued_then_failed(queue):
+    """Test that a job whose worker stops heartbeating goes back to the queue, and fails after max attempts."""
+    run_id = queue.submit("workflow", {})
+    assert queue.claim("w1", lease_seconds=0) == (run_id, "workflow", DEFAULT)
+    time.sleep(0.01)
+
+    assert queue.requeue_expired(max_attempts=2) == {"requeued": [run_id], "failed": [], "cancelled": []}
+    assert queue.get(run_id)["status"] == "queued" and queue.run_store.get_run(run_id)[4] == "pending"
+    assert queue.heartbeat(run_id, "w1") is None
+    assert queue.finish(run_id, "completed", worker_id="w1") is False
+
+    assert queue.claim("w2", lease_seconds=0)[0] == run_id
+    time.sleep(0.01)
+    assert queue.requeue_expired(max_attempts=2)["failed"] == [run_id]
+    assert queue.get(run_id)["status"] == "failed" and "expired 2 time(s)" in queue.get(run_id)["error"]
+    assert queue.run_store.get_run(run_id)[4] == "failed"
+
+def test_heartbeat_renews_lease_and_reports_cancellation(queue):
+    run_id = queue.submit("workflow", {})
+    queue.claim("w1", lease_seconds=0.05)
+    assert queue.heartbeat(run_id, "w1", lease_seconds=60) is False
+    time.sleep(0.1)
+    assert queue.requeue_expired()["requeued"] == []
+    assert queue.heartbeat(run_id, "w2") is None
+
+    queue.cancel(run_id)
+    assert queue.heartbeat(run_id, "w1") is True
+    assert queue.finish(run_id, "cancelled", worker_id="w1") is True
+
+def test_backend_start_leaves_live_jobs_alone(queue, monkeypatch):
+    """Test that a starting backend process does not take a job from a sibling still heartbeating it."""
+    from src.backend import backend_api
+    monkeypatch.setattr(run_tracking, "_store", queue.run_store)
+    monkeypatch.setattr(backend_api, "EXECUTOR", "local")
+    monkeypatch.setattr(backend_api, "job_queue", None)
+    monkeypatch.setattr(backend_api, "job_workers", None)
+    run_id = queue.submit("workflow", {})
+    queue.claim("sibling-process", lease_seconds=60)
+
+    try:
+        backend_api.get_job_workers()
+        time.sleep(0.1)
+        assert queue.get(run_id)["status"] == "running" and queue.get(run_id)["worker_id"] == "sibling-process"
+    finally:
+        backend_api.job_workers.stop()
@@ -0,0 +1,71 @@
+import sqlite3
+import pytest
+from unittest.mock import MagicMock
+from src.ai_orchestrator.module_registry import ModuleRegistry
+from src.backend.module_store import ModuleStore
+
+@pytest.fixture
+def module_db(tmp_path):
+    path = str(tmp_path / "module_database.db")
+    store = ModuleStore(path)
+    store.initialize()
+    store.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO modules (name, description, input_format, output_format, environment) "
+                     "VALUES ('FastQC', 'QC', 'fastq', 'html', 'Shell')")
+    return path
+
+def _add_ticket(path, name):
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO module_tickets (module_name, reason) VALUES (?, 'needed')", (name,))
+
+def test_sqlite_registry_caches_until_invalidated(module_db):
+    """Test that lookups are served from memory within the TTL and reloaded after invalidate()."""
+    registry = ModuleRegistry(db_path=module_db, ttl=3600)
+    assert list(registry.modules()) == ["FastQC"]
+    assert registry.tickets() == []
+
+    _add_ticket(module_db, "STAR")
+    assert registry.tickets() == []  # Still within the TTL
+    registry.invalidate("tickets")
+    assert registry.tickets() == ["STAR"]
+
+def test_sqlite_registry_revalidates_after_ttl(module_db):
+    registry = ModuleRegistry(db_path=module_db, ttl=0)
+    first = registry.modules()
+    assert registry.modules() is first  # Unchanged version: the cached value is reused
+    _add_ticket(module_db, "STAR")
+    assert registry.tickets() == ["STAR"]
+
+def test_sqlite_registry_sees_updates_and_deletes(module_db):
+    """Test that edits which keep the row count and largest id are still picked up on revalidation."""
+    registry = ModuleRegistry(db_path=module_db, ttl=0)
+    _add_ticket(module_db, "STAR")
+    assert registry.tickets() == ["STAR"]
+    with sqlite3.connect(module_db) as conn:
+        conn.execute("UPDATE modules SET description = 'Read QC' WHERE name = 'FastQC'")
+        conn.execute("UPDATE module_tickets SET module_name = 'GATK'")
+
+    assert registry.modules()["FastQC"]["description"] == "Read QC"
+    assert registry.tickets() == ["GATK"]
+
+def test_http_registry_uses_etag():
+    """Test that an expired entry is revalidated with If-None-Match and kept on 304."""
+    registry = ModuleRegistry("http://backend/module-database", ttl=0)
+    session = MagicMock()
+    session.get.side_effect = [
+        MagicMock(status_code=200, headers={"ETag": '"v1"'}, json=lambda: [{"name": "FastQC"}]),
+        MagicMock(status_code=304, headers={}),
+    ]
+    registry._session = session
+
+    assert list(registry.modules()) == ["FastQC"]
+    assert list(registry.modules()) == ["FastQC"]
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+def test_unreachable_registry_keeps_last_value(module_db, tmp_path):
+    registry = ModuleRegistry(db_path=module_db, ttl=0)
+    assert list(registry.modules()) == ["FastQC"]
+    registry.db_path = str(tmp_path / "missing" / "module_database.db")
+    assert list(registry.modules()) == ["FastQC"]
+    assert ModuleRegistry(db_path=registry.db_path).modules() == {}
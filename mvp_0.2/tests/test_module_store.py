@@ -0,0 +1,113 @@
+import os
+import json
+import sqlite3
+import pytest
+from unittest.mock import patch
+from src.backend.module_store import ModuleStore
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+
+FASTQC = {"name": "FastQC", "description": "QC", "input_format": "fastq", "output_format": "html",
+          "environment": "Shell"}
+
+@pytest.fixture
+def store(tmp_path):
+    store = ModuleStore(str(tmp_path / "module_database.db"))
+    yield store
+    store.close()
+
+def test_store_uses_wal_and_indexes(store):
+    conn = store.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = conn.execute("EXPLAIN QUERY PLAN " + store.TICKETS_BY_STATUS_SQL, ("pending",)).fetchall()
+    assert "idx_module_tickets_status" in str(plan)
+
+def test_etag_changes_only_on_writes(store):
+    """Test that any write to a table bumps its ETag and leaves the other alone."""
+    modules_tag, tickets_tag = store.etag("modules"), store.etag("tickets")
+    store.list_modules()
+    assert store.etag("modules") == modules_tag
+
+    store.add_module(FASTQC)
+    modules, tag = store.list_modules()
+    assert [m["name"] for m in modules] == ["FastQC"]
+    assert tag == store.etag("modules") != modules_tag
+    assert store.etag("tickets") == tickets_tag
+
+    store.connection().execute("DELETE FROM modules")  # Writes from outside the store count too
+    store.connection().commit()
+    assert store.etag("modules") != tag
+
+def test_tickets_filters_and_duplicates(store):
+    store.add_ticket("STAR", "needed")
+    store.add_ticket("BWA", "needed", status="done")
+    with pytest.raises(sqlite3.IntegrityError):
+        store.add_ticket("STAR", "again")
+    assert [t["module_name"] for t in store.list_tickets(status="pending")[0]] == ["STAR"]
+    assert store.list_tickets(module_name="BWA")[0] == [{"module_name": "BWA", "reason": "needed", "status": "done"}]
+
+def test_module_database_endpoint_returns_304(store):
+    """Test that an unchanged registry is answered with 304 and no body."""
+    from src.backend import backend_api
+    with patch.object(backend_api, "module_store", store):
+        client = backend_api.app.test_client()
+        first = client.get("/module-database")
+        assert first.status_code == 200 and first.headers["ETag"]
+
+        cached = client.get("/module-database", headers={"If-None-Match": first.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.data == b""
+
+        assert client.post("/module-database", json=FASTQC).status_code == 201
+        changed = client.get("/module-database", headers={"If-None-Match": first.headers["ETag"]})
+        assert changed.status_code == 200
+        assert [m["name"] for m in json.loads(changed.data)] == ["FastQC"]
+
+def test_bulk_insert_reports_per_item_status(store):
+    """Test that a bulk insert is one transaction with a status for every item."""
+    store.add_module(FASTQC)
+    bwa = dict(FASTQC, name="BWA")
+    results = store.add_modules([FASTQC, bwa, dict(bwa), {"name": "GATK"}])
+    assert [r["status"] for r in results] == ["exists", "created", "duplicate", "invalid"]
+    assert [m["name"] for m in store.list_modules()[0]] == ["FastQC", "BWA"]
+
+    many = [dict(FASTQC, name=f"tool{i}") for i in range(250)]
+    assert all(r["status"] == "created" for r in store.add_modules(many))
+    assert len(store.list_modules()[0]) == 252
+
+    results = store.add_modules([dict(FASTQC, name=["BWA"]), dict(FASTQC, name={"n": 1}), dict(bwa, description=1)])
+    assert [(r["name"], r["status"]) for r in results] == [(None, "invalid"), (None, "invalid"), ("BWA", "invalid")]
+
+    results = store.add_tickets([{"module_name": "STAR", "status": "done"}, {"module_name": "STAR"}])
+    assert [r["status"] for r in results] == ["created", "duplicate"]
+    assert store.list_tickets()[0] == [{"module_name": "STAR", "reason": "", "status": "pending"}]
+
+def test_bulk_endpoints(store):
+    from src.backend import backend_api
+    with patch.object(backend_api, "module_store", store):
+        client = backend_api.app.test_client()
+        response = client.post("/module-database/bulk", json={"modules": [FASTQC, FASTQC]})
+        assert response.status_code == 201
+        assert json.loads(response.data) == {"created": 1, "results": [
+            {"name": "FastQC", "status": "created"}, {"name": "FastQC", "status": "duplicate"}]}
+        assert client.post("/module-database/bulk", json=[FASTQC]).status_code == 200
+        assert client.post("/module-database/bulk", json={"modules": "FastQC"}).status_code == 400
+
+        tickets = [{"module_name": "STAR", "reason": "needed"}, {"module_name": "BWA", "reason": "needed"}]
+        response = client.post("/module-database/module-tickets/bulk", json=tickets)
+        assert response.status_code == 201 and json.loads(response.data)["created"] == 2
+
+def test_module_resources(store):
+    """Test recording per-module requirements through the endpoint, case-insensitively and replacing old ones."""
+    from src.backend import backend_api
+    with patch.object(backend_api, "module_store", store):
+        client = backend_api.app.test_client()
+        assert client.post("/module-database/resources",
+                           json={"module_name": "BWA", "cpus": 2, "memory_mb": 4096}).status_code == 200
+        assert client.post("/module-database/resources",
+                           json={"module_name": "bwa", "cpus": 8, "memory_mb": 8192}).status_code == 200
+        assert client.post("/module-database/resources", json={"module_name": "STAR", "cpus": 0}).status_code == 400
+        assert client.post("/module-database/resources", json={"module_name": "STAR"}).status_code == 400
+        assert client.get("/module-database/resources").get_json() == \
+            [{"module_name": "BWA", "cpus": 8, "memory_mb": 8192}]
+    assert store.module_resources() == {"bwa": {"cpus": 8, "memory_mb": 8192}}
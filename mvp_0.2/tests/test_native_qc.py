@@ -0,0 +1,79 @@
+import os
+import gzip
+import json
+import random
+import zipfile
+import pytest
+from fastqc_module.native_qc import compute_qc, run_native_qc, output_names
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "fastqc_module", "test_data")
+FASTQC_OUTPUT = os.path.join(os.path.dirname(__file__), "..", "fastqc_module", "fastqc_output")
+
+def _write_fastq(path, records):
+    with gzip.open(path, "wt") as f:
+        for i, (seq, qual) in enumerate(records):
+            f.write(f"@read{i}\n{seq}\n+\n{qual}\n")
+
+def test_compute_qc_small_file(tmp_path):
+    """Test metrics on a hand-checkable file with uneven read lengths."""
+    path = tmp_path / "small.fastq.gz"
+    _write_fastq(path, [("ACGT", "IIII"), ("GGNN", "!!!!"), ("ACGT", "IIII"), ("AC", "5?")])
+
+    result = compute_qc(str(path), chunk_size=7)  # Tiny chunks force records across chunk boundaries
+
+    assert result["total_sequences"] == 4
+    assert result["total_bases"] == 14
+    assert result["sequence_length"] == {"min": 2, "max": 4}
+    assert result["length_distribution"] == {2: 1, 4: 3}
+    assert result["per_base_quality"][0]["mean"] == pytest.approx((40 + 0 + 40 + 20) / 4)
+    assert result["per_base_n_content"][3]["n_percent"] == pytest.approx(100 / 3, abs=0.01)
+    assert result["percent_gc"] == pytest.approx(7 / 12 * 100, abs=0.01)  # N bases are excluded, as in FastQC
+    assert result["duplication"]["percent_deduplicated"] == 75.0
+
+def test_scattered_qc_matches_single_pass(tmp_path):
+    """Test that summing the statistics of parallel chunks gives the single-pass metrics."""
+    rng = random.Random(7)
+    records = []
+    for _ in range(3000):
+        seq = "".join(rng.choice("ACGTN") for _ in range(rng.randint(20, 60)))
+        records.append((seq, "".join(rng.choice("!5?I") for _ in seq)))
+    records += records[:500]  # Duplicates spanning chunks
+    path = tmp_path / "reads.fastq.gz"
+    _write_fastq(path, records)
+
+    scattered = compute_qc(str(path), workers=2, chunk_bytes=32 * 1024)
+
+    assert scattered == compute_qc(str(path))
+    assert sorted(os.listdir(tmp_path)) == ["reads.fastq.gz"]
+
+def test_matches_fastqc_on_fixture(tmp_path):
+    """Test headline metrics against the FastQC report shipped with the fixtures."""
+    outputs = run_native_qc(os.path.join(TEST_DATA, "SRR12345678_1.fastq.gz"), str(tmp_path))
+    with zipfile.ZipFile(os.path.join(FASTQC_OUTPUT, "SRR12345678_1_fastqc.zip")) as z:
+        reference = z.read("SRR12345678_1_fastqc/fastqc_data.txt").decode()
+    measures = dict(line.split("\t", 1) for line in reference.splitlines() if "\t" in line)
+
+    native = open(outputs[0]).read()
+    native_measures = dict(line.split("\t", 1) for line in native.splitlines() if "\t" in line)
+    assert native_measures["Total Sequences"] == measures["Total Sequences"]
+    assert native_measures["%GC"] == measures["%GC"]
+    assert float(native_measures["#Total Deduplicated Percentage"]) == pytest.approx(
+        float(measures["#Total Deduplicated Percentage"]), abs=0.05)
+    assert os.path.basename(outputs[1]) == "SRR12345678_1_qc.json"
+
+def test_metadata_declares_the_written_outputs(tmp_path):
+    """Test that module_metadata.json names exactly the files run_native_qc writes for the declared input."""
+    with open(os.path.join(os.path.dirname(__file__), "..", "module_metadata.json")) as f:
+        [definition] = [m for m in json.load(f) if m["name"] == "NativeQC"]
+    reads = tmp_path / definition["input"][0]
+    with gzip.open(reads, "wt") as f:
+        f.write("@r1\nACGT\n+\nIIII\n")
+
+    outputs = run_native_qc(str(reads), str(tmp_path / "out"))
+    assert [os.path.basename(path) for path in outputs] == definition["output"] == output_names(str(reads))
+
+def test_malformed_fastq_is_rejected(tmp_path):
+    path = tmp_path / "bad.fastq"
+    path.write_text("read1\nACGT\n+\nIIII\n")
+    with pytest.raises(ValueError):
+        compute_qc(str(path))
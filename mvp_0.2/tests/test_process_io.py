@@ -0,0 +1,89 @@
+import os
+import sys
+import gzip
+import pytest
+from unittest.mock import patch
+from src.run_management.process_io import StepLog, tail_log, is_active
+from src.run_management.profiling import run_profiled
+from src.run_management.run_tracking import RunStore
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield store
+    store.close()
+
+def test_step_log_rotates_and_compresses(tmp_path):
+    """Test that a log never exceeds its size cap and keeps only the configured number of gzipped backups."""
+    path = str(tmp_path / "step.log")
+    with StepLog(path, max_bytes=10_000, backups=2, tail_lines=5) as log:
+        for i in range(2000):
+            log.write(f"line {i:05d}\n")
+        assert is_active(path)
+        assert tail_log(path, 3) == (["line 01997", "line 01998", "line 01999"], True)
+    assert not is_active(path)
+
+    assert log.bytes_written == 22_000 and log.rotations == 2
+    assert os.path.getsize(path) <= 10_000
+    assert sorted(os.listdir(tmp_path)) == ["step.log", "step.log.1.gz", "step.log.2.gz"]
+    kept = b""
+    for name in ("step.log.2.gz", "step.log.1.gz"):
+        with gzip.open(tmp_path / name) as f:
+            kept += f.read()
+    with open(path, "rb") as f:
+        kept += f.read()
+    assert kept == "".join(f"line {i:05d}\n" for i in range(2000)).encode()[-len(kept):]
+    assert tail_log(path, 2) == (["line 01998", "line 01999"], False)
+
+def test_run_profiled_streams_large_output(tmp_path):
+    """Test that a child writing megabytes to both pipes finishes and its tail is available, within the cap."""
+    script = ("import sys\n"
+              "for i in range(40_000):\n"
+              "    sys.stdout.write('out %06d %s\\n' % (i, 'x' * 80))\n"
+              "    sys.stderr.write('err %06d\\n' % i)\n"
+              "print('done')\n")
+    path, err_path = str(tmp_path / "big.log"), str(tmp_path / "big.err.log")
+    with StepLog(path, max_bytes=1024 * 1024, backups=1, compress=False) as log, \
+            StepLog(err_path, max_bytes=1024 * 1024, backups=1, compress=False) as err:
+        result = run_profiled([sys.executable, "-c", script], stdout=log, stderr=err, check=True)
+    assert result.metrics["exit_code"] == 0
+    assert log.bytes_written > 3_000_000 and err.bytes_written > 400_000
+    assert os.path.getsize(path) <= 1024 * 1024
+    assert tail_log(path, 1)[0] == ["done"]
+    assert tail_log(err_path, 1)[0] == ["err 039999"]
+
+def test_tail_beyond_memory_reads_active_log_from_disk(tmp_path):
+    path = str(tmp_path / "step.log")
+    with StepLog(path, tail_lines=2) as log:
+        log.write("".join(f"line {i}\n" for i in range(5)))
+        assert tail_log(path, 2) == (["line 3", "line 4"], True)
+        assert tail_log(path, 4) == ([f"line {i}" for i in range(1, 5)], True)
+
+def test_log_endpoints(tmp_path, store):
+    """Test listing a run's logs and tailing them from memory, from disk, and refusing paths outside logs/."""
+    from src.backend import backend_api
+    run_id = store.log_run(["a.fastq"], str(tmp_path / "run" / "output"))
+    os.makedirs(tmp_path / "run" / "logs" / "step1")
+    with open(tmp_path / "run" / "logs" / "step1" / "done.log", "w") as f:
+        f.write("first\nlast\n")
+    with open(tmp_path / "run" / "logs" / "step1" / "done.log.1.gz", "wb") as f:
+        f.write(b"\x1f\x8b")
+    client = backend_api.app.test_client()
+
+    with patch.object(backend_api, "get_store", return_value=store), \
+            StepLog(str(tmp_path / "run" / "logs" / "a.fastq.log")) as live:
+        live.write("progress 50%\nprogress 99%")
+        listing = client.get(f"/runs/{run_id}/logs").get_json()["logs"]
+        assert [(log["name"], log["active"]) for log in listing] == [("a.fastq.log", True),
+                                                                      (os.path.join("step1", "done.log"), False)]
+        response = client.get(f"/runs/{run_id}/logs/a.fastq.log?lines=1").get_json()
+        assert response["active"] and response["lines"] == ["progress 99%"]
+        response = client.get(f"/runs/{run_id}/logs/step1/done.log").get_json()
+        assert not response["active"] and response["lines"] == ["first", "last"]
+        assert client.get(f"/runs/{run_id}/logs/..%2F..%2Fruns.db").status_code == 400
+        assert client.get(f"/runs/{run_id}/logs/missing.log").status_code == 404
+        assert client.get(f"/runs/{run_id}/logs/step1/done.log.1.gz").status_code == 404
+        assert client.get("/runs/unknown/logs").status_code == 404
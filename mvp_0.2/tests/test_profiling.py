@@ -0,0 +1,76 @@
+import os
+import sys
+import subprocess
+import pytest
+from unittest.mock import patch
+from src.run_management.profiling import (Histogram, profile_block, render_metrics, run_profiled, stage_seconds,
+                                          timed)
+from src.run_management.run_tracking import RunStore
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield store
+    store.close()
+
+def test_run_profiled_measures_child(tmp_path):
+    """Test that CPU, memory and written bytes of the child process are measured."""
+    script = ("import os\n"
+              "data = bytearray(64 * 1024 * 1024)\n"
+              "sum(range(2_000_000))\n"
+              f"with open({str(tmp_path / 'out.bin')!r}, 'wb') as f:\n"
+              "    f.write(os.urandom(1024 * 1024)); f.flush(); os.fsync(f.fileno())\n")
+    result = run_profiled([sys.executable, "-c", script], check=True)
+
+    metrics = result.metrics
+    assert metrics["exit_code"] == 0
+    assert metrics["wall_seconds"] >= metrics["user_cpu_seconds"] > 0
+    assert metrics["max_rss_kb"] > 64 * 1024
+    if os.path.exists("/proc/self/io"):
+        assert metrics["write_bytes"] >= 1024 * 1024
+
+def test_run_profiled_failure_carries_metrics():
+    with pytest.raises(subprocess.CalledProcessError) as failure:
+        run_profiled([sys.executable, "-c", "raise SystemExit(3)"], check=True)
+    assert failure.value.returncode == 3
+    assert failure.value.metrics["exit_code"] == 3
+
+def test_run_profiled_reports_signals_like_subprocess():
+    """Test that a child killed by a signal gets a negative return code, as with subprocess.run."""
+    result = run_profiled([sys.executable, "-c", "import os, signal; os.kill(os.getpid(), signal.SIGKILL)"])
+    assert result.returncode == result.metrics["exit_code"] == -9
+
+def test_profile_block_marks_failures():
+    with pytest.raises(RuntimeError), profile_block() as metrics:
+        raise RuntimeError("boom")
+    assert metrics["exit_code"] == 1 and metrics["wall_seconds"] >= 0
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe("llm_call", value)
+    assert histogram.collect() == {"llm_call": ([2, 3, 4], 5.65)}
+
+def test_metrics_endpoint(store):
+    """Test the Prometheus exposition of step resources and orchestrator stage timings."""
+    from src.backend import backend_api
+    run_id = store.log_run(["a.fastq"], "")
+    store.record_step_metrics(run_id, "step1", "FastQC", {"wall_seconds": 2.0, "user_cpu_seconds": 1.5,
+                                                          "max_rss_kb": 1024, "read_bytes": 10, "exit_code": 0})
+    store.record_step_metrics(run_id, "step1", "FastQC", {"wall_seconds": 1.0, "exit_code": 2})
+    stage_seconds.reset()
+    with timed("llm_call"):
+        pass
+
+    with patch.object(backend_api, "initialized_store", return_value=store):
+        response = backend_api.app.test_client().get("/metrics")
+    assert response.status_code == 200
+    body = response.data.decode()
+    assert 'bbd_step_executions_total{module="FastQC",outcome="failed"} 1' in body
+    assert 'bbd_step_wall_seconds_sum{module="FastQC"} 3.0' in body
+    assert 'bbd_step_max_rss_bytes{module="FastQC"} 1048576' in body
+    assert 'bbd_orchestrator_stage_seconds_count{stage="llm_call"} 1' in body
+    assert render_metrics(store).count("# TYPE") == 7
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+import pytest
+from src.run_management import run_tracking
+from src.run_management.run_tracking import RunStore
+from src.run_management.job_queue import JobQueue
+from src.run_management.directory_manager import setup_run_directory
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield store
+    store.close()
+
+def _queue_qc_runs(store, base_path, count):
+    """Create ``count`` runs over small FASTQ files and queue a NativeQC job for each."""
+    queue = JobQueue(store)
+    run_ids = []
+    for i in range(count):
+        fastq = os.path.join(base_path, f"sample{i}.fastq")
+        with open(fastq, "w") as f:
+            f.writelines(f"@sample{i}.{n}\nACGTACGTACGT\n+\nIIIIIIIIIIII\n" for n in range(100 + i))
+        run_id = f"run-{i}"
+        run_dir = setup_run_directory(base_path, run_id)
+        store.log_run([fastq], os.path.join(run_dir, "output"), run_id=run_id, run_dir=run_dir)
+        queue.enqueue(run_id, "qc", {"module": "NativeQC"})
+        run_ids.append(run_id)
+    return queue, run_ids
+
+def _start_worker(*args):
+    return subprocess.Popen([sys.executable, "-m", "src.run_management.remote_worker", "--workers", "1",
+                             "--poll-interval", "0.05", "--lease-seconds", "1", *args],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def _stop(workers):
+    for worker in workers:
+        worker.send_signal(signal.SIGTERM)
+    for worker in workers:
+        assert worker.wait(timeout=60) == 0
+
+def _wait_for(predicate, timeout=90.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.1)
+
+def test_workers_share_queue_and_recover_lost_jobs(tmp_path, store):
+    """Test that several worker processes drain one queue, including a job whose first worker vanished."""
+    queue, run_ids = _queue_qc_runs(store, str(tmp_path), 4)
+    assert queue.claim("vanished-worker", lease_seconds=0.5)[0] == "run-0"  # Never heartbeats
+
+    workers = [_start_worker("--db", store.db_path), _start_worker("--db", store.db_path, "--executor", "process")]
+    try:
+        _wait_for(lambda: all(queue.get(run_id)["status"] == "completed" for run_id in run_ids))
+    finally:
+        _stop(workers)
+
+    assert all(store.get_run(run_id)[4] == "completed" for run_id in run_ids)
+    assert queue.get("run-0")["worker_id"] != "vanished-worker"
+    assert store.connection().execute("SELECT attempts FROM jobs WHERE run_id = 'run-0'").fetchone()[0] == 2
+    assert queue.finish("run-0", "failed", worker_id="vanished-worker") is False
+    assert os.listdir(store.get_run("run-0")[3])
+
+def test_http_worker_reports_results(tmp_path, store, monkeypatch):
+    """Test a worker that claims through the backend API and sends its results back with the job outcome."""
+    from werkzeug.serving import make_server
+    from src.backend import backend_api
+    monkeypatch.setattr(run_tracking, "_store", store)
+    monkeypatch.setattr(backend_api, "EXECUTOR", "remote")
+    monkeypatch.setattr(backend_api, "job_queue", None)
+    monkeypatch.setattr(backend_api, "job_workers", None)
+    queue, run_ids = _queue_qc_runs(store, str(tmp_path), 2)
+
+    server = make_server("127.0.0.1", 0, backend_api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    worker = _start_worker("--url", f"http://127.0.0.1:{server.server_port}")
+    try:
+        _wait_for(lambda: all(queue.get(run_id)["status"] == "completed" for run_id in run_ids))
+    finally:
+        _stop([worker])
+        server.shutdown()
+        if backend_api.job_workers is not None:
+            backend_api.job_workers.stop()
+
+    for run_id in run_ids:
+        assert store.get_run(run_id)[4] == "completed"
+        assert [(f, status) for f, status, _, _ in store.get_file_statuses(run_id)] == \
+            [(os.path.join(str(tmp_path), f"sample{run_id[-1]}.fastq"), "completed")]
+        assert [m["module"] for m in store.get_step_metrics(run_id)] == ["NativeQC"]
+
+def test_job_endpoints_reject_bad_lease_seconds(store, monkeypatch):
+    from src.backend import backend_api
+    monkeypatch.setattr(run_tracking, "_store", store)
+    monkeypatch.setattr(backend_api, "EXECUTOR", "remote")
+    monkeypatch.setattr(backend_api, "job_queue", None)
+    monkeypatch.setattr(backend_api, "job_workers", None)
+    client = backend_api.app.test_client()
+    try:
+        for lease in ("soon", -5, [1]):
+            body = {"worker_id": "w1", "lease_seconds": lease}
+            assert client.post("/jobs/claim", json=body).status_code == 400
+            assert client.post("/jobs/run-0/heartbeat", json=body).status_code == 400
+        assert client.post("/jobs/claim", json={"worker_id": "w1", "lease_seconds": "30"}).status_code == 204
+    finally:
+        if backend_api.job_workers is not None:
+            backend_api.job_workers.stop()
@@ -0,0 +1,106 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from src.run_management.run_tracking import RunStore
+from src.ai_orchestrator.ai_orchestrator import AIOrchestrator
+from src.ai_orchestrator.response_cache import ResponseCache, normalise_request
+from src.ai_orchestrator.stub_client import StubChatClient
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield store
+    store.close()
+
+@pytest.fixture
+def registry():
+    registry = MagicMock()
+    registry.modules.return_value = {"FastQC": {"name": "FastQC"}, "BWA": {"name": "BWA"}}
+    registry.tickets.return_value = []
+    return registry
+
+def test_normalise_request():
+    assert normalise_request("  Run  RNA-seq analysis!  ") == normalise_request("run rna-seq analysis")
+    assert normalise_request("Align to hg38") != normalise_request("Align to hg19")
+
+def test_key_depends_on_module_and_ticket_snapshots():
+    key = ResponseCache.make_key("QC my reads", ["FastQC", "BWA"], [], "gpt-4o")
+    assert key == ResponseCache.make_key("qc my reads.", ["BWA", "FastQC"], [], "gpt-4o")
+    assert key != ResponseCache.make_key("QC my reads", ["FastQC"], [], "gpt-4o")
+    assert key != ResponseCache.make_key("QC my reads", ["FastQC", "BWA"], ["STAR"], "gpt-4o")
+
+def test_ttl_and_lru_eviction(store):
+    cache = ResponseCache(store, ttl=60, max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key, "{}")
+    cache.get("a")
+    cache.put("c", "c", "{}")
+    assert cache.get("b") is None
+    assert cache.get("a") == "{}"
+
+    with patch("src.ai_orchestrator.response_cache.time.time", return_value=10 ** 12):
+        assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["expired"], stats["evictions"]) == (2, 1, 1)
+
+def test_orchestrator_reuses_cached_plan_offline(store, registry):
+    """Test that a repeated request is answered from the cache without calling the model."""
+    plan = {"workflow": [{"module": "FastQC"}], "missing_modules": []}
+    client = StubChatClient(default=json.dumps(plan))
+    orchestrator = AIOrchestrator(None, registry=registry, client=client,
+                                  response_cache=ResponseCache(store))
+
+    assert orchestrator.generate_workflow("QC my reads") == plan
+    assert orchestrator.generate_workflow("  qc MY reads!") == plan
+    assert len(client.calls) == 1
+    assert orchestrator.response_cache.stats()["hit_rate"] == 0.5
+
+def test_invalid_json_is_not_cached(store, registry):
+    client = StubChatClient(["not json", json.dumps({"workflow": [], "missing_modules": []})])
+    orchestrator = AIOrchestrator(None, registry=registry, client=client, response_cache=ResponseCache(store))
+
+    assert "error" in orchestrator.generate_workflow("QC my reads")
+    assert orchestrator.generate_workflow("QC my reads") == {"workflow": [], "missing_modules": []}
+    assert len(client.calls) == 2
+
+@patch("src.ai_orchestrator.ai_orchestrator.requests.post")
+def test_missing_modules_are_ticketed_in_one_request(mock_post, store, registry):
+    mock_post.return_value.status_code = 201
+    mock_post.return_value.json.return_value = {"created": 2, "results": [
+        {"module_name": "STAR", "status": "created"}, {"module_name": "GATK", "status": "created"}]}
+    plan = {"workflow": [{"module": "STAR"}], "missing_modules": ["STAR", "GATK"]}
+    orchestrator = AIOrchestrator(None, registry=registry, client=StubChatClient(default=json.dumps(plan)),
+                                  response_cache=ResponseCache(store))
+
+    orchestrator.generate_workflow("Align with STAR")
+    mock_post.assert_called_once()
+    assert mock_post.call_args.args[0].endswith("/module-tickets/bulk")
+    assert [t["module_name"] for t in mock_post.call_args.kwargs["json"]] == ["STAR", "GATK"]
+    registry.invalidate.assert_called_once_with("tickets")
+
+def test_streamed_plan_is_cached_normalised(store, registry):
+    """Test that a fenced streamed reply is cached as plain JSON and replays identically."""
+    plan = {"workflow": [{"module": "FastQC"}], "missing_modules": []}
+    client = StubChatClient(default="```json\n" + json.dumps(plan, indent=2) + "\n```\nHope this helps!")
+    orchestrator = AIOrchestrator(None, registry=registry, client=client, response_cache=ResponseCache(store))
+
+    first = list(orchestrator.generate_workflow_stream("QC my reads"))
+    key = ResponseCache.make_key("QC my reads", ["FastQC", "BWA"], [], "gpt-4o")
+    assert orchestrator.response_cache.get(key) == json.dumps(plan)
+    assert list(orchestrator.generate_workflow_stream("QC my reads")) == first
+    assert orchestrator.generate_workflow("QC my reads") == plan
+    assert len(client.calls) == 1
+
+def test_in_process_tickets_do_not_import_requests(store, registry, tmp_path, monkeypatch):
+    """Test that writing tickets through a local module store leaves requests unimported."""
+    import sys
+    from src.backend.module_store import ModuleStore
+    module_store = ModuleStore(str(tmp_path / "module_database.db"))
+    orchestrator = AIOrchestrator(None, registry=registry, client=StubChatClient(), module_store=module_store,
+                                  response_cache=ResponseCache(store))
+    monkeypatch.setitem(sys.modules, "requests", None)  # Any import of it now raises ImportError
+
+    orchestrator.create_module_tickets(["STAR"])
+    assert [t["module_name"] for t in module_store.list_tickets()[0]] == ["STAR"]
+    module_store.close()
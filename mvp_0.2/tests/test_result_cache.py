@@ -0,0 +1,109 @@
+import os
+import pytest
+from unittest.mock import patch
+from src.run_management import run_tracking
+from src.run_management.run_tracking import RunStore, get_store
+from src.run_management.result_cache import ResultCache
+
+@pytest.fixture
+def cache(tmp_path):
+    """Provide a ResultCache backed by a throwaway run store."""
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield ResultCache(str(tmp_path / "cache"), store, max_bytes=1000)
+    store.close()
+
+def _write(path, content):
+    path.write_text(content)
+    return str(path)
+
+def test_cache_key_depends_on_content_and_params(cache, tmp_path):
+    """Test that keys change with input content and parameters, not paths."""
+    a = _write(tmp_path / "a.fastq", "@r1\nACGT\n+\nIIII\n")
+    b = _write(tmp_path / "b.fastq", "@r1\nACGT\n+\nIIII\n")
+
+    assert cache.key_for([a], "FastQC") == cache.key_for([b], "FastQC")
+    assert cache.key_for([a], "FastQC") != cache.key_for([a], "FastQC", {"kmers": 7})
+    assert cache.key_for([a], "FastQC") != cache.key_for([a], "BWA")
+
+def test_materialise_hit_and_miss(cache, tmp_path):
+    """Test that stored outputs are materialised and hits/misses are counted."""
+    report = _write(tmp_path / "a_fastqc.html", "<html/>")
+    assert cache.materialise("missing", str(tmp_path / "out0")) is None
+
+    cache.put("k1", "FastQC", [report])
+    placed = cache.materialise("k1", str(tmp_path / "out1"))
+
+    assert [os.path.basename(p) for p in placed] == ["a_fastqc.html"]
+    assert open(placed[0]).read() == "<html/>"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+def test_entries_share_no_inode_with_outputs(cache, tmp_path):
+    """Test that rewriting a cached output or a materialised copy in place leaves the cache entry intact."""
+    report = _write(tmp_path / "report.html", "v1")
+    cache.put("key", "FastQC", [report])
+    [placed] = cache.materialise("key", str(tmp_path / "out"))
+
+    for path in (report, placed):
+        with open(path, "w") as f:
+            f.write("rewritten")
+    assert open(os.path.join(cache.entry_dir("key"), "report.html")).read() == "v1"
+
+def test_lru_eviction(cache, tmp_path):
+    """Test that the least recently used entry is evicted past max_bytes."""
+    for key in ("old", "recent"):
+        cache.put(key, "FastQC", [_write(tmp_path / f"{key}.html", "x" * 400)])
+    cache.lookup("old")
+    cache.put("new", "FastQC", [_write(tmp_path / "new.html", "x" * 400)])
+
+    assert cache.lookup("recent") is None
+    assert cache.lookup("old") is not None
+    assert cache.stats()["evictions"] == 1
+    assert not os.path.exists(cache.entry_dir("recent"))
+
+def test_execute_run_reuses_cached_result(tmp_path, monkeypatch):
+    """Test that re-running execute_run on the same input skips FastQC."""
+    from src.run_management.run_executor import execute_run
+
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    monkeypatch.setattr(run_tracking, "_store", store)
+    try:
+        sample = _write(tmp_path / "sample.fastq", "@r1\nACGT\n+\nIIII\n")
+
+        def fake_fastqc(command, stdout, stderr, check):
+            open(os.path.join(command[3], "sample_fastqc.html"), "w").write("report")
+
+        with patch("src.run_management.run_executor.run_profiled", side_effect=fake_fastqc) as mock_run:
+            for i in range(2):
+                run_id = get_store().log_run([sample], "")
+                assert execute_run(run_id, [sample], str(tmp_path / f"out{i}"), str(tmp_path / f"logs{i}")) == "completed"
+
+        assert mock_run.call_count == 1
+        assert open(tmp_path / "out1" / "sample_fastqc.html").read() == "report"
+        assert [name for name in os.listdir(tmp_path / "out0") if name.startswith(".work")] == []
+    finally:
+        store.close()
+
+def test_cache_failure_does_not_fail_the_file(tmp_path, monkeypatch):
+    """Test that a result which cannot be cached is still delivered and the file completes."""
+    from src.run_management.run_executor import execute_run
+
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    monkeypatch.setattr(run_tracking, "_store", store)
+    try:
+        sample = _write(tmp_path / "sample.fastq", "@r1\nACGT\n+\nIIII\n")
+
+        def fake_fastqc(command, stdout, stderr, check):
+            open(os.path.join(command[3], "sample_fastqc.html"), "w").write("report")
+
+        run_id = get_store().log_run([sample], "")
+        with patch("src.run_management.run_executor.run_profiled", side_effect=fake_fastqc), \
+                patch.object(ResultCache, "put", side_effect=OSError(28, "No space left on device")):
+            assert execute_run(run_id, [sample], str(tmp_path / "out"), str(tmp_path / "logs")) == "completed"
+
+        assert os.listdir(tmp_path / "out") == ["sample_fastqc.html"]
+    finally:
+        store.close()
@@ -5,13 +5,13 @@ from unittest.mock import patch
 from src.run_management.run_executor import execute_run
 
 @pytest.fixture
-def fake_run():
+def fake_run(tmp_path):
     """Return a fake run setup."""
     return {
         "run_id": "test_run",
         "input_files": ["test.fastq"],
-        "output_dir": "./test_output",
-        "log_dir": "./test_logs"
+        "output_dir": str(tmp_path / "test_output"),
+        "log_dir": str(tmp_path / "test_logs")
     }
 
 def test_execute_run(fake_run):
@@ -19,15 +19,87 @@ def test_execute_run(fake_run):
     os.makedirs(fake_run["output_dir"], exist_ok=True)
     os.makedirs(fake_run["log_dir"], exist_ok=True)
 
-    with patch("subprocess.run") as mock_subprocess:
-        mock_subprocess.return_value.returncode = 0  # Simulate success
+    with patch("src.run_management.run_executor.run_profiled") as mock_subprocess:
+        mock_subprocess.return_value = subprocess.CompletedProcess(["fastqc"], 0)  # Simulate success
         execute_run(fake_run["run_id"], fake_run["input_files"], fake_run["output_dir"], fake_run["log_dir"])
 
     assert os.path.exists(os.path.join(fake_run["log_dir"], "execution.log"))
 
 def test_execute_run_failure(fake_run):
     """Test handling of execution failure."""
-    with patch("subprocess.run", side_effect=subprocess.CalledProcessError(1, "fastqc")):
+    with patch("src.run_management.run_executor.run_profiled", side_effect=subprocess.CalledProcessError(1, "fastqc")):
         execute_run(fake_run["run_id"], fake_run["input_files"], fake_run["output_dir"], fake_run["log_dir"])
 
     assert os.path.exists(os.path.join(fake_run["log_dir"], "execution.log"))
+
+def test_execute_run_partial_success(tmp_path):
+    """Test that one failing file does not fail the whole run."""
+    from src.run_management.run_tracking import log_run, get_run, get_file_statuses
+
+    input_files = ["good.fastq", "bad.fastq"]
+    run_id = log_run(input_files, str(tmp_path / "output"))
+
+    def fake_run(command, stdout, stderr, check):
+        if command[1] == "bad.fastq":
+            raise subprocess.CalledProcessError(2, command)
+
+    with patch("src.run_management.run_executor.run_profiled", side_effect=fake_run):
+        status = execute_run(run_id, input_files, str(tmp_path / "output"), str(tmp_path / "logs"), max_workers=2)
+
+    assert status == "partial"
+    assert get_run(run_id)[4] == "partial"
+    assert os.path.exists(tmp_path / "logs" / "good.fastq.log")
+    assert os.path.exists(tmp_path / "logs" / "bad.fastq.log")
+    statuses = {f: (s, rc) for f, s, rc, _ in get_file_statuses(run_id)}
+    assert statuses == {"good.fastq": ("completed", 0), "bad.fastq": ("failed", 2)}
+
+def test_execute_run_runs_repeated_input_once(tmp_path):
+    """Test that an input listed twice is processed and recorded once."""
+    from src.run_management.run_tracking import log_run, get_file_statuses
+
+    run_id = log_run(["a.fastq", "a.fastq"], str(tmp_path / "output"))
+    with patch("src.run_management.run_executor.run_profiled",
+               return_value=subprocess.CompletedProcess(["fastqc"], 0)) as mock_run:
+        status = execute_run(run_id, ["a.fastq", "a.fastq"], str(tmp_path / "output"), str(tmp_path / "logs"))
+
+    assert status == "completed"
+    assert mock_run.call_count == 1
+    assert [(f, s) for f, s, _, _ in get_file_statuses(run_id)] == [("a.fastq", "completed")]
+
+def test_resolve_max_workers_respects_budgets():
+    """Test that the worker count is capped by CPU and memory budgets."""
+    from src.run_management.run_executor import resolve_max_workers
+
+    assert resolve_max_workers(max_workers=64, cpu_budget=1) == 1
+    assert resolve_max_workers(max_workers=4, cpu_budget=1, memory_budget_mb=10_000) == 1
+    assert resolve_max_workers(memory_budget_mb=100, task_memory_mb=512) == 1
+
+def test_execute_run_native_qc(tmp_path):
+    """Test that the in-process QC module runs without spawning FastQC."""
+    from src.run_management.run_tracking import log_run
+
+    sample = tmp_path / "sample.fastq"
+    sample.write_text("@r1\nACGT\n+\nIIII\n")
+    run_id = log_run([str(sample)], str(tmp_path / "output"))
+
+    with patch("src.run_management.run_executor.run_profiled") as mock_subprocess:
+        status = execute_run(run_id, [str(sample)], str(tmp_path / "output"), str(tmp_path / "logs"),
+                             module="NativeQC", use_cache=False)
+
+    assert status == "completed"
+    mock_subprocess.assert_not_called()
+    assert os.path.exists(tmp_path / "output" / "sample_fastqc_data.txt")
+
+def test_execute_run_records_step_metrics(tmp_path):
+    """Test that each measured file execution is stored with its resource usage."""
+    from src.run_management.run_tracking import log_run, get_store
+
+    sample = tmp_path / "sample.fastq"
+    sample.write_text("@r1\nACGT\n+\nIIII\n")
+    run_id = log_run([str(sample)], str(tmp_path / "output"))
+    execute_run(run_id, [str(sample)], str(tmp_path / "output"), str(tmp_path / "logs"),
+                module="NativeQC", use_cache=False, step_id="qc")
+
+    [metrics] = get_store().get_step_metrics(run_id)
+    assert (metrics["step_id"], metrics["module"], metrics["exit_code"]) == ("qc", "NativeQC", 0)
+    assert metrics["wall_seconds"] > 0 and metrics["max_rss_kb"] > 0
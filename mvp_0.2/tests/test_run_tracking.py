@@ -33,3 +33,102 @@ def test_update_run_status(setup_db):
     update_run_status(run_id, "completed")
     run = get_run(run_id)
     assert run[4] == "completed"  # Status column
+
+def test_run_store_uses_wal_and_reuses_connections(tmp_path):
+    """Test that a RunStore opens one WAL-mode connection per thread."""
+    import threading
+    from src.run_management.run_tracking import RunStore
+
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    assert store.connection() is store.connection()
+    assert store.connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(store.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not store.connection()
+    store.close()
+
+def test_run_store_closes_connections_of_finished_threads(tmp_path):
+    """Test that executor workers do not leave their connections open once they exit."""
+    import sqlite3
+    from concurrent.futures import ThreadPoolExecutor
+    from src.run_management.run_tracking import RunStore
+
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    for _ in range(5):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            opened = list(pool.map(lambda _: store.connection(), range(4)))
+
+    assert store.pool._connections == [store.connection()]
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+    store.close()
+
+def test_write_batch_commits_on_exit(tmp_path):
+    """Test that batched status updates are applied when the batch closes."""
+    from src.run_management.run_tracking import RunStore
+
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    run_ids = [store.log_run([f"file{i}.fastq"], "/output") for i in range(5)]
+
+    with store.batch(max_size=1000, max_delay=60) as batch:
+        for run_id in run_ids:
+            batch.update_run_status(run_id, "running")
+        assert store.get_run(run_ids[0])[4] == "pending"
+
+    assert all(store.get_run(run_id)[4] == "running" for run_id in run_ids)
+    store.close()
+
+def test_write_batch_commits_queued_writes_without_further_activity(tmp_path):
+    """Test that a lone queued write (e.g. a file starting a long step) is committed after max_delay."""
+    import time
+    from src.run_management.run_tracking import RunStore
+
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    run_id = store.log_run(["file.fastq"], "/output")
+
+    with store.batch(max_size=1000, max_delay=0.05) as batch:
+        batch.update_run_status(run_id, "running")
+        deadline = time.time() + 5
+        while store.get_run(run_id)[4] != "running":
+            assert time.time() < deadline, "queued write was never committed"
+            time.sleep(0.01)
+        batch.update_run_status(run_id, "completed")
+
+    assert store.get_run(run_id)[4] == "completed"
+    store.close()
+
+def test_query_runs_filters_and_paginates(tmp_path):
+    """Test keyset pagination and filters of query_runs/iter_runs."""
+    from src.run_management.run_tracking import RunStore
+
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    run_ids = [store.log_run([f"/data/sample{i % 2}.fastq.gz"], "/output") for i in range(7)]
+    store.update_run_status(run_ids[0], "completed")
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = store.query_runs(limit=3, after=cursor)
+        seen.extend(row[0] for row in rows)
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(run_ids)
+    assert len(seen) == len(set(seen))
+
+    assert [row[0] for row in store.iter_runs(page_size=2, status="completed")] == [run_ids[0]]
+    assert len(list(store.iter_runs(page_size=2, input_file="sample1.fastq.gz"))) == 3
+    assert len(list(store.iter_runs(input_file="/data/sample0.fastq.gz"))) == 4
+    assert list(store.iter_runs(until="2000-01-01")) == []
+
+    plan = store.connection().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM runs WHERE status = ? ORDER BY timestamp DESC, run_id DESC",
+        ("completed",)).fetchall()
+    assert "idx_runs_status_timestamp" in str(plan)
+    store.close()
@@ -0,0 +1,69 @@
+import os
+import gzip
+import pytest
+from src.run_management.scatter import split_fastq, scatter_gather, merge_sam
+
+def _write_fastq(path, count):
+    with gzip.open(path, "wt") as f:
+        for i in range(count):
+            f.write(f"@read{i}\n{'ACGT' * (1 + i % 5)}\n+\n{'I' * 4 * (1 + i % 5)}\n")
+
+def test_split_fastq_yields_whole_records(tmp_path):
+    """Test that chunks hold whole records and concatenate back to the original file."""
+    path = str(tmp_path / "reads.fastq.gz")
+    _write_fastq(path, 2000)
+
+    chunks = list(split_fastq(path, str(tmp_path / "chunks"), chunk_bytes=4096))
+
+    assert len(chunks) > 5
+    assert [os.path.basename(c) for c in chunks[:2]] == ["chunk00000.fastq", "chunk00001.fastq"]
+    data = []
+    for chunk in chunks:
+        with open(chunk, "rb") as f:
+            content = f.read()
+        assert content.startswith(b"@read") and content.count(b"\n") % 4 == 0
+        data.append(content)
+    with gzip.open(path, "rb") as f:
+        assert b"".join(data) == f.read()
+
+def test_scatter_gather_merges_in_order(tmp_path):
+    """Test that chunk results reach the merge in chunk order and the chunks are removed afterwards."""
+    path = str(tmp_path / "reads.fastq.gz")
+    _write_fastq(path, 2000)
+
+    def count(chunk):
+        with open(chunk) as f:
+            return [line for line in f if line.startswith("@read")]
+
+    names = scatter_gather(path, count, lambda results: sum(results, []), workers=2, chunk_bytes=4096,
+                           scratch_dir=str(tmp_path))
+
+    assert names == [f"@read{i}\n" for i in range(2000)]
+    assert sorted(os.listdir(tmp_path)) == ["reads.fastq.gz"]
+
+def test_merge_sam_keeps_one_header(tmp_path):
+    parts = []
+    for i in range(3):
+        part = tmp_path / f"part{i}.sam"
+        part.write_text(f"@HD\tVN:1.6\n@SQ\tSN:chr1\tLN:100\nread{i}a\t4\nread{i}b\t4\n")
+        parts.append(str(part))
+
+    merge_sam(parts, str(tmp_path / "merged.sam"))
+
+    assert (tmp_path / "merged.sam").read_text() == \
+        "@HD\tVN:1.6\n@SQ\tSN:chr1\tLN:100\n" + "".join(f"read{i}a\t4\nread{i}b\t4\n" for i in range(3))
+
+def test_failing_chunk_stops_the_scatter(tmp_path):
+    """Test that the first chunk failure is raised, queued chunks are dropped and nothing is left behind."""
+    path = str(tmp_path / "reads.fastq.gz")
+    _write_fastq(path, 2000)
+    started = []
+
+    def run_chunk(chunk):
+        started.append(chunk)
+        raise ValueError("bad chunk")
+
+    with pytest.raises(ValueError, match="bad chunk"):
+        scatter_gather(path, run_chunk, list, workers=1, chunk_bytes=1024, scratch_dir=str(tmp_path))
+    assert len(started) < 2000 // 10
+    assert sorted(os.listdir(tmp_path)) == ["reads.fastq.gz"]
@@ -0,0 +1,94 @@
+import json
+import time
+import threading
+import pytest
+from src.run_management import scheduler
+from src.run_management.run_tracking import RunStore
+from src.run_management.job_queue import JobQueue, JobWorkerPool
+from src.run_management.scheduler import job_demand, module_resources
+
+MODULES = [{"name": "Align", "input": ["reads.fastq"], "output": ["aligned.sam"],
+            "resources": {"cpus": 4, "memory_mb": 6144}},
+           {"name": "Stats", "input": ["reads.fastq"], "output": ["stats.txt"]}]
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    metadata = tmp_path / "module_metadata.json"
+    metadata.write_text(json.dumps(MODULES))
+    monkeypatch.setenv("BBD_MODULE_METADATA", str(metadata))
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    yield JobQueue(store)
+    store.close()
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_job_demand(queue):
+    """Test that recorded requirements override module_metadata.json, which overrides the defaults."""
+    overrides = {"stats": {"cpus": 2, "memory_mb": 100}}
+    assert module_resources("align") == {"cpus": 4, "memory_mb": 6144}
+    assert module_resources("Stats") == scheduler.DEFAULT_RESOURCES
+    assert module_resources("Stats", overrides) == {"cpus": 2, "memory_mb": 100}
+
+    workflow = {"workflow": [{"module": "Stats"}, {"module": "Align"}]}
+    assert job_demand("workflow", workflow, overrides=overrides) == {"cpus": 4, "memory_mb": 6144}
+    assert job_demand("qc", {"module": "Stats"}, ["a", "b", "c"], overrides) == {"cpus": 6, "memory_mb": 300}
+    assert job_demand("qc", {"module": "Stats", "max_workers": 1}, ["a", "b"], overrides) == \
+        {"cpus": 2, "memory_mb": 100}
+
+def test_claim_applies_fair_share_and_priority(queue):
+    """Test that a user with running jobs waits behind others, and priorities order the rest."""
+    heavy = [queue.submit("workflow", {}, user="alice") for _ in range(3)]
+    light = queue.submit("workflow", {}, user="bob")
+    urgent = queue.submit("workflow", {}, user="carol", priority=5)
+
+    order = [queue.claim(f"w{i}")[0] for i in range(5)]
+
+    assert order == [urgent, heavy[0], light, heavy[1], heavy[2]]
+    assert queue.get(light)["user"] == "bob" and queue.get(light)["queue_wait_seconds"] >= 0
+
+def test_claim_admits_only_jobs_that_fit(queue, monkeypatch):
+    """Test that smaller jobs pass one that does not fit, until it has waited long enough to hold capacity."""
+    big = queue.submit("workflow", {"workflow": [{"module": "Align"}]})
+    small = queue.submit("workflow", {"workflow": [{"module": "Stats"}]})
+    other = queue.submit("workflow", {"workflow": [{"module": "Stats"}]})
+    assert queue.get(big)["cpus"] == 4
+
+    assert queue.claim("w1", free={"cpus": 2, "memory_mb": None})[0] == small
+    monkeypatch.setattr(scheduler, "RESERVE_AFTER_SECONDS", 0)
+    assert queue.claim("w2", free={"cpus": 2, "memory_mb": None}) is None
+    assert queue.claim("w3", free={"cpus": 4, "memory_mb": 6144})[:2] == (big, "workflow")
+    assert queue.claim("w4", free={"cpus": 1, "memory_mb": 256}) is None  # Not enough memory
+    assert queue.claim("w5")[0] == other
+
+def test_worker_pool_stays_within_capacity(queue):
+    """Test that a pool with more workers than CPUs never runs more than its capacity, and reports waits."""
+    running, peak, shares, lock = [], [], [], threading.Lock()
+
+    def handler(run_id, payload, is_cancelled):
+        with lock:
+            running.append(run_id)
+            peak.append(len(running))
+            shares.append(payload["resources"])
+        time.sleep(0.05)
+        with lock:
+            running.remove(run_id)
+
+    run_ids = [queue.submit("qc", {}, resources={"cpus": 1, "memory_mb": 0}) for _ in range(4)]
+    run_ids.append(queue.submit("qc", {}, resources={"cpus": 8, "memory_mb": 0}))
+    pool = JobWorkerPool(queue, {"qc": handler}, workers=4, poll_interval=0.01,
+                         capacity={"cpus": 2, "memory_mb": 0}).start()
+    try:
+        _wait_for(lambda: all(queue.get(run_id)["status"] == "completed" for run_id in run_ids))
+    finally:
+        pool.stop()
+
+    assert max(peak) == 2
+    assert {"cpus": 2, "memory_mb": 0} in shares  # The 8-CPU job ran alone, on the whole pool
+    stats = queue.queue_stats()
+    assert stats["users"] == [] and stats["wait_seconds"]["count"] == 5
+    assert stats["wait_seconds"]["max"] >= stats["wait_seconds"]["p95"] >= stats["wait_seconds"]["mean"] > 0
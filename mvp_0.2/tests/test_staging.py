@@ -0,0 +1,62 @@
+import os
+import pytest
+from unittest.mock import patch
+from src.run_management import staging
+from src.run_management.run_tracking import RunStore
+from src.run_management.staging import stage_file, file_checksum, ContentStore
+
+@pytest.fixture
+def sample_file(tmp_path):
+    """Create a small FASTQ-like input file."""
+    path = tmp_path / "sample.fastq"
+    path.write_text("@r1\nACGT\n+\nIIII\n")
+    return path
+
+def test_stage_file_links_on_same_device(sample_file, tmp_path):
+    """Test that staging within a filesystem avoids a copy."""
+    dest = tmp_path / "input" / "sample.fastq"
+    dest.parent.mkdir()
+    mode = stage_file(str(sample_file), str(dest))
+
+    assert mode in ("reflink", "hardlink", "symlink")
+    assert dest.read_text() == sample_file.read_text()
+
+def test_stage_file_explicit_copy(sample_file, tmp_path):
+    """Test that copy mode produces an independent file."""
+    dest = tmp_path / "copy.fastq"
+    assert stage_file(str(sample_file), str(dest), mode="copy") == "copy"
+    assert os.stat(dest).st_ino != os.stat(sample_file).st_ino
+    assert dest.read_text() == sample_file.read_text()
+
+def test_content_store_deduplicates(sample_file, tmp_path):
+    """Test that identical content is stored once and digests are cached."""
+    run_store = RunStore(str(tmp_path / "runs.db"))
+    run_store.initialize()
+    store = ContentStore(str(tmp_path / "store"), run_store)
+    twin = tmp_path / "twin.fastq"
+    twin.write_text(sample_file.read_text())
+
+    for i, source in enumerate([sample_file, twin]):
+        (tmp_path / f"run{i}").mkdir()
+        digest = store.stage(str(source), str(tmp_path / f"run{i}" / "sample.fastq"))
+        assert digest == file_checksum(str(sample_file))
+
+    objects = [f for _, _, files in os.walk(store.root) for f in files]
+    assert objects == [digest]
+    st = os.stat(sample_file)
+    assert run_store.get_cached_digest(str(sample_file), st.st_size, st.st_mtime_ns) == digest
+    run_store.close()
+
+def test_content_store_links_same_device_sources_read_only(sample_file, tmp_path):
+    """Test that a same-filesystem source is hardlinked, not copied, and the shared object is read-only."""
+    def no_reflink(src, dest):
+        raise OSError("reflink unsupported")
+
+    store = ContentStore(str(tmp_path / "store"))
+    with patch.dict(staging._STAGERS, {"reflink": no_reflink}):
+        digest = store.put(str(sample_file))
+    target = store.object_path(digest)
+
+    assert os.path.samefile(target, sample_file)
+    assert file_checksum(target) == digest
+    assert not os.stat(target).st_mode & 0o222
@@ -0,0 +1,19 @@
+import os
+import importlib.util
+
+spec = importlib.util.spec_from_file_location(
+    "bench_startup", os.path.join(os.path.dirname(__file__), "..", "benchmarks", "bench_startup.py"))
+bench_startup = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_startup)
+
+def test_entry_points_do_not_load_heavy_dependencies():
+    """Test that the CLI and orchestrator construction import neither openai nor requests.
+
+    The time budgets themselves are enforced by running benchmarks/bench_startup.py.
+    """
+    reports = bench_startup.run_startup(("cli", "orchestrator_init"), repeat=1)
+    assert {name: report["forbidden_loaded"] for name, report in reports.items()} == {"cli": [], "orchestrator_init": []}
+
+def test_forbidden_modules_match_whole_packages():
+    assert bench_startup.forbidden_loaded({"openai", "openai.types", "requests_toolbelt", "json"},
+                                          ("openai", "requests")) == ["openai", "openai.types"]
@@ -0,0 +1,56 @@
+import json
+import pytest
+from src.ai_orchestrator.ai_orchestrator import AIOrchestrator
+from src.ai_orchestrator.response_cache import ResponseCache
+from src.ai_orchestrator.stream_parser import WorkflowStreamParser
+from src.ai_orchestrator.stub_client import StubChatClient
+from src.run_management.run_tracking import RunStore
+from unittest.mock import MagicMock
+
+PLAN = {
+    "workflow": [{"module": "FastQC", "params": {"note": "brackets ]} and \"quotes\""}}, "BWA", {"module": "STAR"}],
+    "missing_modules": ["STAR"],
+}
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 10_000])
+def test_steps_are_emitted_as_they_complete(chunk_size):
+    """Test that every step is parsed exactly once, however the text is split."""
+    text = "```json\n" + json.dumps(PLAN, indent=2) + "\n```"
+    parser = WorkflowStreamParser()
+    steps = []
+    for i in range(0, len(text), chunk_size):
+        steps += parser.feed(text[i:i + chunk_size])
+    assert steps == PLAN["workflow"]
+    assert parser.close() == PLAN
+
+def test_first_step_arrives_before_the_reply_ends():
+    text = json.dumps(PLAN)
+    parser = WorkflowStreamParser()
+    cut = text.index('"BWA"')
+    assert parser.feed(text[:cut]) == [PLAN["workflow"][0]]
+    assert parser.feed(text[cut:]) == PLAN["workflow"][1:]
+
+def test_invalid_reply_raises_on_close():
+    parser = WorkflowStreamParser()
+    parser.feed("I cannot help with that.")
+    with pytest.raises(ValueError):
+        parser.close()
+
+def test_orchestrator_stream(tmp_path):
+    """Test streamed generation end to end with the offline stub client."""
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    registry = MagicMock()
+    registry.modules.return_value = {"FastQC": {}, "BWA": {}}
+    registry.tickets.return_value = ["STAR"]
+    client = StubChatClient(default=json.dumps(PLAN), chunk_size=7)
+    orchestrator = AIOrchestrator(None, registry=registry, client=client, response_cache=ResponseCache(store))
+
+    events = list(orchestrator.generate_workflow_stream("Align my reads"))
+
+    assert [payload for kind, payload in events if kind == "step"] == PLAN["workflow"]
+    assert events[-1] == ("result", PLAN)
+    assert client.calls[0]["stream"] is True
+    assert orchestrator.generate_workflow("align my reads") == PLAN  # Served from the cache
+    assert len(client.calls) == 1
+    store.close()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import pytest
+from types import SimpleNamespace
+from src.run_management import run_tracking
+from src.run_management.run_tracking import RunStore
+from src.run_management.workflow_engine import WorkflowEngine, build_dag, file_format
+
+os.environ.setdefault("BBD_LLM_STUB", "1")
+
+MODULES = [
+    {"name": "Align", "input": ["reads.fastq.gz"], "output": ["aligned.sam"],
+     "execution": "sleep 0.3; cat reads.fastq.gz > aligned.sam"},
+    {"name": "Sort", "input": ["aligned.sam"], "output": ["sorted.bam"],
+     "execution": "cat aligned.sam > sorted.bam"},
+    {"name": "Stats", "input": ["reads.fastq.gz"], "output": ["stats.txt"],
+     "execution": "sleep 0.3; wc -c < reads.fastq.gz > stats.txt"},
+    {"name": "Broken", "input": ["reads.fastq.gz"], "output": ["broken.txt"],
+     "execution": "exit 3"},
+    {"name": "Flaky", "input": ["reads.fastq.gz"], "output": ["flaky.txt"],
+     "execution": "test -e {flag} && cat reads.fastq.gz > flaky.txt"},
+    {"name": "Map", "input": ["reads.fastq"], "output": ["mapped.sam"], "mergeable": True, "merge": "sam",
+     "resources": {"cpus": 2},
+     "execution": "awk 'BEGIN { print \"@HD\\tVN:1.6\" } NR % 4 == 1 { print substr($1, 2) \"\\t4\" }' "
+                  "reads.fastq > mapped.sam"},
+]
+
+@pytest.fixture
+def engine_env(tmp_path, monkeypatch):
+    """Provide module metadata, a run store and a run with one input file."""
+    metadata = tmp_path / "module_metadata.json"
+    metadata.write_text(json.dumps(MODULES))
+    monkeypatch.setenv("BBD_MODULE_METADATA", str(metadata))
+    store = RunStore(str(tmp_path / "runs.db"))
+    store.initialize()
+    reads = tmp_path / "sample.fastq.gz"
+    reads.write_text("@r1\nACGT\n+\nIIII\n")
+    run_id = store.log_run([str(reads)], "")
+    yield store, run_id, str(tmp_path / "run"), str(reads)
+    store.close()
+
+def test_file_format():
+    assert file_format("reads.fastq.gz") == "fastq"
+    assert file_format("/x/sample_R1.fq") == "fastq"
+    assert file_format("aligned_reads.sam") == "sam"
+
+def test_build_dag_uses_declared_inputs_and_outputs(engine_env):
+    """Test that dependencies follow module input/output formats."""
+    steps = build_dag([{"module": "Align"}, {"module": "Stats"}, {"module": "Sort"}])
+
+    assert [s.depends_on for s in steps] == [set(), set(), {"01_Align"}]
+
+def test_independent_steps_run_concurrently(engine_env):
+    """Test that independent branches overlap and outputs flow downstream."""
+    store, run_id, run_dir, reads = engine_env
+    engine = WorkflowEngine(run_id, run_dir, [reads], run_store=store, cpu_budget=4)
+
+    start = time.time()
+    status = engine.run([{"module": "Align"}, {"module": "Stats"}, {"module": "Sort"}])
+
+    assert status == "completed"
+    assert time.time() - start < 0.55  # Align and Stats each sleep 0.3s
+    assert open(os.path.join(run_dir, "output", "03_Sort", "sorted.bam")).read() == open(reads).read()
+    assert store.get_run(run_id)[4] == "completed"
+
+def test_failure_skips_dependants_and_resume_reuses_completed_steps(engine_env):
+    """Test partial failure handling and resume-from-failure."""
+    store, run_id, run_dir, reads = engine_env
+    workflow = [{"module": "Stats"}, {"module": "Broken", "id": "broken"},
+                {"module": "Sort", "depends_on": ["broken"]}]
+
+    status = WorkflowEngine(run_id, run_dir, [reads], run_store=store).run(workflow)
+    states = store.get_step_states(run_id)
+    assert status == "partial"
+    assert [states[s]["status"] for s in ("01_Stats", "broken", "03_Sort")] == ["completed", "failed", "skipped"]
+    metrics = {m["step_id"]: m for m in store.get_step_metrics(run_id)}
+    assert (metrics["01_Stats"]["exit_code"], metrics["broken"]["exit_code"]) == (0, 3)
+    assert metrics["01_Stats"]["wall_seconds"] >= 0.3
+
+    workflow[1] = {"module": "Align", "id": "broken"}
+    finished_at = store.connection().execute(
+        "SELECT finished_at FROM run_steps WHERE step_id = '01_Stats'").fetchone()[0]
+    status = WorkflowEngine(run_id, run_dir, [reads], run_store=store).run(workflow)
+
+    assert status == "completed"
+    assert store.connection().execute(
+        "SELECT finished_at FROM run_steps WHERE step_id = '01_Stats'").fetchone()[0] == finished_at
+
+def test_resume_reruns_steps_downstream_of_a_rerun(engine_env):
+    """Test that a completed step is re-run, not reused, when a step it depends on has to run again."""
+    store, run_id, run_dir, reads = engine_env
+    workflow = [{"module": "Align"}, {"module": "Sort"}]
+    assert WorkflowEngine(run_id, run_dir, [reads], run_store=store).run(workflow) == "completed"
+
+    with open(reads, "a") as f:
+        f.write("@r2\nTTTT\n+\nIIII\n")
+    os.remove(os.path.join(run_dir, "output", "01_Align", "aligned.sam"))
+    assert WorkflowEngine(run_id, run_dir, [reads], run_store=store).run(workflow) == "completed"
+
+    assert open(os.path.join(run_dir, "output", "02_Sort", "sorted.bam")).read() == open(reads).read()
+
+def test_command_placeholders_are_substituted_once():
+    """Test that {input} does not match inside {input_2} and substituted values are not expanded again."""
+    step = SimpleNamespace(module="Tool", params={"input": "{input_2}", "input_2": "b c"},
+                           definition={"execution": "tool {input} {input_2} reads.fastq.gz > out.txt",
+                                       "input": ["reads.fastq.gz"], "output": ["out.txt"]})
+
+    command = WorkflowEngine._command_for(step, ["/data/x.fastq.gz"], "/out")
+    assert command == "tool '{input_2}' 'b c' /data/x.fastq.gz > /out/out.txt"
+
+def test_cycle_is_rejected(engine_env):
+    with pytest.raises(ValueError):
+        build_dag([{"module": "Stats", "id": "a", "depends_on": ["b"]},
+                   {"module": "Stats", "id": "b", "depends_on": ["a"]}])
+
+def test_mergeable_step_is_scattered(engine_env, monkeypatch):
+    """Test that a large FASTQ is split across a mergeable step's CPUs and the SAM chunks are merged."""
+    from src.run_management import scatter
+    store, run_id, run_dir, reads = engine_env
+    with open(reads, "w") as f:
+        f.writelines(f"@r{i}\nACGTACGTACGT\n+\nIIIIIIIIIIII\n" for i in range(1000))
+    monkeypatch.setattr(scatter, "DEFAULT_CHUNK_BYTES", 4096)
+    engine = WorkflowEngine(run_id, run_dir, [reads], run_store=store, cpu_budget=2)
+
+    assert engine.run([{"module": "Map"}]) == "completed"
+
+    step_dir = os.path.join(run_dir, "output", "01_Map")
+    assert os.listdir(step_dir) == ["mapped.sam"]
+    lines = open(os.path.join(step_dir, "mapped.sam")).read().splitlines()
+    assert lines == ["@HD\tVN:1.6"] + [f"r{i}\t4" for i in range(1000)]
+    logs = os.listdir(os.path.join(run_dir, "logs", "01_Map"))
+    assert "execution.chunk00000.log" in logs and "execution.chunk00001.log" in logs
+    assert len(store.get_step_metrics(run_id)) == len(logs)
+
+def test_failed_run_resumes_through_api(engine_env, tmp_path, monkeypatch):
+    """Test that a workflow run with a failed step fails its job, and resuming it re-runs only that step."""
+    from src.backend import backend_api
+    from src.backend.module_store import ModuleStore
+    store, _, _, reads = engine_env
+    monkeypatch.setattr(backend_api, "module_store", ModuleStore(str(tmp_path / "module_database.db")))
+    monkeypatch.setattr(run_tracking, "_store", store)
+    monkeypatch.setattr(backend_api, "EXECUTOR", "local")
+    monkeypatch.setattr(backend_api, "job_queue", None)
+    monkeypatch.setattr(backend_api, "job_workers", None)
+    flag = tmp_path / "ready; exit 0"  # Params are quoted, so this names a file rather than ending the command
+    client = backend_api.app.test_client()
+
+    def stats_finished_at(run_id):
+        return store.connection().execute("SELECT finished_at FROM run_steps WHERE run_id = ? AND step_id = '01_Stats'",
+                                          (run_id,)).fetchone()[0]
+
+    def wait_for_job(run_id, status):
+        deadline = time.time() + 30
+        while client.get(f"/runs/{run_id}").get_json()["job_status"] != status:
+            assert time.time() < deadline, "timed out"
+            time.sleep(0.05)
+        return client.get(f"/runs/{run_id}").get_json()
+
+    try:
+        run_id = client.post("/execute-workflow", json={
+            "workflow": [{"module": "Stats"}, {"module": "Flaky", "params": {"flag": str(flag)}}],
+            "base_path": str(tmp_path / "runs"), "input_files": [reads]}).get_json()["run_id"]
+        run = wait_for_job(run_id, "failed")
+        assert run["status"] == "partial"
+        assert [run["steps"][s]["status"] for s in ("01_Stats", "02_Flaky")] == ["completed", "failed"]
+        stats_finished = stats_finished_at(run_id)
+
+        flag.touch()
+        assert client.post(f"/runs/{run_id}/resume").status_code == 202
+        run = wait_for_job(run_id, "completed")
+    finally:
+        if backend_api.job_workers is not None:
+            backend_api.job_workers.stop()
+
+    assert run["status"] == "completed"
+    assert run["steps"]["02_Flaky"]["status"] == "completed"
+    assert stats_finished_at(run_id) == stats_finished
+    assert client.post(f"/runs/{run_id}/resume").status_code == 409